@@ -1,6 +1,9 @@
 import textfsm
 import pprint
 
+from netscraper.config import TEMPLATE_PATH_VLAN
+from netscraper.configindex import VLAN_SECTIONS, ConfigIndex
+
 # Sample output of the 'show interfaces' command
 raw_output = """
 Preparing to Display Configuration...
@@ -326,12 +329,16 @@ vlan create 4050 name "BVLAN-1" type spbm-bvlan
 vlan create 4051 name "BVLAN-2" type spbm-bvlan
 """
 
+# Index the config's sections in one pass; the template only reads the sections it has rules for
+index = ConfigIndex(raw_output)
+pprint.pprint(index.kinds())
+
 # Load the TextFSM template
-template_path = 'C:/Users/CISSSXS4/OneDrive - New Jersey Transit/Desktop/Scraper/ntc-templates-master/ntc-templates-master/ntc_templates/templates/extreme_exos_show_running_config.textfsm'
+template_path = TEMPLATE_PATH_VLAN
 
 with open(template_path) as template_file:
     fsm = textfsm.TextFSM(template_file)
-    parsed_output = fsm.ParseText(raw_output)
+    parsed_output = fsm.ParseText(index.text(*VLAN_SECTIONS))
 
 # Convert parsed output to a list of dictionaries
 results = [dict(zip(fsm.header, entry)) for entry in parsed_output]
@@ -0,0 +1 @@
+"""netscraper - Collect, merge and export endpoint data from Extreme ERS/VSP devices."""
@@ -0,0 +1,5 @@
+"""Allow running the scraper with `python -m netscraper`."""
+
+from netscraper.cli import main
+
+main()
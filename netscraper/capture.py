@@ -0,0 +1,142 @@
+"""Raw command-output archives and offline replay.
+
+A capture archive is gzip-compressed JSON Lines. It holds one record per
+`send_command`, with the device, its role/platform/site, the command, a UTC
+timestamp and the raw output. Replaying an archive runs the same collectors,
+parsers and merge as a live run, with no network.
+"""
+
+import collections
+import concurrent.futures
+import datetime
+import gzip
+import json
+import logging
+import threading
+
+from netscraper.collectors import Device, collect_device, device_result
+from netscraper.metrics import METRICS
+from netscraper.parsepool import INLINE_PARSER
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureWriter:
+    """Append raw command outputs from many device threads to one archive."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def record(self, device, command, output):
+        line = json.dumps({
+            'device': device.host,
+            'role': device.role,
+            'platform': device.platform,
+            'site': device.site,
+            'port': device.port,
+            'command': command,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'output': output,
+        })
+        with self._lock:
+            self._file.write(line + '\n')
+            self.records += 1
+
+    def wrap(self, net_connect, device):
+        return CapturingConnection(net_connect, device, self)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CapturingConnection:
+    """Pass-through netmiko connection that records every `send_command` output."""
+
+    def __init__(self, net_connect, device, writer):
+        self._net_connect = net_connect
+        self._device = device
+        self._writer = writer
+
+    def send_command(self, command, *args, **kwargs):
+        output = self._net_connect.send_command(command, *args, **kwargs)
+        self._writer.record(self._device, command, output)
+        return output
+
+    def __getattr__(self, name):
+        return getattr(self._net_connect, name)
+
+
+def read_capture(path):
+    """Yield the records of a capture archive in the order they were written."""
+    with gzip.open(path, 'rt', encoding='utf-8') as capture_file:
+        for line in capture_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayConnection:
+    """Stand-in for a netmiko connection that answers from captured outputs.
+
+    Repeated commands are answered in the order they were captured. A command
+    that was never captured returns an empty output, as a device with no entries would.
+    """
+
+    def __init__(self, host, records):
+        self.host = host
+        self._outputs = collections.defaultdict(collections.deque)
+        for record in records:
+            self._outputs[record['command']].append(record['output'])
+
+    def send_command(self, command, *args, **kwargs):
+        outputs = self._outputs.get(command)
+        if not outputs:
+            logger.warning(f'Replay of {self.host}: no captured output for "{command}"')
+            return ''
+        return outputs.popleft() if len(outputs) > 1 else outputs[0]
+
+    def enable(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+def replay_device(device, records, parser=INLINE_PARSER):
+    try:
+        with METRICS.span('device', device=device.host):
+            tables = collect_device(ReplayConnection(device.host, records), device, parser)
+    except Exception as e:
+        logger.error(f"Error: Replay of {device.host} failed. Exception: {str(e)}")
+        return device_result(device, error=str(e))
+    return device_result(device, **tables)
+
+
+def replay_fleet(capture_paths, parser=INLINE_PARSER, max_workers=1):
+    """Rebuild one `DeviceResult` per captured device from the archives, in capture order.
+
+    With a `netscraper.parsepool.ParsePool` as `parser` and `max_workers` above one,
+    several devices are replayed at once and their outputs parsed in parallel.
+    """
+    devices = {}
+    for path in capture_paths:
+        for record in read_capture(path):
+            device = Device(
+                record['device'], record['role'], record['platform'], record['site'], record.get('port', 22)
+            )
+            devices.setdefault(device, []).append(record)
+
+    if max_workers <= 1:
+        return [replay_device(device, records, parser) for device, records in devices.items()]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(replay_device, device, records, parser) for device, records in devices.items()]
+        return [future.result() for future in futures]
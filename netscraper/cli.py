@@ -0,0 +1,165 @@
+"""Command-line entry point.
+
+Without arguments the scraper prompts for credentials and one router and switch.
+With `--batch` it reads the device inventories and takes the credentials stored
+by password_encrypt.py from the keyring, so it can run unattended. `--capture`
+archives the raw outputs of a run and `--replay` re-parses archives offline.
+`--metrics` times every stage, device and command and writes the summary as
+JSON and Prometheus text. `--parse-cache` keeps the rows parsed from each raw
+output in a file, so outputs unchanged since the last run are not parsed again.
+Progress is logged, one line per device, to the console and network_scraper.log.
+"""
+
+import argparse
+import getpass
+import logging
+
+from netscraper import pipeline
+from netscraper.collectors import Credentials
+from netscraper.export import EXPORTERS, ExportError
+from netscraper.config import LOG_PATH, ROUTER_INVENTORY_PATH, SWITCH_INVENTORY_PATH, VRF_ID_OUTPUT_PATH
+from netscraper.inventory import KEYRING_SERVICE, InventoryError, load_inventory, load_keyring_credentials
+from netscraper.logs import configure_logging
+from netscraper.memo import PARSE_MEMO
+from netscraper.metrics import METRICS
+from netscraper.probe import ProbeError
+from netscraper.templates import TEMPLATE_CACHE
+
+logger = logging.getLogger(__name__)
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f'must be a positive number, not {value}')
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='netscraper', description='Collect, merge and export ERS/VSP endpoint data.')
+    parser.add_argument('--batch', action='store_true', help='read devices from inventory files and credentials from the keyring')
+    parser.add_argument('--routers', default=ROUTER_INVENTORY_PATH, help='router inventory (txt, csv or yaml)')
+    parser.add_argument('--switches', default=SWITCH_INVENTORY_PATH, help='switch inventory (txt, csv or yaml)')
+    parser.add_argument('--keyring-service', default=KEYRING_SERVICE, help='keyring service holding the credentials')
+    parser.add_argument('--workers', type=int, default=100, help='devices collected at the same time')
+    parser.add_argument('--parse-workers', type=int, help='processes parsing command outputs (default: one per CPU; 0 parses in the SSH threads)')
+    parser.add_argument('--output', help='output path without extension (default: timestamped name in the project directory)')
+    parser.add_argument('--format', dest='formats', action='append', choices=sorted(EXPORTERS),
+                        help='output format; repeat for several (default: excel)')
+    parser.add_argument('--capture', metavar='ARCHIVE', help='also archive every raw command output (.jsonl.gz)')
+    parser.add_argument('--replay', nargs='+', metavar='ARCHIVE', help='parse captured archives instead of connecting to devices')
+    parser.add_argument('--parse-cache', metavar='PATH', help='reuse rows parsed in earlier runs from PATH (.jsonl.gz), and save this run\'s')
+    parser.add_argument('--no-parse-memo', action='store_true', help='parse every output, even one seen before with the same template')
+    parser.add_argument('--no-probe', action='store_true', help='skip the ping sweep (always skipped with --replay)')
+    parser.add_argument('--ping-rate', type=positive_int, default=1000, help='ICMP echo requests sent per second')
+    parser.add_argument('--ping-retries', type=int, default=2, help='extra echo requests to a host that has not answered')
+    parser.add_argument('--ping-timeout', type=float, default=1.0, help='seconds to wait for each echo reply')
+    parser.add_argument('--metrics', metavar='PATH', help='write stage, device and command timings to PATH.json and PATH.prom')
+    parser.add_argument('--log-file', default=LOG_PATH, help='run log (default: network_scraper.log; "" for none)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='lowest level logged to the console and the log file')
+    parser.add_argument('--vrf-list', nargs='?', const=VRF_ID_OUTPUT_PATH, help='also write the VRF ids seen on any router (default file: Vrf_List.txt)')
+    return parser
+
+
+def prompt_for_devices():
+    # Prompt user for credentials
+    username = input("Enter your username: ")
+    password = getpass.getpass("Enter your password: ")
+    enable_pass = getpass.getpass("Enter your enable password: ")
+
+    # Prompt user for router and switch IPs
+    router_ip = input("Enter the router IP address: ")
+    switch_ip = input("Enter the switch IP address: ")
+
+    # Create router and switch lists with the provided IPs
+    return [router_ip], [switch_ip], Credentials(username, password, enable_pass)
+
+
+def load_batch(args):
+    router_list = load_inventory(args.routers, 'router')
+    switch_list = load_inventory(args.switches, 'switch')
+    if not router_list and not switch_list:
+        raise InventoryError(f'No devices listed in {args.routers} or {args.switches}.')
+    credentials = load_keyring_credentials(args.keyring_service)
+    logger.info(f"Loaded {len(router_list)} routers and {len(switch_list)} switches from inventory.")
+    return router_list, switch_list, credentials
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    listener = configure_logging(args.log_file, getattr(logging, args.log_level))
+    try:
+        return run(args)
+    finally:
+        listener.stop()
+
+
+def run(args):
+    if args.metrics:
+        METRICS.reset()
+        METRICS.enable()
+    PARSE_MEMO.enabled = not args.no_parse_memo
+    if args.parse_cache and PARSE_MEMO.enabled:
+        logger.info(f"Loaded {PARSE_MEMO.load(args.parse_cache)} parsed outputs from {args.parse_cache}")
+
+    if args.replay:
+        results = pipeline.replay(args.replay, parse_workers=args.parse_workers)
+    else:
+        if args.batch:
+            try:
+                router_list, switch_list, credentials = load_batch(args)
+            except (InventoryError, OSError) as err:
+                raise SystemExit(f'Error: {err}')
+        else:
+            router_list, switch_list, credentials = prompt_for_devices()
+        results = pipeline.collect(
+            router_list, switch_list, credentials, max_workers=args.workers, capture_path=args.capture,
+            parse_workers=args.parse_workers,
+        )
+    failed = [result.device.host for result in results if result.error]
+    logger.info(f"Collected {len(results) - len(failed)} of {len(results)} devices.")
+    if failed:
+        logger.warning(f"Failed: {', '.join(failed)}")
+
+    # Report how often the compiled template cache was reused across devices
+    template_stats = TEMPLATE_CACHE.stats()
+    logger.info(f"TextFSM template cache: {template_stats['hits']} hits, {template_stats['misses']} misses")
+    if PARSE_MEMO.enabled:
+        memo_stats = PARSE_MEMO.stats()
+        logger.info(f"Parse memo: {memo_stats['hits']} hits, {memo_stats['misses']} misses "
+                    f"({memo_stats['hit_rate']:.0%} of outputs answered without parsing)")
+        if args.parse_cache:
+            logger.info(f"Saved {PARSE_MEMO.save(args.parse_cache)} parsed outputs to {args.parse_cache}")
+
+    report = pipeline.merge(results)
+
+    # Only ping the IPs that are in the final merged list
+    if not (args.replay or args.no_probe):
+        try:
+            report = pipeline.probe(report, rate=args.ping_rate, retries=args.ping_retries, timeout=args.ping_timeout)
+        except ProbeError as err:
+            logger.warning(f"Ping sweep skipped: {err}")
+
+    with_ip = sum(1 for ip_address in report['endpoints'].values('IP_ADDRESS') if ip_address)
+    logger.info(f"Merged {len(report['endpoints'])} endpoint rows, {with_ip} with an IP address.")
+
+    try:
+        paths = pipeline.export(report, args.output, args.vrf_list, args.formats or ['excel'])
+    except ExportError as err:
+        raise SystemExit(f'Error: {err}')
+    for path in paths:
+        logger.info(f"Data successfully exported to {path}")
+
+    if args.metrics:
+        log_timings(METRICS.summary())
+        for path in METRICS.export(args.metrics):
+            logger.info(f"Timings written to {path}")
+    return report
+
+
+def log_timings(summary):
+    logger.info("Stage timings (seconds):")
+    for stage, stats in summary['stages'].items():
+        logger.info(f"  {stage:<8} count {stats['count']:>6}  total {stats['total']:>9.3f}  "
+                    f"p50 {stats['p50']:.3f}  p95 {stats['p95']:.3f}  max {stats['max']:.3f}")
@@ -0,0 +1,266 @@
+"""SSH collection from ERS routers and switches."""
+
+import collections
+import concurrent.futures
+import itertools
+import logging
+
+from netscraper.config import (
+    TEMPLATE_PATH_ARP,
+    TEMPLATE_PATH_INTERFACE,
+    TEMPLATE_PATH_MAC,
+    TEMPLATE_PATH_PORT_STATUS,
+    TEMPLATE_PATH_VLAN,
+    TEMPLATE_PATH_VLAN_ADVANCE,
+    TEMPLATE_PATH_VRF,
+)
+from netscraper.metrics import METRICS
+from netscraper.parsepool import INLINE_PARSER
+
+logger = logging.getLogger(__name__)
+
+# netmiko device type used when an inventory entry does not name one
+DEFAULT_PLATFORM = 'avaya_ers'
+
+Credentials = collections.namedtuple('Credentials', ['username', 'password', 'enable_pass'])
+
+Device = collections.namedtuple('Device', ['host', 'role', 'platform', 'site', 'port'], defaults=(22,))
+
+# Tables collected from each device, in the order the collectors fill them
+TABLES = (
+    'vrf_data',
+    'arp_data',
+    'vlan_configurations',
+    'vlan_advance_data',
+    'mac_table',
+    'port_list',
+    'port_status_list',
+)
+
+# What one device returned. Each table is a tuple of rows owned by this result, so
+# worker threads never share a container and the results are merged only after
+# their futures complete.
+DeviceResult = collections.namedtuple('DeviceResult', ['device', 'error'] + list(TABLES))
+
+
+def tag_device(entries, rtr):
+    # Every row carries the device it came from
+    for entry in entries:
+        entry['Device'] = rtr
+    return entries
+
+
+def collect_vrf_id_info(net_connect, rtr, parser=INLINE_PARSER):
+    output = net_connect.send_command('show ip vrf')
+    return parser.submit(output, TEMPLATE_PATH_VRF, tag_device, rtr)
+
+
+def arp_vrf_ids(vrf_data):
+    """Return the router's VRF ids worth an ARP query, in the order they are queried.
+
+    `show ip vrf` already reports each VRF's ARP count, so VRFs with no ARP entries
+    are skipped instead of costing a `show ip arp vrfid` round-trip each.
+    """
+    return sorted({data['VRF_ID'] for data in vrf_data if data.get('VRF_ARP_COUNT') != '0'})
+
+
+def tag_arp_entries(arp_entries, vrf_id, rtr):
+    for entry in arp_entries:
+        entry['VRF_ID'] = vrf_id  # Add VRF_ID to each ARP entry
+        entry['Device'] = rtr
+    return arp_entries
+
+
+def collect_arp_info(net_connect, rtr, vrf_ids, parser=INLINE_PARSER):
+    arp_data = []
+    for vrf_id in vrf_ids:
+        arp_output = net_connect.send_command(f'show ip arp vrfid {vrf_id}')
+        arp_data.append(parser.submit(arp_output, TEMPLATE_PATH_ARP, tag_arp_entries, vrf_id, rtr))
+    return parser.gather(arp_data)
+
+
+def collect_mac_info(net_connect, rtr, parser=INLINE_PARSER):
+    mac_output = net_connect.send_command('show mac-address-table')
+    return parser.submit(mac_output, TEMPLATE_PATH_MAC, tag_device, rtr)
+
+
+def collect_interface_info(net_connect, rtr, parser=INLINE_PARSER):
+    port_output = net_connect.send_command('show interface name')
+    return parser.submit(port_output, TEMPLATE_PATH_INTERFACE, tag_device, rtr)
+
+
+def split_unit_port(entry):
+    # Process entries to separate UNIT and PORT
+    unit_port = entry.get('UNIT_PORT', '')
+    if unit_port:
+        unit_parts = unit_port.split('/')
+        if len(unit_parts) == 2:
+            entry['UNIT'] = unit_parts[0]
+            entry['PORT'] = unit_parts[1]
+        else:
+            # Handle cases where UNIT might not be in the expected format
+            entry['UNIT'] = ''
+            entry['PORT'] = unit_port
+    return entry
+
+
+def split_and_tag_port_status(port_status_entries, rtr):
+    return tag_device([split_unit_port(entry) for entry in port_status_entries], rtr)
+
+
+def collect_port_status_info(net_connect, rtr, parser=INLINE_PARSER):
+    port_status_output = net_connect.send_command('show interfaces')
+    return parser.submit(port_status_output, TEMPLATE_PATH_PORT_STATUS, split_and_tag_port_status, rtr)
+
+
+def add_prefix_placeholder(vlan_entries):
+    for entry in vlan_entries:
+        entry['PREFIX'] = None  # Add placeholder for PREFIX column
+    return vlan_entries
+
+
+def collect_vlan_configurations(net_connect, parser=INLINE_PARSER):
+    vlan_output = net_connect.send_command('show running-config module vlan')
+    # The template is given only the config's VLAN sections; see netscraper.configindex
+    return parser.submit(vlan_output, TEMPLATE_PATH_VLAN, add_prefix_placeholder)
+
+
+def collect_vlan_advance(net_connect, rtr, parser=INLINE_PARSER):
+    vlan_output = net_connect.send_command('show vlan advance')
+    return parser.submit(vlan_output, TEMPLATE_PATH_VLAN_ADVANCE)
+
+
+def collect_device(net_connect, device, parser=INLINE_PARSER):
+    """Run the commands for the device's role on an open connection and return its tables.
+
+    Each output goes to `parser` as soon as it arrives; the rows are only waited
+    for when the next command depends on them, and at the end.
+    """
+    rtr = device.host
+    tables = {}
+
+    # Collect data based on device type
+    if device.role == 'router':
+        tables['vrf_data'] = collect_vrf_id_info(net_connect, rtr, parser)
+        # The ARP queries depend on the VRF table, so it is waited for first
+        vrf_ids = arp_vrf_ids(parser.result(tables['vrf_data']))
+        tables['arp_data'] = collect_arp_info(net_connect, rtr, vrf_ids, parser)
+        tables['vlan_configurations'] = collect_vlan_configurations(net_connect, parser)  # Collect VLAN info for routers
+        tables['vlan_advance_data'] = collect_vlan_advance(net_connect, rtr, parser)  # Collect VLAN advance info
+    elif device.role == 'switch':
+        tables['mac_table'] = collect_mac_info(net_connect, rtr, parser)
+        tables['port_list'] = collect_interface_info(net_connect, rtr, parser)
+        tables['port_status_list'] = collect_port_status_info(net_connect, rtr, parser)
+
+    tables = {name: parser.result(rows) for name, rows in tables.items()}
+    if 'arp_data' in tables:
+        logger.debug(f'{rtr}: {len(tables["arp_data"])} ARP entries in {len(tables["vrf_data"])} VRFs')
+    return tables
+
+
+def backup_device(device, credentials, capture=None, parser=INLINE_PARSER):
+    """Collect one inventory `Device` and return its `DeviceResult`.
+
+    A device that cannot be reached or fails part way returns empty tables and the error text.
+    When `capture` (a `netscraper.capture.CaptureWriter`) is given, every command output is
+    also written to its archive. `parser` is where the outputs are parsed, e.g. a
+    `netscraper.parsepool.ParsePool`.
+    """
+    from netmiko import ConnectHandler, NetMikoAuthenticationException, NetMikoTimeoutException
+
+    rtr = device.host
+    connection = {
+        "device_type": device.platform,
+        "host": rtr,
+        "username": credentials.username,
+        "password": credentials.password,
+        "secret": credentials.enable_pass,
+        "port": device.port,
+        "verbose": True,
+        "session_log": f'log_{rtr}.txt' if device.port == 22 else f'log_{rtr}_{device.port}.txt'
+    }
+
+    # Commands and parses run inside the device span are attributed to the device
+    with METRICS.span('device', device=rtr):
+        try:
+            with METRICS.span('connect'):
+                net_connect = ConnectHandler(**connection)
+            net_connect = METRICS.wrap(net_connect)
+            if capture is not None:
+                net_connect = capture.wrap(net_connect, device)
+            with METRICS.span('enable'):
+                net_connect.enable()
+
+            # Send commands to set terminal settings
+            net_connect.send_command('terminal length 0')
+            net_connect.send_command('terminal more disable')
+            net_connect.send_command('disable clipaging')
+            net_connect.send_command('en')
+
+            tables = collect_device(net_connect, device, parser)
+
+            net_connect.disconnect()
+            logger.debug(f'Backup of {rtr} completed successfully.')
+
+        except (NetMikoTimeoutException, NetMikoAuthenticationException) as e:
+            logger.error(f"Error: Access to {rtr} failed, backup was not taken. Exception: {str(e)}")
+            return device_result(device, error=str(e))
+        except Exception as e:
+            logger.error(f"Error: An unexpected error occurred with {rtr}. Exception: {str(e)}")
+            return device_result(device, error=str(e))
+
+        return device_result(device, **tables)
+
+
+def device_result(device, error=None, **tables):
+    return DeviceResult(device, error, *(tuple(tables.get(table, ())) for table in TABLES))
+
+
+def as_device(device, role):
+    # Plain host strings come from the interactive prompt, Device tuples from an inventory file
+    if isinstance(device, str):
+        return Device(device, role, DEFAULT_PLATFORM, '')
+    return device
+
+
+def collect_fleet(router_list, switch_list, credentials, max_workers=100, capture=None, parser=INLINE_PARSER):
+    """Collect every router and switch concurrently.
+
+    Args:
+        router_list: Router hosts, or inventory `Device` entries carrying their own platform.
+        switch_list: Switch hosts, or inventory `Device` entries.
+        credentials: `Credentials` used for every device.
+        max_workers: Number of devices collected at the same time.
+        capture: Optional `CaptureWriter` that archives every raw command output.
+        parser: Where the outputs are parsed; a `ParsePool` keeps parsing off the SSH threads.
+
+    Returns:
+        list: One `DeviceResult` per device, in inventory order.
+    """
+    devices = [as_device(router, 'router') for router in router_list]
+    devices += [as_device(switch, 'switch') for switch in switch_list]
+
+    # Use multithreading for concurrent execution
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(backup_device, device, credentials, capture, parser) for device in devices]
+        # One progress line per device as it finishes, from this thread only
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            logger.info(f'[{done}/{len(futures)}] {device_summary(future.result())}')
+        return [future.result() for future in futures]
+
+
+def device_summary(result):
+    """One line describing a `DeviceResult`: its row counts, or that it failed."""
+    device = result.device
+    if result.error:
+        return f'{device.host} ({device.role}): failed'
+    counts = [f'{table} {len(getattr(result, table))}' for table in TABLES if getattr(result, table)]
+    return f"{device.host} ({device.role}): {', '.join(counts) or 'no rows'}"
+
+
+def combine_results(results):
+    """Concatenate the tables of every `DeviceResult` into one list per name in `TABLES`."""
+    return {
+        table: list(itertools.chain.from_iterable(getattr(result, table) for result in results))
+        for table in TABLES
+    }
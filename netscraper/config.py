@@ -0,0 +1,39 @@
+"""Paths to templates and output files."""
+
+import datetime
+import os
+
+# Project root: the directory holding Network_Scraper.py and the ntc-templates checkout
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATE_DIR = os.path.join(BASE_PATH, 'ntc-templates-master/ntc-templates-master/ntc_templates/templates')
+
+# Paths to the templates
+TEMPLATE_PATH_ROUTE = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_ip_route_vrfid.textfsm')
+TEMPLATE_PATH_VLAN_ADVANCE = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_vlan_advance.textfsm')
+TEMPLATE_PATH_VRF = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_ip_vrf_id_only.textfsm')
+TEMPLATE_PATH_ARP = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_ip_arp_vrfid.textfsm')
+TEMPLATE_PATH_INTERFACE = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_interface_name.textfsm')
+TEMPLATE_PATH_MAC = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_mac-address-table.textfsm')
+TEMPLATE_PATH_PORT_STATUS = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_interfaces.textfsm')
+TEMPLATE_PATH_PING = os.path.join(TEMPLATE_DIR, 'extreme_ers_ping.textfsm')
+TEMPLATE_PATH_VLAN = os.path.join(TEMPLATE_DIR, 'extreme_ers_show_running_config_vlan.textfsm')
+
+VRF_ID_OUTPUT_PATH = os.path.join(BASE_PATH, 'Vrf_List.txt')
+
+# Run log written by the command-line entry point
+LOG_PATH = os.path.join(BASE_PATH, 'network_scraper.log')
+
+# Device inventories read in batch mode
+ROUTER_INVENTORY_PATH = os.path.join(BASE_PATH, 'Router.txt')
+SWITCH_INVENTORY_PATH = os.path.join(BASE_PATH, 'Switch.txt')
+
+
+def timestamp(now=None):
+    # Set the time format for logging and file names
+    return '{:%m-%d-%Y_%Hh-%Mm-%Ss}'.format(now or datetime.datetime.now())
+
+
+def output_path(now=None):
+    # Each export format adds its own extension, or writes a directory of this name
+    return os.path.join(BASE_PATH, f'Network_Scraper_Output_{timestamp(now)}')
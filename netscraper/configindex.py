@@ -0,0 +1,197 @@
+"""Index of the top-level sections of a running-config, for parsing only the ones needed.
+
+A VSP or ERS running-config is a flat list of statements. Some open a context
+that runs to its `exit` line (`interface Vlan 10`, `router isis`), the rest
+stand alone (`vlan create 10 ...`, `vlan i-sid 10 ...`). `ConfigIndex` scans a
+config once and records the byte offsets of each: a context from its first
+line to the end of its `exit` line, a statement as its own line. Blank and
+comment lines between them belong to no section.
+
+A section is named by the first two words of its first line, its kind
+(`vlan create`, `interface Vlan`, `router isis`), and the third word, if any
+(`10`). `views()` returns memoryview slices of the sections of the given
+kinds, in config order, without copying the config; `iter_textfsm_output`
+reads them as they are. A template then parses the few sections it has rules
+for rather than the whole config.
+
+`TEMPLATE_SECTIONS` names the sections each running-config template has rules
+for. When a config opens other contexts (`has_other_contexts`),
+`parse_textfsm_output` gives those templates only their sections; a config of
+nothing else, such as `show running-config module vlan`, is parsed whole.
+"""
+
+import collections
+import functools
+import os
+import re
+
+from netscraper.config import TEMPLATE_PATH_VLAN
+
+# The statements that open a context, closed by a line reading `exit`, as regexes of the whole
+# line. Others with the same first words stand alone, such as `router isis enable`.
+CONTEXT_COMMANDS = (
+    r'interface \S+(?: \S+)?',
+    r'router (?:isis|ospf|rip|bgp(?: \d+)?|vrf \S+)',
+    r'route-map \S+ \d+',
+    r'application',
+    r'mgmt \S+',
+    r'logical-intf isis \d+ .*',
+)
+
+# The sections `extreme_ers_show_running_config_vlan.textfsm` has rules for
+VLAN_SECTIONS = ('vlan create', 'vlan i-sid', 'interface Vlan')
+
+# Template file name -> the kinds of section it parses
+TEMPLATE_SECTIONS = {
+    os.path.basename(TEMPLATE_PATH_VLAN): VLAN_SECTIONS,
+}
+
+Section = collections.namedtuple('Section', ['kind', 'name', 'start', 'end'])
+
+# A line that is not blank or a comment: its kind (first two words) and third word
+_STATEMENT = re.compile(rb'^[ \t]*([^\s#!]\S*(?:[ \t]+\S+)?)(?:[ \t]+(\S+))?[^\n]*\n?', re.M)
+# Searched from the newline before a context's second line; a leading literal is found much faster than ^
+_EXIT = re.compile(rb'\n[ \t]*exit[ \t]*\r?(?:\n|$)')
+
+
+def _commands_pattern(commands):
+    return '(?:{})'.format('|'.join(command.replace(' ', '[ \t]+') for command in commands))
+
+
+@functools.lru_cache(maxsize=None)
+def _context_regex(commands):
+    return re.compile(r'[ \t]*{}[ \t]*\r?\n?'.format(_commands_pattern(commands)).encode())
+
+
+@functools.lru_cache(maxsize=None)
+def _other_context_regexes(kinds, commands, as_bytes):
+    excluded = '|'.join(kind.replace(' ', '[ \t]+') + r'(?:[ \t\r\n]|$)' for kind in kinds)
+    line = r'[ \t]*(?!{}){}[ \t]*\r?(?:\n|$)'.format(excluded or '(?!)', _commands_pattern(commands))
+    regexes = re.compile(line), re.compile('\n' + line)
+    if as_bytes:
+        regexes = tuple(re.compile(regex.pattern.encode()) for regex in regexes)
+    return regexes
+
+
+def has_other_contexts(config, kinds, context_commands=CONTEXT_COMMANDS):
+    """Return whether the str or bytes `config` opens a context that is not one of `kinds`.
+
+    Without one, a template's sections are all of `config` apart from statements
+    its rules do not match, and indexing it would only cost time.
+    """
+    first_line, other_lines = _other_context_regexes(tuple(kinds), tuple(context_commands), isinstance(config, bytes))
+    return bool(first_line.match(config) or other_lines.search(config))
+
+
+class ConfigIndex:
+    """The sections of one running-config, found in a single scan; see the module docstring.
+
+    Args:
+        config: The config as bytes, or as a str, which is encoded to UTF-8 once.
+        context_commands: Regexes of the statements that open a context.
+    """
+
+    def __init__(self, config, context_commands=CONTEXT_COMMANDS):
+        # An ASCII str has the offsets of its bytes, so `text()` can slice it instead of decoding
+        self._text = config if isinstance(config, str) and config.isascii() else None
+        if isinstance(config, str):
+            config = config.encode('utf-8', 'surrogatepass')
+        self.buffer = memoryview(config)
+
+        # One entry per section; Section tuples are only built for the sections asked for
+        self._starts = []
+        self._ends = []
+        self._kinds = []  # the first two words as written
+        self._names = []
+
+        opens_context = _context_regex(tuple(context_commands)).fullmatch
+        size = len(config)
+        position = 0
+        while True:
+            statement = _STATEMENT.search(config, position)
+            if statement is None:
+                break
+            kind, name = statement.groups()
+            end = statement.end()
+            if opens_context(config, statement.start(), end):
+                closing = _EXIT.search(config, end - 1)
+                end = closing.end() if closing is not None else size
+            self._starts.append(statement.start())
+            self._ends.append(end)
+            self._kinds.append(kind)
+            self._names.append(name)
+            position = end
+
+        self._kind_names = {kind: ' '.join(kind.decode('utf-8', 'replace').split()) for kind in set(self._kinds)}
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return iter(self.find())
+
+    def kinds(self):
+        """Return the number of sections of each kind."""
+        counts = collections.Counter()
+        for kind, count in collections.Counter(self._kinds).items():
+            counts[self._kind_names[kind]] += count
+        return dict(counts)
+
+    def _positions(self, kinds, name):
+        if kinds:
+            wanted = {raw for raw, kind in self._kind_names.items() if kind in kinds}
+            positions = [position for position, kind in enumerate(self._kinds) if kind in wanted]
+        else:
+            positions = range(len(self._kinds))
+        if name is not None:
+            name = name.encode('utf-8')
+            positions = [position for position in positions if self._names[position] == name]
+        return positions
+
+    def find(self, *kinds, name=None):
+        """Return the sections of the given kinds (every section if none are given), in config order.
+
+        With `name`, only the sections of that name, such as one VLAN's id.
+        """
+        return [
+            Section(
+                self._kind_names[self._kinds[position]],
+                (self._names[position] or b'').decode('utf-8', 'replace'),
+                self._starts[position],
+                self._ends[position],
+            )
+            for position in self._positions(kinds, name)
+        ]
+
+    def spans(self, *kinds, name=None):
+        """Return the (start, end) offsets of the sections `find` returns, joining sections that follow on."""
+        spans = []
+        for position in self._positions(kinds, name):
+            start, end = self._starts[position], self._ends[position]
+            if spans and spans[-1][1] == start:
+                spans[-1][1] = end
+            else:
+                spans.append([start, end])
+        return [tuple(span) for span in spans]
+
+    def view(self, section):
+        """Return a memoryview of the bytes of `section`, sharing the config's buffer."""
+        return self.buffer[section.start:section.end]
+
+    def views(self, *kinds, name=None):
+        """Return memoryviews of the sections `find` returns, ready for `iter_textfsm_output`.
+
+        Sections that follow on from each other share one view.
+        """
+        return [self.buffer[start:end] for start, end in self.spans(*kinds, name=name)]
+
+    def text(self, *kinds, name=None):
+        """Return the sections `find` returns as one str, each ending with a newline."""
+        parts = []
+        for start, end in self.spans(*kinds, name=name):
+            if self._text is not None:
+                part = self._text[start:end]
+            else:
+                part = str(self.buffer[start:end], 'utf-8', 'replace')
+            parts.append(part if part.endswith('\n') else part + '\n')
+        return ''.join(parts)
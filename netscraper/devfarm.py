@@ -0,0 +1,494 @@
+"""Simulated ERS/VSP SSH device farm for load and end-to-end testing.
+
+Each virtual device listens on its own loopback address and answers the commands
+the collectors send. The answers come from synthetic generators, which build a
+fleet whose router ARP tables line up with the switch MAC tables. They can also
+come from the ntc-templates sample outputs. Per-command latency, jitter and
+injected failures let a few hundred devices on one machine behave like a slow
+WAN.
+
+Run it with `python -m netscraper.devfarm --switches 200 --write-inventory farm/`
+and point `--batch --routers farm/Router.csv --switches farm/Switch.csv` at it.
+By default each device gets its own 127.x address, which Linux routes to the
+loopback interface without any setup.
+"""
+
+import argparse
+import collections
+import csv
+import functools
+import glob
+import ipaddress
+import logging
+import os
+import random
+import selectors
+import socket
+import threading
+import time
+
+from netscraper.collectors import DEFAULT_PLATFORM, Device
+
+logger = logging.getLogger(__name__)
+
+# Commands the collectors send while setting up the session; they produce no output
+SESSION_COMMANDS = ('terminal', 'disable clipaging', 'no more')
+
+INVALID_INPUT = "% Invalid input detected at '^' marker."
+
+FarmDevice = collections.namedtuple('FarmDevice', ['name', 'role', 'platform', 'outputs'])
+
+
+def _mac(value, separator, upper):
+    digits = f'{value:012x}'
+    mac = separator.join(digits[i:i + 2] for i in range(0, 12, 2))
+    return mac.upper() if upper else mac
+
+
+def _switch_hosts(index, hosts_per_switch, vlans, vrfs, seed):
+    """Return the endpoints behind switch `index` as (port, oper, vlan_id, vrf_id, mac, ip) tuples.
+
+    The same seed always produces the same hosts, so router and switch outputs agree.
+    """
+    rng = random.Random(f'{seed}:{index}')
+    hosts = []
+    for port in range(1, hosts_per_switch + 1):
+        oper = 'Up' if rng.random() < 0.9 else 'Down'
+        vlan_index = port % vlans
+        mac = 0x020000000000 | (index << 16) | port
+        # Some endpoints never answered ARP, so they have a MAC but no IP address
+        answered = oper == 'Up' and rng.random() < 0.85
+        ip = f'10.{(index >> 8) & 255}.{index & 255}.{port}' if answered else None
+        hosts.append((port, oper, 100 + vlan_index, vlan_index % vrfs, mac, ip))
+    return hosts
+
+
+def switch_outputs(index, hosts_per_switch=24, vlans=8, vrfs=4, seed=0):
+    """Return the command outputs of synthetic switch `index`."""
+    hosts = _switch_hosts(index, hosts_per_switch, vlans, vrfs, seed)
+
+    mac_lines = ['   MAC Address    Vid   Type       Source', '----------------- ---- ------- --------------']
+    name_lines = ['Unit/Port Name', '---- ----------------------------------------------------------------']
+    status_lines = [
+        '                                  Status       Auto                   Flow',
+        'Port Trunk Admin   Oper Link LinkTrap Negotiation  Speed    Duplex Control',
+        '---- ----- ------- ---- ---- -------- ----------- -------- ------ -------',
+    ]
+    for port, oper, vlan_id, _vrf_id, mac, _ip in hosts:
+        if oper == 'Up':
+            mac_lines.append(f'{_mac(mac, "-", True)} {vlan_id:>4} Learned Unit:1 Port:{port:>2}')
+        name_lines.append(f'1/{port:<4} host-{index}-{port}')
+        speed = '1000Mbps' if port % 2 else '100Mbps'
+        status_lines.append(
+            f'1/{port:<4}       Enable  {oper:<4} {oper:<4} Enabled  Enabled     {speed:<8} Full   Disabled'
+        )
+
+    return {
+        'show mac-address-table': '\n'.join(mac_lines) + '\n',
+        'show interface name': '\n'.join(name_lines) + '\n',
+        'show interfaces': '\n'.join(status_lines) + '\n',
+    }
+
+
+def router_outputs(index, switch_indexes, hosts_per_switch=24, vlans=8, vrfs=4, seed=0):
+    """Return the command outputs of synthetic router `index`, which routes for `switch_indexes`."""
+    arp = collections.defaultdict(list)
+    for switch_index in switch_indexes:
+        for port, _oper, vlan_id, vrf_id, mac, ip in _switch_hosts(switch_index, hosts_per_switch, vlans, vrfs, seed):
+            if ip:
+                arp[vrf_id].append(f'{ip:<15}{_mac(mac, ":", False)} {vlan_id:<5} 1/{port:<3} LEARNED  2158        -')
+
+    vrf_names = ['GlobalRouter'] + [f'vrf_{vrf_id}' for vrf_id in range(1, vrfs)]
+    vrf_lines = [
+        '=' * 80,
+        '                                   VRF INFORMATION',
+        '=' * 80,
+        'VRF        VRF   VLAN  ARP    RIP  OSPF BGP  PIM  NBRv6 RIPng OSPFv3 PIM6 UNICAST ORIGIN',
+        'NAME       ID    COUNT COUNT                       COUNT                   ACTIVE',
+        '-' * 80,
+    ]
+    for vrf_id, vrf_name in enumerate(vrf_names):
+        vrf_vlans = sum(1 for vlan_index in range(vlans) if vlan_index % vrfs == vrf_id)
+        vrf_lines.append(
+            f'{vrf_name:<12} {vrf_id:<3} {vrf_vlans:<5} {len(arp[vrf_id]):<6} '
+            'FALSE FALSE FALSE FALSE 0   FALSE FALSE FALSE TRUE  static'
+        )
+
+    config_lines = []
+    advance_lines = [
+        'VLAN IF    AGING MAC               USER',
+        'ID   NAME             INDEX  TIME  ADDRESS           DEFINEPID',
+        '---- ---------------- ------ ----- ----------------- ---------',
+    ]
+    for vlan_index in range(vlans):
+        vlan_id = 100 + vlan_index
+        vrf_id = vlan_index % vrfs
+        config_lines.append(f'vlan create {vlan_id} name "VLAN-{vlan_id}" type port')
+        config_lines.append(f'interface Vlan {vlan_id}')
+        if vrf_id:
+            config_lines.append(f'vrf {vrf_names[vrf_id]}')
+        config_lines.append(f'ip address 10.{200 + index % 50}.{vlan_index}.1 255.255.255.0 {vlan_id}')
+        config_lines.append('exit')
+        advance_lines.append(
+            f'{vlan_id:<4} VLAN-{vlan_id:<11} {2048 + vlan_id:<6} 300   '
+            f'{_mac(0x020100000000 | (index << 16) | vlan_id, ":", False)} None'
+        )
+
+    outputs = {
+        'show ip vrf': '\n'.join(vrf_lines) + '\n',
+        'show running-config module vlan': '\n'.join(config_lines) + '\n',
+        'show vlan advance': '\n'.join(advance_lines) + '\n',
+    }
+    header = 'IP_ADDRESS     MAC_ADDRESS       VLAN  PORT  TYPE     TTL(10 Sec) TUNNEL'
+    for vrf_id in range(vrfs):
+        outputs[f'show ip arp vrfid {vrf_id}'] = '\n'.join([header] + arp[vrf_id]) + '\n'
+    return outputs
+
+
+def synthetic_fleet(routers=2, switches=20, hosts_per_switch=24, vlans=8, vrfs=4, seed=0, platform=DEFAULT_PLATFORM):
+    """Build a consistent fleet: switch `i` hangs off router `i % routers`."""
+    fleet = []
+    for index in range(routers):
+        served = range(index, switches, routers)
+        outputs = router_outputs(index, served, hosts_per_switch, vlans, vrfs, seed)
+        fleet.append(FarmDevice(f'R{index:03d}', 'router', platform, outputs))
+    for index in range(switches):
+        outputs = switch_outputs(index, hosts_per_switch, vlans, vrfs, seed)
+        fleet.append(FarmDevice(f'SW{index:04d}', 'switch', platform, outputs))
+    return fleet
+
+
+def sample_outputs(samples_dir):
+    """Return the first raw sample of each command under an ntc-templates tests/<platform> directory.
+
+    The command is the directory name with underscores turned into spaces, as the
+    ntc-templates index names it (show_mac-address-table -> show mac-address-table).
+    """
+    outputs = {}
+    for command_dir in sorted(glob.glob(os.path.join(samples_dir, '*'))):
+        raws = sorted(glob.glob(os.path.join(command_dir, '*.raw')))
+        if raws:
+            with open(raws[0]) as raw_file:
+                outputs[os.path.basename(command_dir).replace('_', ' ')] = raw_file.read()
+    return outputs
+
+
+def _prompt_name(device):
+    # VSP prompts carry the slot, as in "VSP-1:1#"
+    return f'{device.name}:1' if device.platform == 'extreme_vsp' else device.name
+
+
+class DeviceFarm:
+    """Serve a list of `FarmDevice` entries over SSH until stopped.
+
+    Args:
+        devices: `FarmDevice` entries, for example from `synthetic_fleet()`.
+        network: First loopback address; device `i` listens on the address `i + 1`
+            after it. None puts every device on 127.0.0.1, where only the port tells
+            them apart.
+        port: Port every device listens on; 0 picks a free port per device.
+        latency: Seconds each command takes before it answers.
+        jitter: Up to this many seconds added to or taken from the latency at random.
+        command_latency: Latency per command prefix, e.g. {'show ip arp': 0.5}, overriding `latency`.
+        drop_rate: Chance that a command drops the session instead of answering.
+        auth_failure_rate: Chance that a login is refused.
+        username, password: Required login; None accepts any.
+        banner: Present "Enter Ctrl-Y to begin" before the first prompt, as ERS does.
+        seed: Seed for the latency and failure draws.
+    """
+
+    def __init__(self, devices, network='127.1.0.0', port=0, latency=0.0, jitter=0.0, command_latency=None,
+                 drop_rate=0.0, auth_failure_rate=0.0, username=None, password=None, banner=False, seed=0):
+        import paramiko
+
+        self.devices = list(devices)
+        self.network = network
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.command_latency = command_latency or {}
+        self.drop_rate = drop_rate
+        self.auth_failure_rate = auth_failure_rate
+        self.username = username
+        self.password = password
+        self.banner = banner
+        self.addresses = []
+        self._rng = random.Random(seed)
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._listeners = []
+        self._transports = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._selector = None
+        self._acceptor = None
+
+    def start(self):
+        self._selector = selectors.DefaultSelector()
+        for index, device in enumerate(self.devices):
+            host = str(ipaddress.ip_address(self.network) + index + 1) if self.network else '127.0.0.1'
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((host, self.port))
+            listener.listen(16)
+            listener.setblocking(False)
+            self._listeners.append(listener)
+            self._selector.register(listener, selectors.EVENT_READ, device)
+            self.addresses.append(listener.getsockname())
+        self._acceptor = threading.Thread(target=self._accept_loop, name='devfarm-accept', daemon=True)
+        self._acceptor.start()
+        logger.info(f'Device farm serving {len(self.devices)} devices')
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._acceptor is not None:
+            self._acceptor.join()
+        for listener in self._listeners:
+            listener.close()
+        with self._lock:
+            transports = list(self._transports)
+        for transport in transports:
+            transport.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def inventory(self):
+        """Return (router_list, switch_list) of netscraper `Device` entries pointing at the farm."""
+        router_list, switch_list = [], []
+        for device, (host, port) in zip(self.devices, self.addresses):
+            entry = Device(host, device.role, device.platform, device.name, port)
+            (router_list if device.role == 'router' else switch_list).append(entry)
+        return router_list, switch_list
+
+    def write_inventory(self, directory):
+        """Write Router.csv and Switch.csv for `--batch` and return their paths."""
+        paths = []
+        for name, devices in zip(('Router.csv', 'Switch.csv'), self.inventory()):
+            path = os.path.join(directory, name)
+            with open(path, 'w', newline='') as inventory_file:
+                writer = csv.writer(inventory_file)
+                writer.writerow(['host', 'port', 'platform', 'site'])
+                for device in devices:
+                    writer.writerow([device.host, device.port, device.platform, device.site])
+            paths.append(path)
+        return paths
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            for key, _events in self._selector.select(timeout=0.2):
+                try:
+                    client, _address = key.fileobj.accept()
+                except BlockingIOError:
+                    continue
+                client.setblocking(True)
+                threading.Thread(target=self._serve, args=(client, key.data), daemon=True).start()
+        self._selector.close()
+
+    def _serve(self, client, device):
+        import paramiko
+
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self._host_key)
+        with self._lock:
+            self._transports.add(transport)
+        try:
+            server = _server_interface()(self)
+            transport.start_server(server=server)
+            channel = transport.accept(timeout=30)
+            if channel is None or not server.shell_requested.wait(timeout=30):
+                return
+            _Session(self, device, channel).run()
+        except (EOFError, OSError, paramiko.SSHException) as e:
+            logger.debug(f'Device farm session on {device.name} ended: {e}')
+        finally:
+            transport.close()
+            with self._lock:
+                self._transports.discard(transport)
+
+    def _delay(self, command):
+        latency = self.latency
+        for prefix, seconds in self.command_latency.items():
+            if command.startswith(prefix):
+                latency = seconds
+                break
+        delay = latency + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _fails(self, rate):
+        return rate > 0 and self._rng.random() < rate
+
+
+@functools.lru_cache(maxsize=None)
+def _server_interface():
+    # Built on first use so that importing the farm does not import paramiko
+    import paramiko
+
+    class SshServer(paramiko.ServerInterface):
+        def __init__(self, farm):
+            self.farm = farm
+            self.shell_requested = threading.Event()
+
+        def get_allowed_auths(self, username):
+            return 'password'
+
+        def check_auth_password(self, username, password):
+            farm = self.farm
+            if farm._fails(farm.auth_failure_rate):
+                return paramiko.AUTH_FAILED
+            if farm.username is not None and (username, password) != (farm.username, farm.password):
+                return paramiko.AUTH_FAILED
+            return paramiko.AUTH_SUCCESSFUL
+
+        def check_channel_request(self, kind, chanid):
+            if kind == 'session':
+                return paramiko.OPEN_SUCCEEDED
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+        def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+            return True
+
+        def check_channel_shell_request(self, channel):
+            self.shell_requested.set()
+            return True
+
+    return SshServer
+
+
+class _Session:
+    """One interactive CLI session: echoes keystrokes and answers each command line."""
+
+    def __init__(self, farm, device, channel):
+        self.farm = farm
+        self.device = device
+        self.channel = channel
+        self.enabled = False
+
+    def prompt(self):
+        return _prompt_name(self.device) + ('#' if self.enabled else '>')
+
+    def send(self, text):
+        self.channel.sendall(text.replace('\r\n', '\n').replace('\n', '\r\n').encode('utf-8'))
+
+    def run(self):
+        waiting_for_ctrl_y = self.farm.banner
+        self.send('\nEnter Ctrl-Y to begin.\n' if waiting_for_ctrl_y else '\n' + self.prompt())
+        line = []
+        previous = ''
+        while True:
+            data = self.channel.recv(4096)
+            if not data:
+                return
+            for char in data.decode('utf-8', 'replace'):
+                if waiting_for_ctrl_y:
+                    if char == '\x19':
+                        waiting_for_ctrl_y = False
+                        self.send('\n' + self.prompt())
+                    continue
+                if char in '\r\n':
+                    # A CR LF pair ends one line, not two
+                    if not (char == '\n' and previous == '\r'):
+                        if not self.execute(' '.join(''.join(line).split())):
+                            return
+                        line = []
+                elif char == '\x19':
+                    pass
+                else:
+                    line.append(char)
+                    self.channel.sendall(char.encode('utf-8'))
+                previous = char
+
+    def execute(self, command):
+        """Answer one command line; return False when the session should end."""
+        if command in ('exit', 'logout'):
+            return False
+        if command:
+            self.farm._delay(command)
+            if self.farm._fails(self.farm.drop_rate):
+                logger.debug(f'Device farm dropped {self.device.name} on "{command}"')
+                return False
+        if command in ('enable', 'en'):
+            self.enabled = True
+            output = ''
+        elif command == 'disable':
+            self.enabled = False
+            output = ''
+        elif not command or command.startswith(SESSION_COMMANDS):
+            output = ''
+        elif command in self.device.outputs:
+            output = self.device.outputs[command]
+        elif command.startswith('show ip arp vrfid'):
+            # A VRF the router does not hold answers with an empty table
+            output = ''
+        else:
+            output = INVALID_INPUT + '\n'
+        if output and not output.endswith('\n'):
+            output += '\n'
+        self.send('\n' + output + self.prompt())
+        return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='netscraper.devfarm', description='Serve simulated ERS/VSP devices over SSH.')
+    parser.add_argument('--routers', type=int, default=2, help='number of routers')
+    parser.add_argument('--switches', type=int, default=20, help='number of switches')
+    parser.add_argument('--hosts', type=int, default=24, help='endpoints behind each switch')
+    parser.add_argument('--vlans', type=int, default=8, help='VLANs per router')
+    parser.add_argument('--vrfs', type=int, default=4, help='VRFs per router, including GlobalRouter')
+    parser.add_argument('--platform', default=DEFAULT_PLATFORM, help='netmiko device type written to the inventory')
+    parser.add_argument('--samples', help='ntc-templates tests/<platform> directory whose raw outputs the switches answer with')
+    parser.add_argument('--network', default='127.1.0.0', help='first loopback address (use "none" for 127.0.0.1 only)')
+    parser.add_argument('--port', type=int, default=2222, help='SSH port on every address (0 picks free ports)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per command')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds added to the latency')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='chance a command drops the session')
+    parser.add_argument('--auth-failure-rate', type=float, default=0.0, help='chance a login is refused')
+    parser.add_argument('--banner', action='store_true', help='require Ctrl-Y before the first prompt')
+    parser.add_argument('--seed', type=int, default=0, help='seed for generated data and injected failures')
+    parser.add_argument('--write-inventory', metavar='DIR', help='write Router.csv and Switch.csv for --batch runs')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    devices = synthetic_fleet(args.routers, args.switches, args.hosts, args.vlans, args.vrfs, args.seed, args.platform)
+    if args.samples:
+        samples = sample_outputs(args.samples)
+        devices = [
+            device._replace(outputs={**device.outputs, **samples}) if device.role == 'switch' else device
+            for device in devices
+        ]
+
+    farm = DeviceFarm(
+        devices,
+        network=None if args.network.lower() == 'none' else args.network,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        auth_failure_rate=args.auth_failure_rate,
+        banner=args.banner,
+        seed=args.seed,
+    )
+    with farm:
+        if args.write_inventory:
+            os.makedirs(args.write_inventory, exist_ok=True)
+            for path in farm.write_inventory(args.write_inventory):
+                print(f'Wrote {path}')
+        first, last = farm.addresses[0], farm.addresses[-1]
+        print(f'Serving {len(devices)} devices on {first[0]}:{first[1]} .. {last[0]}:{last[1]}; Ctrl-C to stop.')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
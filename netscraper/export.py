@@ -0,0 +1,355 @@
+"""Report writers: the Excel workbook, typed dataset files and the optional VRF id list.
+
+Each run can write any of the formats in `EXPORTERS`. Excel is the formatted
+report for people. CSV, JSON Lines, Parquet and SQLite write every table in
+`DATASETS` as a separate dataset with typed columns, for tools to query.
+
+openpyxl and pyarrow are imported inside the functions so that importing the
+collectors or merge logic does not pay for them.
+"""
+
+import collections
+import csv
+import json
+import logging
+import os
+import sqlite3
+
+from netscraper.table import Table
+
+logger = logging.getLogger(__name__)
+
+# First column of each reference table beside the endpoint table, as in earlier reports
+REFERENCE_TABLE_COLUMNS = (('vlans', 12), ('vrfs', 20), ('vlan_advance', 23))
+
+# Black separator columns K, S and V between the tables
+SEPARATOR_COLUMNS = (11, 19, 22)
+
+# Endpoint values coloured green or red
+STATUS_COLOURS = {'OPER': ('Up', 'Down'), 'PING_STATUS': ('Good', 'Bad')}
+
+# Tables of a merged report written by the dataset formats, when present
+DATASETS = ('endpoints', 'vlans', 'vrfs', 'vlan_advance', 'ping_results')
+
+# Columns that hold numbers; every other column is text
+COLUMN_TYPES = {
+    'UNIT': int,
+    'PORT': int,
+    'VLAN': int,
+    'VLAN_ID': int,
+    'VRF_ID': int,
+    'ISID': int,
+    'SENT': int,
+    'RECEIVED': int,
+    'LOSS': float,
+    'RTT_MS': float,
+}
+
+# Columns indexed in the SQLite export, per dataset
+SQLITE_INDEXES = {
+    'endpoints': ('MAC', 'IP_ADDRESS', 'VLAN', 'VRF_ID'),
+    'vlans': ('VLAN_ID',),
+    'vrfs': ('VRF_ID',),
+    'vlan_advance': ('VLAN_ID', 'MAC_ADDRESS'),
+    'ping_results': ('IP_ADDRESS',),
+}
+
+HEADER_STYLE = 'netscraper_header'
+CELL_STYLE = 'netscraper_cell'
+SEPARATOR_STYLE = 'netscraper_separator'
+
+
+def _table_columns(rows):
+    # Column order of the first row that has each key, like pandas.DataFrame(rows)
+    if isinstance(rows, Table):
+        return rows.columns
+    return list(dict.fromkeys(key for row in rows for key in row))
+
+
+def _distinct_values(rows, column):
+    if isinstance(rows, Table):
+        return rows.column(column).distinct()
+    return (row.get(column) for row in rows)
+
+
+def _add_named_styles(wb):
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    thin = Side(style='thin')
+    medium = Side(style='medium')
+    centre = Alignment(horizontal='center', vertical='center')
+
+    header = NamedStyle(name=HEADER_STYLE)
+    header.font = Font(bold=True)
+    header.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    header.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+    header.border = Border(left=medium, right=medium, top=medium, bottom=medium)
+
+    cell = NamedStyle(name=CELL_STYLE)
+    cell.font = Font(name='Calibri', size=11)
+    cell.alignment = centre
+    cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    separator = NamedStyle(name=SEPARATOR_STYLE)
+    separator.font = Font(name='Calibri', size=11)
+    separator.alignment = centre
+    separator.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    separator.fill = PatternFill(start_color='000000', end_color='000000', fill_type='solid')
+
+    for style in (header, cell, separator):
+        wb.add_named_style(style)
+
+
+def _add_status_colours(ws, endpoint_columns, max_row):
+    from openpyxl.formatting.rule import CellIsRule
+    from openpyxl.styles import PatternFill
+    from openpyxl.utils import get_column_letter
+
+    green_fill = PatternFill(start_color='00FF00', end_color='00FF00', fill_type='solid')
+    red_fill = PatternFill(start_color='FF0000', end_color='FF0000', fill_type='solid')
+
+    for column, (good, bad) in STATUS_COLOURS.items():
+        if column not in endpoint_columns or max_row < 2:
+            continue
+        letter = get_column_letter(endpoint_columns.index(column) + 1)
+        cell_range = f'{letter}2:{letter}{max_row}'
+        ws.conditional_formatting.add(cell_range, CellIsRule(operator='equal', formula=[f'"{good}"'], fill=green_fill))
+        ws.conditional_formatting.add(cell_range, CellIsRule(operator='equal', formula=[f'"{bad}"'], fill=red_fill))
+
+
+def _column_widths(layout, max_col):
+    """Return the width of every sheet column: its longest value plus 2, as the old writer sized them.
+
+    Write-only sheets store the widths ahead of the rows, so this reads the
+    source rows rather than the cells.
+    """
+    widths = [0] * (max_col + 1)
+    for rows, start, columns in layout:
+        for offset, column in enumerate(columns):
+            longest = len(str(column))
+            for value in _distinct_values(rows, column):
+                if value is not None and len(str(value)) > longest:
+                    longest = len(str(value))
+            widths[start + offset] = max(widths[start + offset], longest)
+    return [width + 2 for width in widths]
+
+
+def _sheet_rows(layout, max_row, max_col):
+    """Yield the sheet one row of values at a time, the tables side by side."""
+    header = [None] * max_col
+    for _rows, start, columns in layout:
+        header[start - 1:start - 1 + len(columns)] = columns
+    yield header
+
+    for index in range(max_row - 1):
+        values = [None] * max_col
+        for rows, start, columns in layout:
+            if index < len(rows):
+                row = rows[index]
+                values[start - 1:start - 1 + len(columns)] = [row.get(column) for column in columns]
+        yield values
+
+
+def export_to_excel(endpoints, reference_tables, excel_path):
+    """Write the endpoint table with the VLAN, VRF and VLAN-advance tables beside it.
+
+    The workbook is streamed in one pass with openpyxl's write-only mode. The cells
+    share three named styles, and the OPER and PING_STATUS colours are conditional
+    formatting rules. Memory use does not grow with the row count beyond the rows
+    already in `endpoints`.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    tables = [(endpoints, 1)] + [(reference_tables[name], start) for name, start in REFERENCE_TABLE_COLUMNS]
+    layout = [(rows, start, _table_columns(rows)) for rows, start in tables]
+    max_row = max(len(rows) for rows, _start in tables) + 1
+    max_col = max([start + len(columns) - 1 for _rows, start, columns in layout] + list(SEPARATOR_COLUMNS))
+
+    wb = Workbook(write_only=True)
+    _add_named_styles(wb)
+    ws = wb.create_sheet()
+
+    for column, width in enumerate(_column_widths(layout, max_col)[1:], 1):
+        ws.column_dimensions[get_column_letter(column)].width = width
+    _add_status_colours(ws, layout[0][2], max_row)
+
+    rows = _sheet_rows(layout, max_row, max_col)
+    header = []
+    for value in next(rows):
+        cell = WriteOnlyCell(ws, value)
+        cell.style = HEADER_STYLE
+        header.append(cell)
+    ws.append(header)
+
+    # A write-only sheet serialises each row as it is appended, so one styled cell
+    # per column is reused for every row instead of building a cell per value
+    cells = []
+    for column in range(1, max_col + 1):
+        cell = WriteOnlyCell(ws)
+        cell.style = SEPARATOR_STYLE if column in SEPARATOR_COLUMNS else CELL_STYLE
+        cells.append(cell)
+    for values in rows:
+        for cell, value in zip(cells, values):
+            cell.value = value
+        ws.append(cells)
+
+    wb.save(excel_path)
+    return excel_path
+
+
+class ExportError(Exception):
+    """A report format cannot be written."""
+
+
+def _typed(value, column):
+    # Empty strings from TextFSM become nulls; a number column that holds text raises ValueError
+    if value is None or value == '':
+        return None
+    return COLUMN_TYPES.get(column, str)(value)
+
+
+def _typed_rows(name, columns, rows):
+    """Yield `rows` as tuples of typed values, logging the numbers that could not be read once they are done.
+
+    Such a value is written as null, since the Parquet and SQLite columns are typed.
+    """
+    dropped = collections.Counter()
+    examples = {}
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row.get(column)
+            try:
+                values.append(_typed(value, column))
+            except ValueError:
+                dropped[column] += 1
+                examples.setdefault(column, value)
+                values.append(None)
+        yield tuple(values)
+    for column, count in dropped.items():
+        logger.warning(
+            f'{name}: {count} {column} value(s) could not be read as {COLUMN_TYPES[column].__name__} and were '
+            f'written as empty, such as {examples[column]!r}'
+        )
+
+
+def typed_datasets(report):
+    """Yield (name, columns, rows) for each dataset in the report, with typed values.
+
+    The rows are a generator of tuples in `columns` order, so each dataset is
+    streamed rather than copied.
+    """
+    for name in DATASETS:
+        if name not in report:
+            continue
+        rows = report[name]
+        columns = _table_columns(rows)
+        yield name, columns, _typed_rows(name, columns, rows)
+
+
+def _dataset_dir(output_path):
+    os.makedirs(output_path, exist_ok=True)
+    return output_path
+
+
+def export_to_csv(report, output_path):
+    """Write one CSV file per dataset into the directory `output_path`."""
+    directory = _dataset_dir(output_path)
+    for name, columns, rows in typed_datasets(report):
+        with open(os.path.join(directory, f'{name}.csv'), 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    return directory
+
+
+def export_to_jsonl(report, output_path):
+    """Write one JSON Lines file per dataset into the directory `output_path`."""
+    directory = _dataset_dir(output_path)
+    for name, columns, rows in typed_datasets(report):
+        with open(os.path.join(directory, f'{name}.jsonl'), 'w') as jsonl_file:
+            for row in rows:
+                jsonl_file.write(json.dumps(dict(zip(columns, row))) + '\n')
+    return directory
+
+
+def export_to_parquet(report, output_path):
+    """Write one Parquet file per dataset into the directory `output_path`. Needs pyarrow."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ExportError('The parquet format needs pyarrow: pip install pyarrow') from err
+
+    arrow_types = {int: pyarrow.int64(), float: pyarrow.float64(), str: pyarrow.string()}
+    directory = _dataset_dir(output_path)
+    for name, columns, rows in typed_datasets(report):
+        schema = pyarrow.schema([(column, arrow_types[COLUMN_TYPES.get(column, str)]) for column in columns])
+        table = pyarrow.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=schema)
+        pyarrow.parquet.write_table(table, os.path.join(directory, f'{name}.parquet'))
+    return directory
+
+
+def export_to_sqlite(report, output_path):
+    """Write every dataset as a table of one SQLite file, with indexes on the lookup columns."""
+    sqlite_types = {int: 'INTEGER', float: 'REAL', str: 'TEXT'}
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    connection = sqlite3.connect(output_path)
+    try:
+        with connection:
+            for name, columns, rows in typed_datasets(report):
+                if not columns:
+                    continue
+                definitions = ', '.join(f'"{column}" {sqlite_types[COLUMN_TYPES.get(column, str)]}' for column in columns)
+                connection.execute(f'CREATE TABLE "{name}" ({definitions})')
+                placeholders = ', '.join('?' * len(columns))
+                connection.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', rows)
+                for column in SQLITE_INDEXES.get(name, ()):
+                    if column in columns:
+                        connection.execute(f'CREATE INDEX "{name}_{column}" ON "{name}" ("{column}")')
+    finally:
+        connection.close()
+    return output_path
+
+
+def _export_excel(report, output_path):
+    return export_to_excel(report['endpoints'], report, output_path)
+
+
+# Format name -> (file extension, or '' for a directory of per-dataset files, writer)
+EXPORTERS = {
+    'excel': ('.xlsx', _export_excel),
+    'csv': ('', export_to_csv),
+    'jsonl': ('', export_to_jsonl),
+    'parquet': ('', export_to_parquet),
+    'sqlite': ('.sqlite', export_to_sqlite),
+}
+
+
+def export_report(report, output_path, formats=('excel',)):
+    """Write the report in each of `formats` and return the paths written.
+
+    `output_path` names the run without an extension (one given is dropped). The
+    single-file formats add their own extension, and the others write a directory
+    of that name holding one file per dataset.
+    """
+    base_path, _extension = os.path.splitext(output_path)
+    unknown = [output_format for output_format in formats if output_format not in EXPORTERS]
+    if unknown:
+        raise ExportError(f'Unknown export format: {", ".join(unknown)}')
+    paths = []
+    for output_format in formats:
+        extension, writer = EXPORTERS[output_format]
+        paths.append(writer(report, base_path + extension))
+    return paths
+
+
+def export_vrf_list(vrfs, vrf_list_path):
+    """Write the VRF ids seen on any router, one per line, as Vrf_List.txt used to hold."""
+    with open(vrf_list_path, 'w') as vrf_file:
+        for vrf_id in sorted({vrf['VRF_ID'] for vrf in vrfs}):
+            vrf_file.write(f'{vrf_id}\n')
+    return vrf_list_path
@@ -0,0 +1,196 @@
+"""Native parsers for the ERS templates that do most of the parsing in a run.
+
+Each parser reproduces one TextFSM template exactly: the same records, the
+same columns in the same order, '' for values a line did not set. A parser
+takes the output's lines and yields each record once it is complete. Where the
+TextFSM engine tries every rule's regex on every line, these parsers skip
+lines that cannot match, and fold rules with a common prefix into one regex
+whose alternatives keep the rules' order. Rules with no captures and no
+record or state change (header and separator lines) are left out, since
+TextFSM does nothing when they match.
+
+Every parser is registered with the SHA-256 of the template file it
+reproduces. `FAST_PARSERS.get()` only returns a parser while the template on
+disk still has that hash. After an edit to the template, parsing falls back to
+TextFSM until the parser is updated to match. tests/test_fastparse.py checks
+each parser against TextFSM.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class FastParserRegistry:
+    """Native parsers keyed by template file name, each tied to the template text it reproduces."""
+
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._parsers = {}  # template name -> (sha256, parser)
+        self._checked = {}  # template path -> (mtime, parser or None)
+
+    def register(self, template_name, sha256):
+        """Decorator registering a parser for the template file `template_name` with this hash."""
+        def decorator(parser):
+            self._parsers[template_name] = (sha256, parser)
+            return parser
+        return decorator
+
+    def names(self):
+        return sorted(self._parsers)
+
+    def get(self, template_path):
+        """Return the native parser for `template_path`, or None to parse it with TextFSM."""
+        if not self.enabled:
+            return None
+        entry = self._parsers.get(os.path.basename(template_path))
+        if entry is None:
+            return None
+        mtime = os.stat(template_path).st_mtime_ns
+        with self._lock:
+            checked = self._checked.get(template_path)
+        if checked is not None and checked[0] == mtime:
+            return checked[1]
+
+        sha256, parser = entry
+        with open(template_path, 'rb') as template_file:
+            if hashlib.sha256(template_file.read()).hexdigest() != sha256:
+                logger.warning(f'{template_path} has changed since its fast parser was written; parsing it with TextFSM')
+                parser = None
+        with self._lock:
+            self._checked[template_path] = (mtime, parser)
+        return parser
+
+    def clear(self):
+        """Forget which templates were checked, so the next lookup hashes them again."""
+        with self._lock:
+            self._checked.clear()
+
+
+FAST_PARSERS = FastParserRegistry()
+
+
+# The template's Trunk:, Port: and Unit:/Port: rules share everything up to the
+# source column, which only one split of the line can match, so one regex with
+# the three sources as alternatives in rule order picks the same rule.
+MAC_RECORD = re.compile(
+    r'^(\S+)\s+(\d+)\s+(\S+)\s+'
+    r'(?:Trunk:\s*(\d*)\s*|Port:\s*(\d*)\s*|Unit:\s*(\d*)\s+Port:\s*(\d*)\s*)'
+)
+
+
+@FAST_PARSERS.register(
+    'extreme_ers_show_mac-address-table.textfsm',
+    '215d2641c5b614f6bd2331c979a7f9752402c70b5eb3093a1366ae676cdcca5b',
+)
+def parse_mac_address_table(lines):
+    for line in lines:
+        if 'Trunk:' not in line and 'Port:' not in line:
+            continue
+        match = MAC_RECORD.match(line)
+        if match is None:
+            continue
+        mac_address, vid, entry_type, trunk, port, unit, unit_port = match.groups()
+        yield {
+            'MAC_ADDRESS': mac_address,
+            'VID': vid,
+            'TYPE': entry_type,
+            'UNIT': unit or '',
+            'PORT': port or unit_port or '',
+            'TRUNK': trunk or '',
+        }
+
+
+ARP_RECORD = re.compile(
+    r'^(\d+\.\d+\.\d+\.\d+)\s+([0-9A-Fa-f:]+)\s+\d+\s+\S+\s+\S+\s+\d+\s+(\S*)'
+)
+
+
+@FAST_PARSERS.register(
+    'extreme_ers_show_ip_arp_vrfid.textfsm',
+    'fa57474954fc87efd46924949abe0b9022a811ec1b7e823957135c79f0bf5528',
+)
+def parse_ip_arp_vrfid(lines):
+    for line in lines:
+        # Records start with a digit; the header and timing lines cannot
+        if not line[:1].isdecimal():
+            continue
+        match = ARP_RECORD.match(line)
+        if match is not None:
+            ip_address, mac_address, tunnel = match.groups()
+            yield {'MAC_ADDRESS': mac_address, 'IP_ADDRESS': ip_address, 'TUNNEL': tunnel}
+
+
+INTERFACE_NAME_RECORD = re.compile(r'^((\d+)/)?(\d+)\s+([\S ]+)')
+
+
+@FAST_PARSERS.register(
+    'extreme_ers_show_interface_name.textfsm',
+    '2c1aeb9bda1e1f3ec1715e00e145689c57d08e20f07163deb334cb7c809dda1b',
+)
+def parse_interface_name(lines):
+    for line in lines:
+        if not line[:1].isdecimal():
+            continue
+        match = INTERFACE_NAME_RECORD.match(line)
+        if match is not None:
+            _unit_slash, unit, port, name = match.groups()
+            yield {'UNIT': unit or '', 'PORT': port, 'NAME': name}
+
+
+INTERFACES_FIELDS = (
+    'UNIT_PORT', 'TRUNK', 'ADMIN_STATUS', 'OPER_STATUS', 'LINK_STATUS',
+    'LINK_TRAP', 'NEGOTIATION', 'SPEED', 'DUPLEX', 'FLOW_CONTROL',
+)
+_PORT_HEADER = r'^\s*Port\s+Trunk\s+Admin\s+Oper\s+Link\s+LinkTrap\s+Negotiation\s+Speed\s+Duplex\s+Control'
+_PORT_HEADER_NO_TRUNK = r'^\s*Port\s+Admin\s+Oper\s+Link\s+LinkTrap\s+Negotiation\s+Speed\s+Duplex\s+Control'
+# The template's states: (rule regex, next state) in rule order
+INTERFACES_START = tuple((re.compile(regex), state) for regex, state in (
+    (r'^\s*Status\s+Auto\s+Flow', 'Headers'),
+    (r'^\s*Unit\s+Status\s+Auto\s+Flow', 'Headers'),
+    (_PORT_HEADER, 'Headers'),
+    (_PORT_HEADER_NO_TRUNK, 'Headers'),
+    (r'^\s*----\s+(?:-----\s+)?-------\s+----\s+----\s+--------\s+-----------\s+--------\s+------\s+-------', 'RecordStart'),
+))
+INTERFACES_HEADERS = tuple((re.compile(regex), 'RecordStart') for regex in (_PORT_HEADER, _PORT_HEADER_NO_TRUNK))
+INTERFACES_RECORDS = (
+    re.compile(
+        r'^\s*(?P<UNIT_PORT>\d+(?:/\d+)?)\s+(?:(?P<TRUNK>\d*)\s+)?(?P<ADMIN_STATUS>\S+)\s+(?P<OPER_STATUS>\S+)'
+        r'\s+(?P<LINK_STATUS>\S+)\s+(?P<LINK_TRAP>\S+)\s+(?P<NEGOTIATION>\S+)'
+        r'(\s+(?P<SPEED>\S*))?(\s+(?P<DUPLEX>\S*))?(\s+(?P<FLOW_CONTROL>\S*))?\s*$'
+    ),
+    re.compile(
+        r'^\s*(?P<UNIT_PORT>\d+(?:/\d+)?)\s+(?P<ADMIN_STATUS>\S+)\s+(?P<OPER_STATUS>\S+)'
+        r'\s+(?P<LINK_STATUS>\S+)\s+(?P<LINK_TRAP>\S+)\s+(?P<NEGOTIATION>\S+)'
+        r'(\s+(?P<SPEED>\S*))?(\s+(?P<DUPLEX>\S*))?(\s+(?P<FLOW_CONTROL>\S*))?\s*$'
+    ),
+)
+
+
+@FAST_PARSERS.register(
+    'extreme_ers_show_interfaces.textfsm',
+    '9d7aace91c63e58d48061ee637d03eeffb943a027de0157769b862de7187d6ee',
+)
+def parse_interfaces(lines):
+    state = 'Start'
+    for line in lines:
+        if state == 'RecordStart':
+            # The state is never left; its rules only match lines starting with a port number
+            if not line.lstrip()[:1].isdecimal():
+                continue
+            for regex in INTERFACES_RECORDS:
+                match = regex.match(line)
+                if match is not None:
+                    values = match.groupdict()
+                    yield {name: values.get(name) or '' for name in INTERFACES_FIELDS}
+                    break
+            continue
+        for regex, next_state in INTERFACES_START if state == 'Start' else INTERFACES_HEADERS:
+            if regex.match(line):
+                state = next_state
+                break
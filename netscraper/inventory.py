@@ -0,0 +1,112 @@
+"""Device inventories and stored credentials for unattended runs.
+
+Router.txt and Switch.txt may be plain text (one host per line), CSV with a
+`host` column, or YAML. CSV and YAML entries can also set a per-device
+`platform` (the netmiko device type), `site` and SSH `port`.
+"""
+
+import csv
+import os
+
+from netscraper.collectors import DEFAULT_PLATFORM, Credentials, Device
+
+# Service name used by password_encrypt.py
+KEYRING_SERVICE = 'network'
+
+
+class InventoryError(Exception):
+    """Error that is raised when an inventory file or credential store cannot be used."""
+
+
+def _device(entry, role, source):
+    if isinstance(entry, str):
+        entry = {'host': entry}
+    host = (entry.get('host') or entry.get('ip') or '').strip()
+    if not host:
+        raise InventoryError(f'{source}: device entry without a host: {entry!r}')
+    port = str(entry.get('port') or 22).strip()
+    if not port.isdigit():
+        raise InventoryError(f'{source}: invalid port for {host}: {port!r}')
+    return Device(
+        host=host,
+        role=(entry.get('role') or role).strip(),
+        platform=(entry.get('platform') or DEFAULT_PLATFORM).strip(),
+        site=(entry.get('site') or '').strip(),
+        port=int(port),
+    )
+
+
+def _read_text(inventory_file):
+    for line in inventory_file:
+        line = line.split('#', 1)[0].strip()
+        if line:
+            yield line
+
+
+def _read_csv(inventory_file):
+    # Only whole rows are comments; a value such as a description may hold a '#'
+    rows = (
+        row for row in csv.reader(inventory_file)
+        if any(cell.strip() for cell in row) and not row[0].lstrip().startswith('#')
+    )
+    keys = [key.strip().lower() for key in next(rows, [])]
+    for row in rows:
+        yield {key: value for key, value in zip(keys, row) if key}
+
+
+def _read_yaml(inventory_file, source):
+    import yaml
+
+    data = yaml.safe_load(inventory_file) or []
+    if isinstance(data, dict):
+        data = data.get('devices', [])
+    if not isinstance(data, list):
+        raise InventoryError(f'{source}: expected a list of devices or a "devices" key')
+    for entry in data:
+        if isinstance(entry, str):
+            yield entry
+        else:
+            # A key left empty (`site:`) is None, which is not the text "None"
+            yield {str(key).lower(): str(value) for key, value in entry.items() if value is not None}
+
+
+def load_inventory(path, role):
+    """Return the devices listed in `path`, de-duplicated by host and port in file order.
+
+    Args:
+        path: Inventory file; the format is picked by extension (.csv, .yml/.yaml, anything else is plain text).
+        role: `router` or `switch`, used when an entry does not set its own role.
+
+    Returns:
+        list: `Device` tuples.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='') as inventory_file:
+        if extension == '.csv':
+            entries = list(_read_csv(inventory_file))
+        elif extension in ('.yml', '.yaml'):
+            entries = list(_read_yaml(inventory_file, path))
+        else:
+            entries = list(_read_text(inventory_file))
+
+    devices = {}
+    for entry in entries:
+        device = _device(entry, role, path)
+        devices.setdefault((device.host, device.port), device)
+    return list(devices.values())
+
+
+def load_keyring_credentials(service=KEYRING_SERVICE):
+    """Return the credentials stored by password_encrypt.py."""
+    try:
+        import keyring
+    except ImportError as err:
+        raise InventoryError("Batch mode reads credentials from the keyring; 'pip install keyring' first.") from err
+
+    values = {name: keyring.get_password(service, name) for name in Credentials._fields}
+    missing = [name for name, value in values.items() if value is None]
+    if missing:
+        raise InventoryError(
+            f'No keyring entry for {", ".join(missing)} in service "{service}"; run password_encrypt.py first.'
+        )
+    return Credentials(**values)
@@ -0,0 +1,51 @@
+"""Logging setup for scraper runs.
+
+Device threads only put their records on a queue. One listener thread formats
+them and writes them to the log file and the console, so a slow terminal or
+disk never holds up collection. Raw command outputs are not logged; archive
+them with `--capture` instead.
+"""
+
+import logging
+import logging.handlers
+import queue
+import sys
+
+from netscraper.config import LOG_PATH
+
+FILE_FORMAT = '%(asctime)s %(levelname)-7s [%(threadName)s] %(name)s: %(message)s'
+CONSOLE_FORMAT = '%(message)s'
+
+# Per-connection chatter from the SSH libraries, kept out of the log below WARNING
+QUIET_LOGGERS = ('paramiko', 'netmiko')
+
+
+def configure_logging(log_path=LOG_PATH, level=logging.INFO, console=True):
+    """Send every log record through a queue to `log_path` and, optionally, stdout.
+
+    Replaces the handlers of the root logger. The returned
+    `logging.handlers.QueueListener` is already running; call its `stop()` at
+    the end of the run to flush the records still queued.
+    """
+    handlers = []
+    if log_path:
+        file_handler = logging.FileHandler(log_path, encoding='utf-8')
+        file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    return listener
@@ -0,0 +1,206 @@
+"""Memo of parsed rows, keyed by template and a hash of the raw output.
+
+Many outputs do not change between polling cycles (`show ip vrf`, `show vlan
+advance`, the VLAN running-config), and access switches often return
+byte-identical outputs. `ParseMemo` keeps the rows parsed from recent outputs,
+so an output seen before is answered without running the parser again.
+
+A key is the template's path, mtime and size plus a BLAKE2b hash of the
+output, so editing a template stops its old entries from matching. Rows are
+stored once, as one tuple of values per row, and a lookup builds new dicts
+from them; callers can tag and modify the rows they get back. The memo holds
+at most `max_entries` outputs and `max_rows` rows, and evicts the least
+recently used entries beyond either. It can be saved to and loaded from a
+gzip-compressed JSON Lines file, to carry it from one run to the next.
+"""
+
+import collections
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+# Raised whenever parsing changes the rows an output gives, so saved memos of the old rows are not loaded
+MEMO_FORMAT = 2
+
+
+def template_identity(template_path):
+    """Return (path, mtime, size) of the template, or None if it cannot be read."""
+    path = os.path.abspath(template_path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def freeze(rows):
+    """Return `rows` as (header, value tuples, list columns), or None if the rows do not share one header."""
+    if not rows:
+        return (), (), ()
+    header = tuple(rows[0])
+    values = []
+    for row in rows:
+        if tuple(row) != header:
+            return None
+        values.append(tuple(row.values()))
+    lists = tuple(index for index, value in enumerate(values[0]) if isinstance(value, list))
+    if lists:
+        for index, row in enumerate(values):
+            row = list(row)
+            for column in lists:
+                row[column] = tuple(row[column])
+            values[index] = tuple(row)
+    return header, tuple(values), lists
+
+
+def thaw(frozen):
+    """Return new row dicts from the output of `freeze`."""
+    header, values, lists = frozen
+    if not lists:
+        return [dict(zip(header, row)) for row in values]
+    rows = []
+    for row in values:
+        entry = dict(zip(header, row))
+        for column in lists:
+            entry[header[column]] = list(row[column])
+        rows.append(entry)
+    return rows
+
+
+class ParseMemo:
+    """Thread-safe LRU memo of parsed rows; see the module docstring.
+
+    Args:
+        max_entries: Outputs remembered at most.
+        max_rows: Rows remembered at most, over all outputs. An output with more
+            rows than this is not remembered.
+    """
+
+    def __init__(self, max_entries=4096, max_rows=100000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, output, template_path):
+        """Return the memo key of `output` parsed with `template_path`, or None when it cannot be memoized."""
+        if not self.enabled:
+            return None
+        identity = template_identity(template_path)
+        if identity is None:
+            return None
+        return identity + (hashlib.blake2b(output.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest(),)
+
+    def get(self, key):
+        """Return new rows for `key` if it is remembered, or None."""
+        if key is None:
+            return None
+        with self._lock:
+            frozen = self._entries.get(key)
+            if frozen is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return thaw(frozen)
+
+    def put(self, key, frozen):
+        """Remember the output of `freeze` under `key`."""
+        if key is None or frozen is None or len(frozen[1]) > self.max_rows:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._rows -= len(previous[1])
+            self._entries[key] = frozen
+            self._rows += len(frozen[1])
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                _key, evicted = self._entries.popitem(last=False)
+                self._rows -= len(evicted[1])
+                self.evictions += 1
+
+    def stats(self):
+        """Return the hit and miss counters, the hit rate and what the memo holds."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'rows': self._rows,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        """Forget every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def save(self, path):
+        """Write the entries to `path`, least recently used first. Returns the number written."""
+        with self._lock:
+            entries = list(self._entries.items())
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as memo_file:
+            memo_file.write(json.dumps({'format': MEMO_FORMAT}) + '\n')
+            for (template, mtime_ns, size, digest), (header, values, lists) in entries:
+                memo_file.write(json.dumps({
+                    'template': template,
+                    'mtime_ns': mtime_ns,
+                    'size': size,
+                    'digest': digest,
+                    'header': header,
+                    'rows': values,
+                    'lists': lists,
+                }) + '\n')
+        os.replace(temp_path, path)
+        return len(entries)
+
+    def load(self, path):
+        """Add the entries saved in `path`, skipping those whose template has changed since.
+
+        Returns the number of entries added; 0 if the file is missing or was written
+        by another version of the memo.
+        """
+        try:
+            memo_file = gzip.open(path, 'rt', encoding='utf-8')
+        except OSError:
+            return 0
+        loaded = 0
+        identities = {}
+        with memo_file:
+            try:
+                if json.loads(memo_file.readline() or '{}').get('format') != MEMO_FORMAT:
+                    return 0
+                for line in memo_file:
+                    entry = json.loads(line)
+                    template = entry['template']
+                    if template not in identities:
+                        identities[template] = template_identity(template)
+                    if identities[template] != (template, entry['mtime_ns'], entry['size']):
+                        continue
+                    lists = tuple(entry['lists'])
+                    values = tuple(
+                        tuple(tuple(value) if column in lists else value for column, value in enumerate(row))
+                        for row in entry['rows']
+                    )
+                    self.put(identities[template] + (entry['digest'],), (tuple(entry['header']), values, lists))
+                    loaded += 1
+            except (OSError, EOFError, ValueError, KeyError):
+                pass  # a truncated or damaged file keeps the entries read so far
+        return loaded
+
+
+PARSE_MEMO = ParseMemo()
@@ -0,0 +1,221 @@
+"""Hash-indexed joins for the MAC/port/ARP/port-status merge stage.
+
+Each join builds its lookup index once and then makes a single pass over the rows,
+so the whole merge is linear in the size of its inputs. Row order, first-match
+semantics and the output columns are the same as the original nested-loop merge.
+
+`merge_endpoints` runs the joins on compact `netscraper.table.Table`s, keyed by
+integer MACs and interned codes, and returns the endpoints as a `Table`. The
+list-of-dict functions below do the same joins row by row.
+"""
+
+from netscraper.table import (
+    ARP_TABLE_SCHEMA,
+    ENDPOINT_SCHEMA,
+    MAC_TABLE_SCHEMA,
+    NO_MAC,
+    PORT_STATUS_TABLE_SCHEMA,
+    PORT_TABLE_SCHEMA,
+    Interner,
+    Table,
+)
+
+
+def normalize_mac(mac_address):
+    return mac_address.replace(":", "-").lower()
+
+
+def _index_all(rows, key):
+    """Group `rows` by `key(row)`, keeping every row in input order."""
+    index = {}
+    for row in rows:
+        index.setdefault(key(row), []).append(row)
+    return index
+
+
+def _index_first(rows, key):
+    """Map `key(row)` to the first row with that key, like a `break` on first match."""
+    index = {}
+    for row in rows:
+        index.setdefault(key(row), row)
+    return index
+
+
+def _merged_row(port_entry, vlan=None, mac=None):
+    return {
+        'UNIT': port_entry.get('UNIT', ''),
+        'PORT': port_entry['PORT'],
+        'NAME': port_entry['NAME'],
+        'VLAN': vlan,
+        'MAC': mac,
+        'IP_ADDRESS': None,  # Default to None
+        'OPER': None,  # Default to None
+        'SPEED': None,  # Default to None
+        'PING_STATUS': '',  # Default to empty
+        'VRF_ID': None  # Default to None
+    }
+
+
+def merge_mac_and_port_tables(mac_table, port_list):
+    # One row per learned MAC on the port, or a single empty row if nothing was learned
+    macs_by_port = _index_all(mac_table, lambda mac_entry: (mac_entry.get('UNIT'), mac_entry['PORT']))
+
+    merged_list = []
+    for port_entry in port_list:
+        port_macs = macs_by_port.get((port_entry.get('UNIT'), port_entry['PORT']))
+        if port_macs:
+            for mac_entry in port_macs:
+                merged_list.append(_merged_row(port_entry, mac_entry['VID'], normalize_mac(mac_entry['MAC_ADDRESS'])))
+        else:
+            merged_list.append(_merged_row(port_entry))
+
+    return merged_list
+
+
+def merge_with_arp_table(merged_list, arp_data):
+    arp_by_mac = _index_first(arp_data, lambda arp_entry: normalize_mac(arp_entry['MAC_ADDRESS']))
+
+    for entry in merged_list:
+        if entry['MAC']:
+            arp_entry = arp_by_mac.get(normalize_mac(entry['MAC']))
+            if arp_entry is not None:
+                entry['IP_ADDRESS'] = arp_entry['IP_ADDRESS']
+                entry['VRF_ID'] = arp_entry['VRF_ID']
+
+    return merged_list
+
+
+def merge_with_port_status(merged_list, port_status_list):
+    status_by_port = _index_first(port_status_list, lambda port_status: (port_status['UNIT'], port_status['PORT']))
+
+    for entry in merged_list:
+        port_status = status_by_port.get((entry['UNIT'], entry['PORT']))
+        if port_status is not None:
+            entry['OPER'] = port_status.get('OPER_STATUS', None)
+            entry['SPEED'] = port_status.get('SPEED', None)
+
+    return merged_list
+
+
+def merge_with_ping_results(merged_list, ping_results):
+    # Create a dictionary for fast lookups of ping results by IP address
+    ping_dict = {entry['IP_ADDRESS']: entry.get('STATUS', '') for entry in ping_results}
+
+    if isinstance(merged_list, Table):
+        for index, ip_address in enumerate(merged_list.values('IP_ADDRESS')):
+            if ip_address:
+                merged_list.set(index, 'PING_STATUS', ping_dict.get(ip_address, ''))
+        return merged_list
+
+    # Update the merged list with ping statuses
+    for entry in merged_list:
+        ip_address = entry.get('IP_ADDRESS')
+        if ip_address:
+            entry['PING_STATUS'] = ping_dict.get(ip_address, '')
+
+    return merged_list
+
+
+def dedupe_and_sort(rows, sort_key):
+    # Remove duplicates by converting to a set of tuples
+    unique_rows = {tuple(row.items()) for row in rows}
+
+    # Convert back to list of dictionaries
+    filtered_rows = [dict(row) for row in unique_rows]
+
+    # Sort numerically by the id column
+    return sorted(filtered_rows, key=lambda x: int(x[sort_key]))
+
+
+def filter_and_sort_vlans(vlan_config_list):
+    return dedupe_and_sort(vlan_config_list, 'VLAN_ID')
+
+
+def mask_to_prefix(mask):
+    return sum(bin(int(octet)).count('1') for octet in mask.split('.'))
+
+
+def add_prefix_column(vlan_config_list):
+    for vlan in vlan_config_list:
+        subnet_mask = vlan.get('SUBNET_MASK', None)
+        if subnet_mask:
+            prefix_length = mask_to_prefix(subnet_mask)
+
+            vlan['PREFIX'] = f'/{prefix_length}'
+        else:
+            vlan['PREFIX'] = None
+
+        # Move PREFIX to be after IP
+        if 'IP' in vlan:
+            items = list(vlan.items())
+            ip_index = [i for i, (k, v) in enumerate(items) if k == 'IP'][0]
+            vlan_items = items[:ip_index + 1] + [('PREFIX', vlan['PREFIX'])] + items[ip_index + 1:]
+            vlan.clear()
+            vlan.update(vlan_items)
+    return vlan_config_list
+
+
+def merge_endpoints(mac_table, port_list, arp_data, port_status_list):
+    """Join the switch MAC/port tables with router ARP and switch port status.
+
+    Ports, MACs and port status are joined per switch (the rows' `Device` field), so
+    the same unit/port on two switches never picks up the other switch's MACs.
+    The ARP join then runs across the whole fleet.
+
+    Returns:
+        Table: One endpoint row per port/MAC, with the columns of `ENDPOINT_SCHEMA`.
+    """
+    interner = Interner()
+    macs = Table.from_rows(mac_table, MAC_TABLE_SCHEMA, interner)
+    ports = Table.from_rows(port_list, PORT_TABLE_SCHEMA, interner)
+    arps = Table.from_rows(arp_data, ARP_TABLE_SCHEMA, interner)
+    statuses = Table.from_rows(port_status_list, PORT_STATUS_TABLE_SCHEMA, interner)
+    return merge_endpoint_tables(macs, ports, arps, statuses)
+
+
+def merge_endpoint_tables(macs, ports, arps, statuses):
+    """`merge_endpoints` on `Table`s that share one interner, joining on their raw codes."""
+    interner = ports.interner
+    mac_device, mac_unit, mac_port, mac_vid, mac_address = (
+        macs.column(name).data for name in ('Device', 'UNIT', 'PORT', 'VID', 'MAC_ADDRESS')
+    )
+    port_device, port_unit, port_port, port_name = (
+        ports.column(name).data for name in ('Device', 'UNIT', 'PORT', 'NAME')
+    )
+    status_device, status_unit, status_port, status_oper, status_speed = (
+        statuses.column(name).data for name in ('Device', 'UNIT', 'PORT', 'OPER_STATUS', 'SPEED')
+    )
+    arp_mac, arp_vrf = arps.column('MAC_ADDRESS').data, arps.column('VRF_ID').data
+    arp_ip = arps.column('IP_ADDRESS')
+
+    macs_by_port = _index_all(range(len(macs)), lambda i: (mac_device[i], mac_unit[i], mac_port[i]))
+    status_by_port = _index_first(range(len(statuses)), lambda i: (status_device[i], status_unit[i], status_port[i]))
+    arp_by_mac = _index_first(range(len(arps)), lambda i: arp_mac[i])
+
+    empty = interner.code('')
+    # Rows without a MAC, or with an empty one, are not looked up in ARP
+    no_mac = (NO_MAC, arps.column('MAC_ADDRESS').encode(''))
+
+    endpoints = Table(ENDPOINT_SCHEMA, interner)
+    for switch_ports in _index_all(range(len(ports)), lambda i: port_device[i]).values():
+        for i in switch_ports:
+            device, unit, port = port_device[i], port_unit[i], port_port[i]
+            # A port entry without a UNIT shows as '' and matches port status with UNIT ''
+            row_unit = unit or empty
+            status = status_by_port.get((device, row_unit, port))
+            oper, speed = (status_oper[status], status_speed[status]) if status is not None else (0, 0)
+            port_macs = macs_by_port.get((device, unit, port))
+            for vlan, mac in ((mac_vid[j], mac_address[j]) for j in port_macs) if port_macs else [(0, NO_MAC)]:
+                arp = arp_by_mac.get(mac) if mac not in no_mac else None
+                ip, vrf = (arp_ip.raw(arp), arp_vrf[arp]) if arp is not None else (0, 0)
+                endpoints.append_raw((row_unit, port, port_name[i], vlan, mac, ip, oper, speed, empty, vrf))
+    return endpoints
+
+
+def build_reference_tables(vrf_data, vlan_configurations, vlan_advance_data):
+    """Return the de-duplicated VLAN, VRF and VLAN-advance tables shown beside the endpoints."""
+    vlans = add_prefix_column(filter_and_sort_vlans(vlan_configurations))
+    vrf_entries = [{'VRF_NAME': data['VRF_NAME'], 'VRF_ID': data['VRF_ID']} for data in vrf_data]
+    vrfs = dedupe_and_sort(vrf_entries, 'VRF_ID')
+    vlan_advance = dedupe_and_sort(vlan_advance_data, 'VLAN_ID')
+    return {'vlans': vlans, 'vrfs': vrfs, 'vlan_advance': vlan_advance}
@@ -0,0 +1,244 @@
+"""Timing spans for the stages, devices and commands of a run.
+
+Code under measurement wraps itself in `METRICS.span(stage, device, command)`.
+The stages timed by the scraper are:
+
+- collect, replay, merge, probe and export: the pipeline stages,
+- device: one device from connect to disconnect,
+- connect and enable: the SSH login and `enable` of a device,
+- command: one `send_command` round-trip, labelled with the command,
+- parse: one TextFSM parse, labelled with the template file name. A parse run
+  in a `ParsePool` worker is timed there and recorded when its rows come back.
+
+A span opened with a device passes it on to the spans opened inside it on the
+same thread, so parse times are attributed to the device they ran for.
+
+Metrics are off by default. A disabled `span()` returns a shared no-op context
+manager, so instrumented code costs one attribute check per span.
+`summary()` aggregates the spans into count/total/p50/p95/max per stage,
+command, template and device, and `write_json()`/`write_prometheus()` export it.
+"""
+
+import collections
+import json
+import math
+import os
+import threading
+import time
+
+SpanRecord = collections.namedtuple('SpanRecord', ['stage', 'device', 'command', 'seconds', 'error'])
+
+QUANTILES = (0.5, 0.95)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('metrics', 'stage', 'device', 'command', 'start', 'outer_device')
+
+    def __init__(self, metrics, stage, device, command):
+        self.metrics = metrics
+        self.stage = stage
+        self.device = device
+        self.command = command
+
+    def __enter__(self):
+        local = self.metrics._local
+        self.outer_device = getattr(local, 'device', None)
+        if self.device is None:
+            self.device = self.outer_device
+        local.device = self.device
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        self.metrics._local.device = self.outer_device
+        self.metrics.record(self.stage, seconds, self.device, self.command, error=exc_type is not None)
+        return False
+
+
+class TimedConnection:
+    """Pass-through netmiko connection that times every `send_command` as a command span."""
+
+    def __init__(self, net_connect, metrics):
+        self._net_connect = net_connect
+        self._metrics = metrics
+
+    def send_command(self, command, *args, **kwargs):
+        with self._metrics.span('command', command=command):
+            return self._net_connect.send_command(command, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._net_connect, name)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def span_stats(seconds, errors=0):
+    values = sorted(seconds)
+    return {
+        'count': len(values),
+        'errors': errors,
+        'total': round(sum(values), 6),
+        'p50': round(percentile(values, 0.5), 6),
+        'p95': round(percentile(values, 0.95), 6),
+        'max': round(values[-1], 6),
+    }
+
+
+def _group_stats(spans, key):
+    groups = {}
+    for span in spans:
+        groups.setdefault(key(span), []).append(span)
+    return {
+        name: span_stats([span.seconds for span in group], sum(1 for span in group if span.error))
+        for name, group in sorted(groups.items(), key=lambda item: str(item[0]))
+    }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Thread-safe collector of timing spans for one run."""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans = []
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def span(self, stage, device=None, command=None):
+        """Context manager timing one `stage`; a no-op while metrics are disabled."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, stage, device, command)
+
+    def iterate(self, stage, iterable, device=None, command=None):
+        """Yield from `iterable`, timing the work of producing its items as one `stage` span.
+
+        Time the consumer spends between items is left out.
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        if device is None:
+            device = self.current_device()
+        iterator = iter(iterable)
+        seconds = 0.0
+        error = False
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                except BaseException:
+                    error = True
+                    raise
+                finally:
+                    seconds += time.perf_counter() - start
+                yield item
+        finally:
+            self.record(stage, seconds, device, command, error=error)
+
+    def current_device(self):
+        """Return the device of the innermost span open on this thread, or None."""
+        return getattr(self._local, 'device', None)
+
+    def record(self, stage, seconds, device=None, command=None, error=False):
+        with self._lock:
+            self._spans.append(SpanRecord(stage, device, command, seconds, error))
+
+    def wrap(self, net_connect):
+        """Return `net_connect` with its commands timed, or unchanged while disabled."""
+        return TimedConnection(net_connect, self) if self.enabled else net_connect
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+
+    def summary(self):
+        """Aggregate the spans recorded so far.
+
+        Returns:
+            dict: Stats (count, errors, total, p50, p95, max; in seconds) under
+            `stages` by stage, `commands` by command round-trip, `templates` by
+            TextFSM template, and `devices` by device over its command spans, with
+            the device's own connect-to-disconnect time as `device_seconds`.
+        """
+        spans = self.spans()
+        commands = [span for span in spans if span.stage == 'command']
+        device_seconds = {span.device: span.seconds for span in spans if span.stage == 'device'}
+        devices = _group_stats([span for span in commands if span.device is not None], lambda span: span.device)
+        for device, stats in devices.items():
+            stats['device_seconds'] = round(device_seconds.get(device, 0.0), 6)
+        return {
+            'stages': _group_stats(spans, lambda span: span.stage),
+            'commands': _group_stats(commands, lambda span: span.command),
+            'templates': _group_stats([span for span in spans if span.stage == 'parse'], lambda span: span.command),
+            'devices': devices,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as json_file:
+            json.dump(self.summary(), json_file, indent=2)
+        return path
+
+    def write_prometheus(self, path):
+        """Write the summary in the Prometheus text exposition format, e.g. for node_exporter's textfile collector."""
+        summary = self.summary()
+        families = (
+            ('netscraper_stage_seconds', 'stage', summary['stages'], 'Time spent per stage.'),
+            ('netscraper_command_seconds', 'command', summary['commands'], 'Round-trip time per device command.'),
+            ('netscraper_parse_seconds', 'template', summary['templates'], 'TextFSM parse time per template.'),
+            ('netscraper_device_command_seconds', 'device', summary['devices'], 'Command round-trip time per device.'),
+        )
+        lines = []
+        for name, label, groups, help_text in families:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} summary']
+            for value, stats in groups.items():
+                labels = f'{label}="{_label(value)}"'
+                lines += [f'{name}{{{labels},quantile="{q}"}} {stats[f"p{round(q * 100)}"]}' for q in QUANTILES]
+                lines += [f'{name}_sum{{{labels}}} {stats["total"]}', f'{name}_count{{{labels}}} {stats["count"]}']
+            lines += [f'# HELP {name}_max Longest single span of {name}.', f'# TYPE {name}_max gauge']
+            lines += [f'{name}_max{{{label}="{_label(value)}"}} {stats["max"]}' for value, stats in groups.items()]
+        lines += ['# HELP netscraper_span_errors_total Spans that ended with an exception.',
+                  '# TYPE netscraper_span_errors_total counter']
+        lines += [f'netscraper_span_errors_total{{stage="{_label(stage)}"}} {stats["errors"]}'
+                  for stage, stats in summary['stages'].items()]
+        with open(path, 'w') as prom_file:
+            prom_file.write('\n'.join(lines) + '\n')
+        return path
+
+    def export(self, path):
+        """Write `<path>.json` and `<path>.prom` and return both paths."""
+        path = os.fspath(path)
+        return [self.write_json(f'{path}.json'), self.write_prometheus(f'{path}.prom')]
+
+
+METRICS = Metrics()
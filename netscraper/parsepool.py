@@ -0,0 +1,209 @@
+"""TextFSM parsing off the SSH worker threads.
+
+The collectors hand every raw output to a parser with `submit(output,
+template_path, finish, *args)` and only read the rows with `result()` when
+they need them. `finish(rows, *args)` is a module-level function that runs
+right after the parse, e.g. to tag the rows with their device.
+
+Both parsers look each output up in `netscraper.memo.PARSE_MEMO` first. An
+output parsed before with the same template gets its rows from the memo, and
+`finish` runs on them in the calling thread.
+
+`INLINE_PARSER` parses in the calling thread, as the scraper always did.
+`ParsePool` runs the parse and `finish` in worker processes, away from the
+GIL the SSH threads share. An SSH thread can send its next command while its
+last output is parsed. At most `max_pending` outputs wait in the pool; an SSH
+thread that submits more blocks until one is done, so memory stays bounded
+however fast the devices answer.
+"""
+
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+from netscraper.memo import PARSE_MEMO, freeze
+from netscraper.metrics import METRICS
+from netscraper.templates import parse_textfsm_output
+
+
+def parse_job(output, template_path, finish=None, args=(), memoize=False):
+    """Parse one output and apply `finish`.
+
+    Returns (rows, seconds the parse took, frozen rows), where the frozen rows are
+    the parsed rows before `finish`, for `PARSE_MEMO.put`, with `memoize` and None without.
+    """
+    start = time.perf_counter()
+    rows = parse_textfsm_output(output, template_path)
+    seconds = time.perf_counter() - start
+    frozen = freeze(rows) if memoize else None
+    if finish is not None:
+        rows = finish(rows, *args)
+    return rows, seconds, frozen
+
+
+def memoized_rows(key, finish, args):
+    """The rows `PARSE_MEMO` holds for `key` with `finish` applied, or None."""
+    rows = PARSE_MEMO.get(key)
+    if rows is not None and finish is not None:
+        rows = finish(rows, *args)
+    return rows
+
+
+class InlineParser:
+    """Parse in the calling thread; `submit` returns the finished rows."""
+
+    def submit(self, output, template_path, finish=None, *args):
+        key = PARSE_MEMO.key(output, template_path)
+        rows = memoized_rows(key, finish, args)
+        if rows is None:
+            rows, _seconds, frozen = parse_job(output, template_path, finish, args, key is not None)
+            PARSE_MEMO.put(key, frozen)
+        return rows
+
+    def gather(self, pending):
+        return list(itertools.chain.from_iterable(pending))
+
+    def result(self, pending):
+        return pending
+
+
+INLINE_PARSER = InlineParser()
+
+
+class ParsePool:
+    """Bounded process pool that parses outputs for many SSH threads.
+
+    Args:
+        max_workers: Worker processes; defaults to the number of CPUs.
+        max_pending: Outputs submitted but not yet parsed before `submit` blocks;
+            defaults to four per worker.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.max_workers
+        # Worker processes are spawned, not forked, because the SSH threads are already running
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            self.max_workers, mp_context=multiprocessing.get_context('spawn')
+        )
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._blocked_since = None
+        self.jobs = 0
+        self.parse_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def submit(self, output, template_path, finish=None, *args):
+        """Queue one output for parsing and return a future of its rows."""
+        key = PARSE_MEMO.key(output, template_path)
+        memoized = memoized_rows(key, finish, args)
+        if memoized is not None:
+            rows = concurrent.futures.Future()
+            rows.set_result(memoized)
+            return rows
+
+        self._wait_started()
+        try:
+            self._slots.acquire()
+        finally:
+            self._wait_ended()
+        rows = concurrent.futures.Future()
+        try:
+            job = self._executor.submit(parse_job, output, template_path, finish, args, key is not None)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Metrics are off in the workers, so the parse span is recorded here for the submitting device
+        device = METRICS.current_device()
+        job.add_done_callback(lambda job: self._done(job, rows, key, template_path, device))
+        return rows
+
+    def _done(self, job, rows, key, template_path, device):
+        self._slots.release()
+        try:
+            result, seconds, frozen = job.result()
+        except BaseException as err:
+            rows.set_exception(err)
+            return
+        if METRICS.enabled:
+            METRICS.record('parse', seconds, device, os.path.basename(template_path))
+        PARSE_MEMO.put(key, frozen)
+        with self._lock:
+            self.jobs += 1
+            self.parse_seconds += seconds
+        rows.set_result(result)
+
+    # wait_seconds is wall-clock time with at least one SSH thread blocked on the
+    # pool, so a hundred threads waiting together count once
+    def _wait_started(self):
+        with self._lock:
+            if not self._waiting:
+                self._blocked_since = time.perf_counter()
+            self._waiting += 1
+
+    def _wait_ended(self):
+        with self._lock:
+            self._waiting -= 1
+            if not self._waiting:
+                self.wait_seconds += time.perf_counter() - self._blocked_since
+
+    def gather(self, pending):
+        """Return one future of the rows of every future in `pending`, concatenated in order."""
+        pending = list(pending)
+        rows = concurrent.futures.Future()
+        remaining = [len(pending)]
+        lock = threading.Lock()
+
+        def done(_future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                rows.set_result(list(itertools.chain.from_iterable(future.result() for future in pending)))
+            except BaseException as err:
+                rows.set_exception(err)
+
+        if not pending:
+            rows.set_result([])
+        for future in pending:
+            future.add_done_callback(done)
+        return rows
+
+    def result(self, pending):
+        """Wait for the rows of a future returned by `submit` or `gather`."""
+        self._wait_started()
+        try:
+            with METRICS.span('parse_wait'):
+                return pending.result()
+        finally:
+            self._wait_ended()
+
+    def stats(self):
+        """Parse time moved off the SSH threads, and how long they still waited on the pool.
+
+        Parsed inline, `parse_seconds` of regex work would have held the GIL the
+        SSH threads share. `recovered_seconds` is that work less the wall-clock
+        time any SSH thread spent blocked on the pool.
+        """
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'jobs': self.jobs,
+                'parse_seconds': round(self.parse_seconds, 3),
+                'wait_seconds': round(self.wait_seconds, 3),
+                'recovered_seconds': round(max(self.parse_seconds - self.wait_seconds, 0.0), 3),
+            }
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,119 @@
+"""The collect -> merge -> probe -> export stages of a scraper run.
+
+Each stage takes the previous stage's output and returns new data, so a scheduler,
+benchmark or test can run any stage on its own.
+"""
+
+import contextlib
+import logging
+import os
+
+from netscraper.capture import CaptureWriter, replay_fleet
+from netscraper.collectors import collect_fleet, combine_results
+from netscraper.config import output_path
+from netscraper.export import export_report, export_vrf_list
+from netscraper.merge import build_reference_tables, merge_endpoints, merge_with_ping_results
+from netscraper.metrics import METRICS
+from netscraper.parsepool import INLINE_PARSER, ParsePool
+from netscraper.probe import ping_ips
+
+logger = logging.getLogger(__name__)
+
+
+def parser_for(parse_workers):
+    """A `ParsePool` with `parse_workers` processes, or the inline parser for 0.
+
+    None picks one process per CPU, and the inline parser on a single-CPU host,
+    where a pool only adds the cost of shipping outputs and rows between processes.
+    """
+    if parse_workers is None:
+        parse_workers = os.cpu_count() or 1
+        if parse_workers == 1:
+            parse_workers = 0
+    if parse_workers == 0:
+        return contextlib.nullcontext(INLINE_PARSER)
+    return ParsePool(parse_workers)
+
+
+def collect(router_list, switch_list, credentials, max_workers=100, capture_path=None, parse_workers=0):
+    """Collect every device and return one `DeviceResult` per device.
+
+    With `capture_path` every raw command output is also archived for `replay()`.
+    `parse_workers` processes parse the outputs off the SSH threads (see `parser_for()`);
+    with 0 each SSH thread parses its own outputs.
+    """
+    with METRICS.span('collect'), parser_for(parse_workers) as parser, contextlib.ExitStack() as stack:
+        capture = stack.enter_context(CaptureWriter(capture_path)) if capture_path else None
+        results = collect_fleet(
+            router_list, switch_list, credentials, max_workers=max_workers, capture=capture, parser=parser
+        )
+        log_parse_stats(parser)
+        return results
+
+
+def replay(capture_paths, parse_workers=0):
+    """Offline stand-in for `collect()`: rebuild the device results from capture archives."""
+    with METRICS.span('replay'), parser_for(parse_workers) as parser:
+        results = replay_fleet(capture_paths, parser, max_workers=getattr(parser, 'max_pending', 1))
+        log_parse_stats(parser)
+        return results
+
+
+def log_parse_stats(parser):
+    if not isinstance(parser, ParsePool):
+        return
+    stats = parser.stats()
+    logger.info(
+        f"Parsed {stats['jobs']} outputs in {stats['workers']} processes: {stats['parse_seconds']} s of parsing "
+        f"moved off the SSH threads, {stats['wait_seconds']} s spent waiting for it, "
+        f"{stats['recovered_seconds']} s recovered"
+    )
+
+
+def merge(results):
+    """Join the tables of every `DeviceResult` into the report rows.
+
+    Returns:
+        dict: `endpoints` (one row per port/MAC) plus the `vlans`, `vrfs` and `vlan_advance` tables.
+    """
+    with METRICS.span('merge'):
+        collected = combine_results(results)
+        endpoints = merge_endpoints(
+            collected['mac_table'], collected['port_list'], collected['arp_data'], collected['port_status_list']
+        )
+        report = build_reference_tables(
+            collected['vrf_data'], collected['vlan_configurations'], collected['vlan_advance_data']
+        )
+    report['endpoints'] = endpoints
+    return report
+
+
+def probe(report, rate=1000, retries=2, timeout=1.0):
+    """Ping the endpoints with an IP address and fill in their PING_STATUS.
+
+    The loss and round-trip time of each unique address are kept in `report['ping_results']`.
+    Raises `netscraper.probe.ProbeError` when no ICMP socket can be opened.
+    """
+    with METRICS.span('probe'):
+        ping_results = ping_ips(report['endpoints'], rate=rate, retries=retries, timeout=timeout)
+        report['endpoints'] = merge_with_ping_results(report['endpoints'], ping_results)
+    report['ping_results'] = ping_results
+    return report
+
+
+def export(report, path=None, vrf_list_path=None, formats=('excel',)):
+    """Write the report in each of `formats`, and the VRF id list if `vrf_list_path` is set.
+
+    Args:
+        report: The merged report.
+        path: Output path without extension; defaults to a timestamped name in the project directory.
+        vrf_list_path: Where to write the VRF id list, if anywhere.
+        formats: Names from `netscraper.export.EXPORTERS`: excel, csv, jsonl, parquet or sqlite.
+
+    Returns:
+        list: The paths written, one per format.
+    """
+    with METRICS.span('export'):
+        if vrf_list_path:
+            export_vrf_list(report['vrfs'], vrf_list_path)
+        return export_report(report, path or output_path(), formats)
@@ -0,0 +1,321 @@
+"""Reachability checks for the merged endpoints.
+
+Every unique IP address is swept with ICMP echo from a few sockets in one
+thread. Requests go out at a fixed rate, replies are matched as they arrive,
+and a host stops being probed at its first reply. A host with no reply is
+retried after `timeout` seconds, up to `retries` times.
+
+Unprivileged datagram ICMP sockets are used where the OS allows them (Linux
+with net.ipv4.ping_group_range covering the user, and macOS). Otherwise raw
+sockets are used, which need root or CAP_NET_RAW, or administrator rights on
+Windows. Where neither can be opened, `ping_ips` falls back to running the
+system `ping` command for each host, as the scraper did before the sweep.
+"""
+
+import collections
+import concurrent.futures
+import heapq
+import ipaddress
+import logging
+import math
+import os
+import re
+import selectors
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+PAYLOAD = b'netscraper-probe'
+
+
+class ProbeError(OSError):
+    """No ICMP socket could be opened, or no `ping` command run."""
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def echo_request(ident, seq, payload=PAYLOAD):
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + payload)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def parse_echo_reply(packet):
+    """Return (ident, seq) of an echo reply, or None for any other packet.
+
+    Raw sockets, and datagram sockets on macOS, deliver the IPv4 header too.
+    """
+    if len(packet) >= 20 and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0F) * 4:]
+    if len(packet) < 8:
+        return None
+    icmp_type, _code, _checksum, ident, seq = struct.unpack('!BBHHH', packet[:8])
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return ident, seq
+
+
+class IcmpSocket:
+    """One non-blocking ICMP echo socket.
+
+    The sweep only needs `send`, `receive` and `fileno`, so tests can put a
+    local stand-in in its place.
+    """
+
+    def __init__(self, index=0):
+        # Datagram ICMP sockets are refused for lack of permission on Linux, and
+        # not supported at all on Windows; raw sockets need root or administrator
+        try:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.raw = False
+        except OSError:
+            try:
+                self._socket = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            except OSError as err:
+                raise ProbeError(
+                    'ICMP sockets need net.ipv4.ping_group_range to include this user, or root '
+                    f'(administrator on Windows): {err}'
+                ) from err
+            self.raw = True
+        self._socket.setblocking(False)
+        # Datagram sockets get their ident from the kernel; raw sockets see every
+        # reply on the host, so theirs must tell this process's sockets apart
+        self.ident = (os.getpid() + index) & 0xFFFF
+
+    def fileno(self):
+        return self._socket.fileno()
+
+    def send(self, ip_address, seq):
+        self._socket.sendto(echo_request(self.ident, seq), (ip_address, 0))
+
+    def receive(self):
+        """Yield (ip_address, seq) for every echo reply waiting on the socket."""
+        while True:
+            try:
+                packet, (ip_address, _port) = self._socket.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            reply = parse_echo_reply(packet)
+            if reply is None:
+                continue
+            ident, seq = reply
+            if self.raw and ident != self.ident:
+                continue
+            yield ip_address, seq
+
+    def close(self):
+        self._socket.close()
+
+
+def open_icmp_sockets(count):
+    sockets = []
+    try:
+        for index in range(count):
+            sockets.append(IcmpSocket(index))
+    except OSError:
+        for icmp_socket in sockets:
+            icmp_socket.close()
+        raise
+    return sockets
+
+
+def _ping_result(ip_address, sent, rtt):
+    received = 1 if rtt is not None else 0
+    return {
+        'IP_ADDRESS': ip_address,
+        'STATUS': 'Good' if received else 'Bad',
+        'SENT': sent,
+        'RECEIVED': received,
+        'LOSS': round(1 - received / sent, 3) if sent else 1.0,
+        'RTT_MS': round(rtt * 1000, 3) if received else None,
+    }
+
+
+def _is_ipv4(ip_address):
+    try:
+        return ipaddress.ip_address(ip_address).version == 4
+    except ValueError:
+        return False
+
+
+def sweep(ip_addresses, rate=1000, retries=2, timeout=1.0, sockets=None, socket_count=2):
+    """Probe each unique IPv4 address and return one result dict per address, in first-seen order.
+
+    Args:
+        ip_addresses: Addresses to probe; duplicates are probed once.
+        rate: Echo requests sent per second across all sockets.
+        retries: Extra requests sent to a host that has not replied within `timeout`.
+        timeout: Seconds to wait for the reply to each request.
+        sockets: Already-open `IcmpSocket`s (or stand-ins) to use instead of opening `socket_count`.
+        socket_count: Number of sockets the requests are spread over.
+
+    Returns:
+        list: Dicts with IP_ADDRESS, STATUS (Good/Bad), SENT, RECEIVED, LOSS (0-1) and RTT_MS.
+    """
+    if rate <= 0:
+        raise ValueError(f'rate must be positive, not {rate}')
+    targets = list(dict.fromkeys(ip_addresses))
+    results = {}
+    queue = collections.deque()
+    for ip_address in targets:
+        if _is_ipv4(ip_address):
+            queue.append(ip_address)
+        else:
+            results[ip_address] = _ping_result(ip_address, 0, None)
+    if not queue:
+        return [results[ip_address] for ip_address in targets]
+
+    owned = sockets is None
+    if owned:
+        sockets = open_icmp_sockets(socket_count)
+    selector = selectors.DefaultSelector()
+    for icmp_socket in sockets:
+        selector.register(icmp_socket, selectors.EVENT_READ)
+
+    sent = collections.Counter()
+    outstanding = {}  # (socket index, seq) -> (ip, time sent)
+    deadlines = []  # heap of (deadline, socket index, seq)
+    next_seq = [0] * len(sockets)
+    interval = 1.0 / rate
+    next_send = time.monotonic()
+    turn = 0
+
+    try:
+        while queue or outstanding:
+            now = time.monotonic()
+
+            # Send what the rate allows
+            while queue and next_send <= now:
+                ip_address = queue.popleft()
+                index = turn % len(sockets)
+                turn += 1
+                seq = next_seq[index]
+                next_seq[index] = (seq + 1) & 0xFFFF
+                try:
+                    sockets[index].send(ip_address, seq)
+                except OSError as err:
+                    # Unroutable addresses fail on send; count the attempt as lost
+                    logger.debug(f'Ping to {ip_address} could not be sent: {err}')
+                outstanding[(index, seq)] = (ip_address, now)
+                heapq.heappush(deadlines, (now + timeout, index, seq))
+                sent[ip_address] += 1
+                next_send = max(next_send + interval, now - interval)
+
+            # Expire requests without a reply, retrying hosts that have attempts left
+            while deadlines and deadlines[0][0] <= now:
+                _deadline, index, seq = heapq.heappop(deadlines)
+                request = outstanding.pop((index, seq), None)
+                if request is None:
+                    continue
+                ip_address = request[0]
+                if ip_address in results:
+                    continue
+                if sent[ip_address] <= retries:
+                    queue.append(ip_address)
+                else:
+                    results[ip_address] = _ping_result(ip_address, sent[ip_address], None)
+
+            if not (queue or outstanding):
+                break
+            wait = deadlines[0][0] - now if deadlines else timeout
+            if queue:
+                wait = min(wait, next_send - now)
+            for key, _events in selector.select(max(wait, 0)):
+                index = sockets.index(key.fileobj)
+                received_at = time.monotonic()
+                for ip_address, seq in key.fileobj.receive():
+                    request = outstanding.get((index, seq))
+                    if request is None or request[0] != ip_address:
+                        continue
+                    del outstanding[(index, seq)]
+                    if ip_address not in results:
+                        results[ip_address] = _ping_result(ip_address, sent[ip_address], received_at - request[1])
+    finally:
+        selector.close()
+        if owned:
+            for icmp_socket in sockets:
+                icmp_socket.close()
+
+    return [results[ip_address] for ip_address in targets]
+
+
+# The round-trip time in the reply line of every platform's ping: time=1.23 ms, time<1ms
+PING_TIME = re.compile(r'time[=<]\s*([\d.]+)\s*ms', re.IGNORECASE)
+
+
+def ping_command(ip_address, timeout, platform=sys.platform):
+    """Return the `ping` command line sending one echo request to `ip_address` on `platform`."""
+    if platform.startswith('win'):
+        return ['ping', '-n', '1', '-w', str(max(round(timeout * 1000), 1)), ip_address]
+    if platform == 'darwin':
+        return ['ping', '-c', '1', '-t', str(max(math.ceil(timeout), 1)), ip_address]
+    return ['ping', '-c', '1', '-W', str(max(math.ceil(timeout), 1)), ip_address]
+
+
+def ping_once(ip_address, timeout, platform=sys.platform):
+    """Ping `ip_address` once with the `ping` command; return the round-trip seconds, or None without a reply."""
+    start = time.monotonic()
+    try:
+        completed = subprocess.run(
+            ping_command(ip_address, timeout, platform), capture_output=True, text=True, timeout=timeout + 5
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    # Windows ping exits 0 on "Destination host unreachable" too; only an echo reply has a TTL
+    if completed.returncode != 0 or 'TTL=' not in completed.stdout.upper():
+        return None
+    rtt = PING_TIME.search(completed.stdout)
+    return float(rtt.group(1)) / 1000 if rtt else time.monotonic() - start
+
+
+def command_sweep(ip_addresses, retries=2, timeout=1.0, max_workers=50, platform=sys.platform):
+    """Probe each unique IPv4 address with the `ping` command; returns what `sweep()` does.
+
+    Used where no ICMP socket can be opened. Each attempt is one `ping` process,
+    and `max_workers` of them run at a time. Raises `ProbeError` when there is no
+    `ping` command to run.
+    """
+    def probe(ip_address):
+        if not _is_ipv4(ip_address):
+            return _ping_result(ip_address, 0, None)
+        for attempt in range(1, retries + 2):
+            rtt = ping_once(ip_address, timeout, platform)
+            if rtt is not None:
+                return _ping_result(ip_address, attempt, rtt)
+        return _ping_result(ip_address, retries + 1, None)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        try:
+            return list(executor.map(probe, dict.fromkeys(ip_addresses)))
+        except OSError as err:
+            raise ProbeError(f'the ping command could not be run: {err}') from err
+
+
+def ping_ips(final_merged_list, rate=1000, retries=2, timeout=1.0, sockets=None):
+    """Sweep the IP addresses of the merged endpoints; see `sweep()` for the options.
+
+    Without ICMP sockets, the addresses are pinged with the `ping` command instead.
+    """
+    ip_addresses = [entry['IP_ADDRESS'] for entry in final_merged_list if entry.get('IP_ADDRESS')]
+    try:
+        ping_results = sweep(ip_addresses, rate=rate, retries=retries, timeout=timeout, sockets=sockets)
+    except ProbeError as err:
+        logger.warning(f'{err}; pinging with the ping command instead')
+        ping_results = command_sweep(ip_addresses, retries=retries, timeout=timeout)
+    good = sum(1 for result in ping_results if result['RECEIVED'])
+    logger.info(f'Ping sweep: {good} of {len(ping_results)} hosts answered')
+    return ping_results
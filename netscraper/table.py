@@ -0,0 +1,260 @@
+"""Compact columnar tables for the MAC, ARP, port and merged endpoint data.
+
+A `Table` stores each column in an `array` instead of one dict per row:
+
+- MAC addresses are 48-bit integers,
+- IPv4 addresses are uint32,
+- all other text (OPER, SPEED, TYPE, VLAN, port names, ...) is a code into an
+  `Interner` that holds each distinct string once.
+
+Tables built with the same interner share their codes, so joins between them
+compare integers. Strings are rebuilt only when a row or value is read for
+output. MAC addresses read back in the `normalize_mac` form. Values that do not
+parse as a MAC or an IPv4 address are interned as text, so they read back as
+they were appended (normalized, for MACs).
+"""
+
+import array
+
+MAC = 'mac'
+IPV4 = 'ipv4'
+TEXT = 'text'
+
+# Column kinds of the tables built by the merge
+MAC_TABLE_SCHEMA = {'MAC_ADDRESS': MAC, 'VID': TEXT, 'TYPE': TEXT, 'UNIT': TEXT, 'PORT': TEXT, 'Device': TEXT}
+ARP_TABLE_SCHEMA = {'IP_ADDRESS': IPV4, 'MAC_ADDRESS': MAC, 'VRF_ID': TEXT}
+PORT_TABLE_SCHEMA = {'UNIT': TEXT, 'PORT': TEXT, 'NAME': TEXT, 'Device': TEXT}
+PORT_STATUS_TABLE_SCHEMA = {'UNIT': TEXT, 'PORT': TEXT, 'OPER_STATUS': TEXT, 'SPEED': TEXT, 'Device': TEXT}
+ENDPOINT_SCHEMA = {
+    'UNIT': TEXT,
+    'PORT': TEXT,
+    'NAME': TEXT,
+    'VLAN': TEXT,
+    'MAC': MAC,
+    'IP_ADDRESS': IPV4,
+    'OPER': TEXT,
+    'SPEED': TEXT,
+    'PING_STATUS': TEXT,
+    'VRF_ID': TEXT,
+}
+
+# Raw MAC values: 0 .. 2**48-1 are addresses, NO_MAC is None, and anything above
+# is NO_MAC + 1 + the interner code of a value that is not a MAC address
+NO_MAC = 1 << 48
+
+# Raw IPv4 values: 1 .. 2**32-1 are addresses, 0 is None (0.0.0.0 is kept as text),
+# and anything from IPV4_TEXT up is IPV4_TEXT + the interner code of the text
+IPV4_TEXT = 1 << 32
+
+
+class Interner:
+    """Map each distinct value to a small integer code and back. Code 0 is None."""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+def mac_to_int(mac_address):
+    """Return a colon- or dash-separated MAC address as an integer, or None if it is not one."""
+    if len(mac_address) != 17 or any(mac_address[i] not in ':-' for i in (2, 5, 8, 11, 14)):
+        return None
+    digits = mac_address[0:2] + mac_address[3:5] + mac_address[6:8] + mac_address[9:11] + mac_address[12:14] + mac_address[15:17]
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return None
+
+
+def int_to_mac(value):
+    # The normalize_mac form: lower case, dash separated
+    digits = f'{value:012x}'
+    return f'{digits[0:2]}-{digits[2:4]}-{digits[4:6]}-{digits[6:8]}-{digits[8:10]}-{digits[10:12]}'
+
+
+def ipv4_to_int(ip_address):
+    """Return a dotted IPv4 address as an integer, or None unless it reads back unchanged."""
+    parts = ip_address.split('.')
+    if len(parts) != 4:
+        return None
+    value = 0
+    for part in parts:
+        if not part.isdigit() or (len(part) > 1 and part[0] == '0') or int(part) > 255:
+            return None
+        value = (value << 8) | int(part)
+    return value or None
+
+
+def int_to_ipv4(value):
+    return f'{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}'
+
+
+class TextColumn:
+    def __init__(self, interner):
+        self.interner = interner
+        self.data = array.array('I')
+
+    def encode(self, value):
+        return self.interner.code(value)
+
+    def decode(self, raw):
+        return self.interner.values[raw]
+
+    def append_raw(self, raw):
+        self.data.append(raw)
+
+    def raw(self, index):
+        return self.data[index]
+
+    def set_raw(self, index, raw):
+        self.data[index] = raw
+
+    def distinct(self):
+        """Yield each distinct value in the column once."""
+        for raw in set(self.data):
+            yield self.interner.values[raw]
+
+
+class MacColumn(TextColumn):
+    def __init__(self, interner):
+        super().__init__(interner)
+        self.data = array.array('Q')
+
+    def encode(self, value):
+        if value is None:
+            return NO_MAC
+        mac = mac_to_int(value)
+        if mac is None:
+            return NO_MAC + 1 + self.interner.code(value.replace(':', '-').lower())
+        return mac
+
+    def decode(self, raw):
+        if raw < NO_MAC:
+            return int_to_mac(raw)
+        if raw == NO_MAC:
+            return None
+        return self.interner.values[raw - NO_MAC - 1]
+
+    def distinct(self):
+        for raw in set(self.data):
+            yield self.decode(raw)
+
+
+class Ipv4Column(TextColumn):
+    def __init__(self, interner):
+        super().__init__(interner)
+        self.text = {}  # row -> raw value of entries that are not IPv4 addresses
+
+    def encode(self, value):
+        if value is None:
+            return 0
+        ip = ipv4_to_int(value)
+        if ip is None:
+            return IPV4_TEXT + self.interner.code(value)
+        return ip
+
+    def decode(self, raw):
+        if raw >= IPV4_TEXT:
+            return self.interner.values[raw - IPV4_TEXT]
+        return int_to_ipv4(raw) if raw else None
+
+    def append_raw(self, raw):
+        if raw >= IPV4_TEXT:
+            self.text[len(self.data)] = raw
+            raw = 0
+        self.data.append(raw)
+
+    def raw(self, index):
+        return self.text.get(index) or self.data[index]
+
+    def set_raw(self, index, raw):
+        self.text.pop(index, None)
+        if raw >= IPV4_TEXT:
+            self.text[index] = raw
+            raw = 0
+        self.data[index] = raw
+
+    def distinct(self):
+        for raw in set(self.data) | set(self.text.values()):
+            yield self.decode(raw)
+
+
+COLUMN_CLASSES = {MAC: MacColumn, IPV4: Ipv4Column, TEXT: TextColumn}
+
+
+class Table:
+    """Column-oriented rows with a fixed set of columns.
+
+    Reading a row (`table[i]` or iterating) returns a new dict of strings in
+    column order, the same shape the list-of-dict tables have, so report code can
+    treat both alike. Writing goes through `append`, `set` or the raw methods.
+    """
+
+    def __init__(self, schema, interner=None):
+        self.interner = interner if interner is not None else Interner()
+        self.columns = list(schema)
+        self._columns = {name: COLUMN_CLASSES[kind](self.interner) for name, kind in schema.items()}
+        self._length = 0
+
+    @classmethod
+    def from_rows(cls, rows, schema, interner=None):
+        table = cls(schema, interner)
+        for row in rows:
+            table.append(row)
+        return table
+
+    def column(self, name):
+        return self._columns[name]
+
+    def append(self, row):
+        """Append a mapping of column name to string value; missing columns are None."""
+        for name, column in self._columns.items():
+            column.append_raw(column.encode(row.get(name)))
+        self._length += 1
+
+    def append_raw(self, raws):
+        """Append one row of raw values, given in column order."""
+        for column, raw in zip(self._columns.values(), raws):
+            column.append_raw(raw)
+        self._length += 1
+
+    def get(self, index, name):
+        column = self._columns[name]
+        return column.decode(column.raw(index))
+
+    def set(self, index, name, value):
+        column = self._columns[name]
+        column.set_raw(index, column.encode(value))
+
+    def values(self, name):
+        """Yield the column's values as strings, in row order."""
+        column = self._columns[name]
+        for index in range(self._length):
+            yield column.decode(column.raw(index))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('table index out of range')
+        return {name: column.decode(column.raw(index)) for name, column in self._columns.items()}
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def __repr__(self):
+        return f'<Table {len(self)} rows: {", ".join(self.columns)}>'
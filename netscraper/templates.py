@@ -0,0 +1,188 @@
+"""Process-wide cache of compiled TextFSM templates, and parsing with them."""
+
+import codecs
+import copy
+import os
+import threading
+
+import textfsm
+
+from netscraper.configindex import TEMPLATE_SECTIONS, ConfigIndex, has_other_contexts
+from netscraper.fastparse import FAST_PARSERS
+from netscraper.metrics import METRICS
+
+
+def _clone_fsm(prototype):
+    """Return a fresh FSM that shares the compiled states of `prototype`.
+
+    The states, state list and value map are never mutated while parsing, so they are
+    seeded into the deepcopy memo and shared. Values (and their Filldown/List options)
+    and the result table hold per-parse state and are copied.
+    """
+    memo = {
+        id(prototype.states): prototype.states,
+        id(prototype.state_list): prototype.state_list,
+        id(prototype.value_map): prototype.value_map,
+    }
+    for rules in prototype.states.values():
+        memo[id(rules)] = rules
+    fsm = copy.deepcopy(prototype, memo)
+    fsm.Reset()
+    return fsm
+
+
+class TemplateCache:
+    """Thread-safe cache of parsed TextFSM templates keyed by path and mtime.
+
+    Each template is read and compiled once; callers get a cheap clone with its own
+    record state, so one cache can be shared by every device thread. Editing a
+    template on disk changes its mtime and the next lookup recompiles it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prototypes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_path):
+        """Return a ready-to-parse `textfsm.TextFSM` for `template_path`."""
+        path = os.path.abspath(template_path)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._prototypes.get(path)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                prototype = cached[1]
+            else:
+                self.misses += 1
+                prototype = None
+
+        if prototype is None:
+            with open(path) as template_file:
+                prototype = textfsm.TextFSM(template_file)
+            with self._lock:
+                self._prototypes[path] = (mtime, prototype)
+
+        return _clone_fsm(prototype)
+
+    def stats(self):
+        """Return hit/miss counters and the number of cached templates."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'templates': len(self._prototypes)}
+
+    def clear(self):
+        """Drop every cached template and reset the counters."""
+        with self._lock:
+            self._prototypes.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+TEMPLATE_CACHE = TemplateCache()
+
+
+def parse_textfsm_output(output, template_path):
+    with METRICS.span('parse', command=os.path.basename(template_path)):
+        # Running-config templates are given only the sections they have rules for
+        sections = TEMPLATE_SECTIONS.get(os.path.basename(template_path))
+        if sections is not None and has_other_contexts(output, sections):
+            output = ConfigIndex(output).text(*sections)
+        # Native parsers in netscraper.fastparse stand in for the templates they reproduce
+        fast_parser = FAST_PARSERS.get(template_path)
+        if fast_parser is not None:
+            return list(fast_parser(output.splitlines()))
+        fsm = TEMPLATE_CACHE.get(template_path)
+        parsed_output = fsm.ParseText(output)
+        return [dict(zip(fsm.header, entry)) for entry in parsed_output]
+
+
+# iter_lines and iter_records are also in the vendored ntc_templates.parse, as _iter_lines and
+# _iter_records. They are kept here because netscraper runs against ntc_templates from PyPI
+# (see requirements.txt), which has neither; keep the two copies in step.
+def iter_lines(source):
+    """Yield the lines of `source` as `str.splitlines` splits them, reading it a chunk at a time.
+
+    `source` is a string, bytes, or an iterable of str or bytes chunks: a list of
+    lines, a file object, a socket's `makefile()`. Bytes are decoded as UTF-8.
+    Chunks need not end on a line boundary.
+    """
+    if isinstance(source, str):
+        yield from source.splitlines()
+        return
+    if isinstance(source, (bytes, bytearray)):
+        yield from source.decode('utf-8', 'replace').splitlines()
+        return
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    pending = ''
+    for chunk in source:
+        if not isinstance(chunk, str):
+            chunk = decoder.decode(chunk)
+        if not chunk:
+            continue
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines[-1]
+        # The last line is unfinished, or may end in the '\r' of a '\r\n' split across chunks
+        if pending.splitlines()[0] == pending or pending.endswith('\r'):
+            lines.pop()
+        else:
+            pending = ''
+        for line in lines:
+            yield line.splitlines()[0]
+    pending += decoder.decode(b'', final=True)
+    yield from pending.splitlines()
+
+
+def iter_records(fsm, lines):
+    """Yield the records `fsm.ParseText` would return for `lines`, each once it is final.
+
+    This drives TextFSM's own line and record handling, so Filldown, Required,
+    List and EOF behave as in `ParseText`. A record is final once recorded,
+    unless the template has Fillup values, which copy themselves up into
+    earlier records that left them empty. Those records are held until a later
+    record has every Fillup value set, or the input ends.
+    """
+    fillup = [index for index, value in enumerate(fsm.values) if 'Fillup' in value.OptionNames()]
+    held = fsm._result  # Fillup writes into this list, so it is trimmed in place
+    checked = 0
+
+    for line in lines:
+        fsm._CheckLine(line)
+        if len(held) > checked:
+            final = len(held)
+            for index in fillup:
+                final = min(final, next((n + 1 for n in range(len(held) - 1, -1, -1) if held[n][index]), 0))
+            if final:
+                records = held[:final]
+                del held[:final]
+                yield from records
+            checked = len(held)
+        if fsm._cur_state_name in ('End', 'EOF'):
+            break
+
+    if fsm._cur_state_name != 'End' and 'EOF' not in fsm.states:
+        # The implicit EOF record, unless the template has an (empty) EOF state
+        fsm._AppendRecord()
+    records = held[:]
+    del held[:]
+    yield from records
+
+
+def iter_textfsm_output(source, template_path):
+    """Yield the rows `parse_textfsm_output` returns, each as soon as it is complete.
+
+    `source` is anything `iter_lines` reads, so a large output (a full routing
+    table, a stack's MAC table) never has to be held whole, and neither do its rows.
+    A running-config template in `TEMPLATE_SECTIONS` reads only its sections of a
+    str or bytes `source` that opens other contexts.
+    """
+    sections = TEMPLATE_SECTIONS.get(os.path.basename(template_path))
+    if sections is not None and isinstance(source, (str, bytes)) and has_other_contexts(source, sections):
+        source = ConfigIndex(source).views(*sections)
+    fast_parser = FAST_PARSERS.get(template_path)
+    if fast_parser is not None:
+        rows = fast_parser(iter_lines(source))
+    else:
+        fsm = TEMPLATE_CACHE.get(template_path)
+        rows = (dict(zip(fsm.header, entry)) for entry in iter_records(fsm, iter_lines(source)))
+    yield from METRICS.iterate('parse', rows, command=os.path.basename(template_path))
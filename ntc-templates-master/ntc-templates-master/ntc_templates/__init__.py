@@ -1,9 +1,14 @@
 """ntc_templates - Parse raw output from network devices and return structured data."""
 
-try:
-    from importlib import metadata
-except ImportError:
-    # Python version < 3.8
-    import importlib_metadata as metadata
 
-__version__ = metadata.version(__name__)
+def __getattr__(name):
+    # importlib.metadata takes longer to import than the rest of the package; only load it when asked for the version
+    if name == "__version__":
+        try:
+            from importlib import metadata  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            # Python version < 3.8
+            import importlib_metadata as metadata  # pylint: disable=import-outside-toplevel
+
+        return metadata.version(__name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
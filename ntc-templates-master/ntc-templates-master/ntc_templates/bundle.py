@@ -0,0 +1,273 @@
+"""ntc_templates.bundle.
+
+A template directory's index and templates, compiled ahead of time into one
+file, so that a new process can parse without reading and compiling them.
+
+Build the bundle after installing or editing templates:
+
+    python -m ntc_templates.bundle [TEMPLATE_DIR]
+
+The bundle holds the index rows with their command completions expanded and
+every template as a pickled `FusedTextFSM` object. Each regex in a template is
+stored as the code CPython's regex compiler produced for it, so loading a
+template does not compile its regexes again. A bundle only loads on the
+Python and TextFSM versions that built it. The index and each template are
+checked against the SHA-256 of their source file when they are used; a
+source file edited since the build is read from the source instead.
+
+The file is a pickled header followed by one pickled template after
+another. The header has the index rows and the offset of each template. The
+file is memory-mapped, and a template is only unpickled the first time it is
+used.
+
+Unpickling runs code named in the file, so only the bundle of the package's own
+template directory is loaded, unless the caller opts in with `trusted=True` (or
+`NTC_TEMPLATES_TRUST_BUNDLE=1` for `parse_output`). Even then the unpickler only
+builds the TextFSM classes a template is made of.
+"""
+
+import hashlib
+import importlib
+import io
+import mmap
+import os
+import pickle
+import re
+import struct
+import sys
+
+try:
+    import _sre
+    import textfsm
+    from textfsm import clitable, texttable
+
+    from ntc_templates.matcher import FusedTextFSM
+
+    try:
+        from re import _compiler as sre_compile
+        from re import _parser as sre_parse
+    except ImportError:
+        # Python < 3.11
+        import sre_compile  # pylint: disable=deprecated-module
+        import sre_parse  # pylint: disable=deprecated-module
+
+    HAS_BUNDLE = sys.implementation.name == "cpython"
+except ImportError:
+    HAS_BUNDLE = False
+
+PACKAGED_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+BUNDLE_NAME = "index.bundle"
+BUNDLE_FORMAT = 2
+_HEADER_SIZE = struct.Struct("<Q")
+
+
+def _runtime_tag():
+    """Versions a bundle is only valid for."""
+    return (BUNDLE_FORMAT, sys.implementation.cache_tag, _sre.MAGIC, textfsm.__version__)
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# pylint: disable-next=too-many-arguments,too-many-positional-arguments
+def _load_pattern(pattern, flags, code, groups, groupindex, indexgroup):
+    """Rebuild a compiled regex from the code `_compiled_code` saved."""
+    return _sre.compile(pattern, flags, list(code), groups, groupindex, indexgroup)
+
+
+def _compiled_code(pattern):
+    """The arguments `re` passes to `_sre.compile` for `pattern`."""
+    parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    code = sre_compile._code(parsed, pattern.flags)  # pylint: disable=protected-access
+    groupindex = dict(parsed.state.groupdict)
+    indexgroup = [None] * parsed.state.groups
+    for name, index in groupindex.items():
+        indexgroup[index] = name
+    return (
+        pattern.pattern,
+        pattern.flags | parsed.state.flags,
+        [int(op) for op in code],
+        parsed.state.groups - 1,
+        groupindex,
+        tuple(indexgroup),
+    )
+
+
+class _TemplatePickler(pickle.Pickler):
+    """Pickle regexes as their compiled code rather than their pattern."""
+
+    def reducer_override(self, obj):  # pylint: disable=missing-function-docstring
+        if isinstance(obj, re.Pattern):
+            return _load_pattern, _compiled_code(obj)
+        return NotImplemented
+
+
+# The globals a pickled template may refer to, besides the classes of textfsm.parser
+_TEMPLATE_GLOBALS = {
+    "ntc_templates.matcher": {"FusedTextFSM"},
+    "ntc_templates.bundle": {"_load_pattern"},
+}
+
+
+class _TemplateUnpickler(pickle.Unpickler):
+    """Unpickle only what `_TemplatePickler` writes for a template."""
+
+    def find_class(self, module, name):  # pylint: disable=missing-function-docstring
+        if name in _TEMPLATE_GLOBALS.get(module, ()):
+            return super().find_class(module, name)
+        if module == "textfsm.parser":
+            found = super().find_class(module, name)
+            if isinstance(found, type):
+                return found
+        raise pickle.UnpicklingError(f"{module}.{name} is not part of a TextFSM template")
+
+
+def _unpickle(data):
+    return _TemplateUnpickler(io.BytesIO(data)).load()
+
+
+def read_index(template_dir, index_text=None):
+    """Return the rows of the index in `template_dir` as (row number, platform, command, templates).
+
+    Command completions such as `sh[[ow]]` are expanded into regexes, as `CliTable` does.
+    """
+    if index_text is None:
+        with open(os.path.join(template_dir, "index"), "r", encoding="utf-8") as index:
+            index_text = index.read()
+    table = texttable.TextTable()
+    table.CsvToTable(io.StringIO(index_text, newline=None))
+    if "Template" not in table.header:
+        raise clitable.CliTableError("Index file does not have 'Template' column.")
+
+    preparse = clitable.CliTable()._PreParse  # pylint: disable=protected-access
+    return [
+        (
+            row.row,
+            preparse("Platform", row["Platform"]) if "Platform" in table.header else "",
+            preparse("Command", row["Command"]) if "Command" in table.header else "",
+            row["Template"],
+        )
+        for row in table
+    ]
+
+
+def build_bundle(template_dir, path=None):  # pylint: disable=too-many-locals
+    """Compile the index and every template in `template_dir` into a bundle.
+
+    Args:
+        template_dir: The template directory, with its index file.
+        path: Where to write the bundle. Defaults to `index.bundle` in `template_dir`.
+
+    Returns:
+        str: The path of the bundle.
+    """
+    if not HAS_BUNDLE:
+        raise RuntimeError("Template bundles need CPython and the TextFSM library.")
+
+    path = path or os.path.join(template_dir, BUNDLE_NAME)
+    with open(os.path.join(template_dir, "index"), "rb") as index:
+        index_bytes = index.read()
+    rows = read_index(template_dir, index_bytes.decode("utf-8"))
+
+    names = sorted({name for row in rows for name in row[3].split(":")})
+    templates = {}
+    blobs = io.BytesIO()
+    for name in names:
+        # A template that is missing or does not compile is left out, and fails as before when it is used
+        try:
+            with open(os.path.join(template_dir, name), "rb") as template:
+                template_bytes = template.read()
+            fsm = FusedTextFSM(io.StringIO(template_bytes.decode("utf-8"), newline=None))
+        except (OSError, textfsm.TextFSMTemplateError):
+            continue
+        offset = blobs.tell()
+        _TemplatePickler(blobs, protocol=pickle.HIGHEST_PROTOCOL).dump(fsm)
+        templates[name] = (_sha256(template_bytes), offset, blobs.tell() - offset)
+
+    header = pickle.dumps(
+        {"tag": _runtime_tag(), "index": (_sha256(index_bytes), rows), "templates": templates},
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as bundle:
+        bundle.write(_HEADER_SIZE.pack(len(header)))
+        bundle.write(header)
+        bundle.write(blobs.getbuffer())
+    os.replace(temp_path, path)
+    return path
+
+
+class Bundle:
+    """A memory-mapped bundle; see `load_bundle`."""
+
+    def __init__(self, path, header, data, start):
+        """Wrap the mapped bundle `data`, whose templates start at offset `start`."""
+        self.path = path
+        self._index_sha256, self._rows = header["index"]
+        self._templates = header["templates"]
+        self._data = data
+        self._start = start
+
+    def index_rows(self, index_bytes):
+        """Return the bundled index rows, or None if `index_bytes` is not the index they were built from."""
+        if _sha256(index_bytes) != self._index_sha256:
+            return None
+        return self._rows
+
+    def template(self, name, template_bytes):
+        """Return a new TextFSM for template `name`, or None if `template_bytes` is not what it was built from."""
+        entry = self._templates.get(name)
+        if entry is None or entry[0] != _sha256(template_bytes):
+            return None
+        start = self._start + entry[1]
+        end = start + entry[2]
+        return _unpickle(self._data[start:end])
+
+
+def is_packaged_template_dir(template_dir):
+    """Return whether `template_dir` is the template directory installed with this package."""
+    return os.path.realpath(template_dir) == os.path.realpath(PACKAGED_TEMPLATE_DIR)
+
+
+def load_bundle(template_dir, path=None, trusted=False):
+    """Map the bundle of `template_dir`, or return None if there is none for this Python and TextFSM.
+
+    Args:
+        template_dir: The template directory the bundle was built from.
+        path: The bundle file. Defaults to `index.bundle` in `template_dir`.
+        trusted: Load the bundle of a directory other than the package's own.
+            Loading a bundle runs code named in it, so only trust directories
+            that nobody else can write to.
+    """
+    if not HAS_BUNDLE or not (trusted or is_packaged_template_dir(template_dir)):
+        return None
+    path = path or os.path.join(template_dir, BUNDLE_NAME)
+    try:
+        with open(path, "rb") as bundle:
+            data = mmap.mmap(bundle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        (header_size,) = _HEADER_SIZE.unpack_from(data)
+        header_start = _HEADER_SIZE.size
+        start = header_start + header_size
+        header = _unpickle(data[header_start:start])
+    except Exception:  # pylint: disable=broad-except
+        data.close()
+        return None
+    if not isinstance(header, dict) or header.get("tag") != _runtime_tag():
+        data.close()
+        return None
+    return Bundle(path, header, data, start)
+
+
+def main(argv=None):
+    """Build the bundle of the template directory named in `argv`, by default the package's own."""
+    argv = sys.argv[1:] if argv is None else argv
+    print(build_bundle(argv[0] if argv else PACKAGED_TEMPLATE_DIR))
+
+
+if __name__ == "__main__":
+    # Build through the imported module, so that the pickles refer to it and not to __main__
+    importlib.import_module("ntc_templates.bundle").main()
@@ -0,0 +1,215 @@
+r"""ntc_templates.matcher.
+
+A TextFSM that finds the rule matching a line with one regex per state.
+
+TextFSM tries the regex of each rule of the current state against a line, in
+turn, until one matches. `FusedTextFSM` joins the rules of a state into one
+alternation instead, `(rule 0)|(rule 1)|...`. A regex tries alternatives in
+order and keeps the first that matches, so the alternative that matched is
+the rule TextFSM would have picked, and its groups hold the same values.
+Rules after a `Continue` rule are matched by the alternation of the rules
+that follow it.
+
+Before the alternation, a line is checked for the literal text that each
+rule needs somewhere in a matching line, such as `vlan ` in `^\s+vlan ${ID}`.
+A line with none of them cannot match any rule of the state, and is skipped
+without running a regex. States where a rule needs no literal text are not
+prefiltered.
+
+A state with backreferences in its rules is matched rule by rule, as TextFSM
+does, because joining the rules would renumber the groups they refer to. So is
+a state with a rule that sets a flag for the whole regex, such as `(?i)`,
+which Python before 3.11 would apply to every rule of the joined regex.
+"""
+
+import re
+
+import textfsm
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:
+    # Python < 3.11
+    import sre_constants  # pylint: disable=deprecated-module
+    import sre_parse  # pylint: disable=deprecated-module
+
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+
+def regex_syntax(pattern):
+    """Yield the position and character of each character of `pattern` that is neither escaped nor in a class."""
+    escaped = in_class = False
+    for position, char in enumerate(pattern):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        else:
+            yield position, char
+
+
+def _unnamed_groups(pattern):
+    """Return `pattern` with its named groups made plain groups, so that every group keeps its number."""
+    out = []
+    copied = 0
+    for position, char in regex_syntax(pattern):
+        if char == "(":
+            named = _NAMED_GROUP.match(pattern, position)
+            if named:
+                kept = position + 1  # the opening parenthesis
+                out.append(pattern[copied:kept])
+                copied = named.end()
+    out.append(pattern[copied:])
+    return "".join(out)
+
+
+def _global_flags(pattern):
+    """Return the flags `pattern` sets for the whole regex with `(?i)` and the like, other than the defaults."""
+    return sre_parse.parse(pattern).state.flags & ~re.UNICODE
+
+
+def _required_literal(pattern):
+    """Return the longest text every string matching `pattern` contains, or "" if there is none to be sure of."""
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return ""
+    longest = ""
+
+    def walk(items):
+        # pylint: disable=no-member  # the opcodes are set when sre_constants is imported
+        nonlocal longest
+        run = []
+        for op, arg in items:
+            if op is sre_constants.LITERAL:
+                run.append(chr(arg))
+                continue
+            if len(run) > len(longest):
+                longest = "".join(run)
+            run = []
+            if op is sre_constants.SUBPATTERN and not arg[1] & re.IGNORECASE:
+                walk(arg[3])
+            elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and arg[0] >= 1:
+                walk(arg[2])
+        if len(run) > len(longest):
+            longest = "".join(run)
+
+    walk(parsed)
+    return longest
+
+
+def _prefilter(literals):
+    """Return the fewest of `literals` that a line must contain one of, or None if any of them is empty."""
+    if not all(literals):
+        return None
+    kept = []
+    for literal in sorted(set(literals), key=len):
+        # A line with a longer literal also has any literal it contains
+        if not any(shorter in literal for shorter in kept):
+            kept.append(literal)
+    return tuple(kept)
+
+
+class _Alternation:  # pylint: disable=too-few-public-methods
+    """The rules of a state from one rule on, joined into a single regex."""
+
+    def __init__(self, rules, start, values):
+        self.match = None
+        self.literals = None
+        self.rules = {}  # group number of the rule's alternative -> (rule number, [(group number, value)])
+        if any(_GROUP_REFERENCE.search(rule.regex) or _global_flags(rule.regex) for rule in rules[start:]):
+            return
+
+        alternatives = []
+        literals = []
+        group = 1
+        for number in range(start, len(rules)):
+            regex = rules[number].regex_obj.regex
+            assigns = [(group + index, values[name]) for name, index in regex.groupindex.items() if name in values]
+            self.rules[group] = (number, assigns)
+            alternatives.append(f"({_unnamed_groups(regex.pattern)})")
+            literals.append(_required_literal(regex.pattern))
+            group += 1 + regex.groups
+        try:
+            self.match = re.compile("|".join(alternatives)).match
+        except (re.error, RecursionError):
+            self.rules = {}
+            return
+        self.literals = _prefilter(literals)
+
+
+class FusedTextFSM(textfsm.TextFSM):
+    """A `textfsm.TextFSM` that matches each line against all the rules of its state at once.
+
+    Its records are the ones `textfsm.TextFSM` returns. The joined regexes of
+    a state are built the first time the state is entered.
+    """
+
+    _alternations = None  # (state name, first rule) -> _Alternation
+
+    def __getstate__(self):
+        """Return the state to pickle, without the joined regexes, which are built again when needed."""
+        state = self.__dict__.copy()
+        state.pop("_alternations", None)
+        return state
+
+    def _alternation(self, start):
+        if self._alternations is None:
+            self._alternations = {}
+        key = (self._cur_state_name, start)
+        alternation = self._alternations.get(key)
+        if alternation is None:
+            values = {value.name: value for value in self.values}
+            alternation = self._alternations[key] = _Alternation(self._cur_state, start, values)
+        return alternation
+
+    def _CheckLine(self, line):  # pylint: disable=invalid-name
+        """Pass the line to the first rule of the current state that matches it, as TextFSM does."""
+        rules = self._cur_state
+        start = 0
+        while start < len(rules):
+            alternation = self._alternation(start)
+            if alternation.match is None:
+                return self._CheckRules(line, start)
+            if alternation.literals is not None:
+                for literal in alternation.literals:
+                    if literal in line:
+                        break
+                else:
+                    return None
+            matched = alternation.match(line)
+            if matched is None:
+                return None
+
+            number, assigns = alternation.rules[matched.lastindex]
+            for group, value in assigns:
+                value.AssignVar(matched.group(group))
+            rule = rules[number]
+            if self._Operations(rule, line):
+                self._Transition(rule)
+                return None
+            start = number + 1
+        return None
+
+    def _CheckRules(self, line, start):  # pylint: disable=invalid-name
+        """Try the rules of the current state from rule `start` on, one at a time."""
+        for rule in self._cur_state[start:]:
+            matched = self._CheckRule(rule, line)
+            if matched:
+                for value in matched.groupdict():
+                    self._AssignVar(matched, value)
+                if self._Operations(rule, line):
+                    self._Transition(rule)
+                    break
+
+    def _Transition(self, rule):  # pylint: disable=invalid-name
+        # Not a Continue, so check for a state transition
+        if rule.new_state:
+            if rule.new_state not in ("End", "EOF"):
+                self._cur_state = self.states[rule.new_state]
+            self._cur_state_name = rule.new_state
@@ -1,11 +1,20 @@
 """ntc_templates.parse."""
 
+import codecs
+import concurrent.futures
+import io
+import math
 import os
+import re
+import threading
 
 # Due to TextFSM library issues on Windows, it is better to not fail on import
 # Instead fail at runtime (i.e. if method is actually used).
 try:
-    from textfsm import clitable
+    from textfsm import clitable, texttable
+
+    from ntc_templates.bundle import load_bundle, read_index
+    from ntc_templates.matcher import FusedTextFSM, regex_syntax
 
     HAS_CLITABLE = True
 except ImportError:
@@ -30,25 +39,371 @@ def _get_template_dir():
 
 def _clitable_to_dict(cli_table):
     """Convert TextFSM cli_table object to list of dictionaries."""
-    objs = []
-    for row in cli_table:
-        temp_dict = {}
-        for index, element in enumerate(row):
-            temp_dict[cli_table.header[index].lower()] = element
-        objs.append(temp_dict)
+    return _records([name.lower() for name in cli_table.header], [row.values for row in cli_table])
+
+
+def _records(header, rows):
+    """Return `rows` as one dictionary per row, keyed by `header`."""
+    return [dict(zip(header, row)) for row in rows]
+
+
+def _columns(header, rows):
+    """Return `rows` as one list per column, keyed by `header`."""
+    if not rows:
+        return {name: [] for name in header}
+    return dict(zip(header, map(list, zip(*rows))))
+
+
+def _numpy_columns(header, rows):
+    """Return `rows` as one NumPy array per column: strings as a fixed-width str array, List values as objects."""
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    arrays = {}
+    for name, column in _columns(header, rows).items():
+        if column and isinstance(column[0], list):
+            array = numpy.empty(len(column), dtype=object)
+            array[:] = column
+        else:
+            array = numpy.array(column, dtype=str)
+        arrays[name] = array
+    return arrays
+
+
+def _dataframe(header, rows):
+    """Return `rows` as a pandas DataFrame, built from its columns."""
+    import pandas  # pylint: disable=import-outside-toplevel
+
+    return pandas.DataFrame(_columns(header, rows), columns=header)
+
+
+RESULT_FORMATS = {
+    "records": _records,
+    "columns": _columns,
+    "numpy": _numpy_columns,
+    "dataframe": _dataframe,
+}
+
+
+def _format_result(result_format, header, rows):
+    """Return the lowercased `header` and its `rows` as `result_format` lays them out."""
+    return RESULT_FORMATS[result_format](header, rows)
+
+
+def _iter_lines(source):
+    """Yield the lines of `source` as `str.splitlines` splits them, reading it a chunk at a time.
+
+    `source` is a string, bytes, or an iterable of str or bytes chunks: a list of lines, a file
+    object, a socket's `makefile()`. Bytes are decoded as UTF-8. Chunks need not end on a line
+    boundary.
+    """
+    if isinstance(source, str):
+        yield from source.splitlines()
+        return
+    if isinstance(source, (bytes, bytearray)):
+        yield from source.decode("utf-8", "replace").splitlines()
+        return
+
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    pending = ""
+    for chunk in source:
+        if not isinstance(chunk, str):
+            chunk = decoder.decode(chunk)
+        if not chunk:
+            continue
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines[-1]
+        # The last line is unfinished, or may end in the "\r" of a "\r\n" split across chunks
+        if pending.splitlines()[0] == pending or pending.endswith("\r"):
+            lines.pop()
+        else:
+            pending = ""
+        for line in lines:
+            yield line.splitlines()[0]
+    pending += decoder.decode(b"", final=True)
+    yield from pending.splitlines()
+
+
+def _iter_records(fsm, lines):
+    """Yield the records `fsm.ParseText` would return for `lines`, each as soon as it is final.
+
+    A record is final once it is recorded, unless the template has Fillup values: a Fillup
+    value copies itself up into the records before it that left it empty. Those records are
+    held until a later record has every Fillup value set, or the input ends.
+    """
+    # pylint: disable=protected-access
+    fillup = [index for index, value in enumerate(fsm.values) if "Fillup" in value.OptionNames()]
+    held = fsm._result  # Fillup writes into this list, so it is trimmed in place
+    checked = 0  # records held at the last check; held records are checked again once another is recorded
+
+    for line in lines:
+        fsm._CheckLine(line)
+        if len(held) > checked:
+            final = len(held)
+            for index in fillup:
+                final = min(final, next((n + 1 for n in range(len(held) - 1, -1, -1) if held[n][index]), 0))
+            if final:
+                records = held[:final]
+                del held[:final]
+                yield from records
+            checked = len(held)
+        if fsm._cur_state_name in ("End", "EOF"):
+            break
+
+    if fsm._cur_state_name != "End" and "EOF" not in fsm.states:
+        # Implicit EOF performs Next.Record operation, as in ParseText
+        fsm._AppendRecord()
+    records = held[:]
+    del held[:]
+    yield from records
+
+
+def _literal_prefix(pattern):
+    """Return the text at the start of every string that `pattern` matches from its first character."""
+    depth = 0
+    for _position, char in regex_syntax(pattern):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and not depth:
+            return ""  # a top-level alternative may start with anything
+    prefix = []
+    for char in pattern:
+        if char in ".^$*+?{}[]\\|()":
+            if char in "?*{" and prefix:
+                prefix.pop()  # the last character is optional
+            break
+        prefix.append(char)
+    return "".join(prefix)
+
+
+class _IndexLookup:  # pylint: disable=too-few-public-methods
+    """Find the index row for a platform and command without scanning every row.
+
+    `GetRowMatch` tries each row's Platform and Command regexes in turn. Here
+    the rows whose Platform matches a platform are picked out once, the first
+    time that platform is looked up, and put in a trie keyed by the literal
+    text each Command regex starts with. A command only reaches the regexes of
+    the rows whose literal start it begins with, in index order, so the first
+    one that matches is the row `GetRowMatch` returns. The row found for each
+    (platform, command) is remembered. Regexes are only compiled once a lookup
+    needs them.
+    """
+
+    MAX_MEMO = 4096
+
+    def __init__(self, rows):
+        self._rows = [(row_number, platform, command) for row_number, platform, command, _templates in rows]
+        self._partitions = {}  # platform -> command trie
+        self._memo = {}  # (platform, command) -> row number, 0 if none
+
+    def _partition(self, platform):
+        trie = self._partitions.get(platform)
+        if trie is None:
+            trie = ({}, [])  # (children by character, rows)
+            for row_number, platform_regex, command_regex in self._rows:
+                if platform_regex and not re.match(platform_regex, platform):
+                    continue
+                node = trie
+                for char in _literal_prefix(command_regex):
+                    node = node[0].setdefault(char, ({}, []))
+                node[1].append((row_number, command_regex))
+            self._partitions[platform] = trie
+        return trie
+
+    def row_number(self, platform, command):
+        """Return the number of the first row matching `platform` and `command`, or 0."""
+        key = (platform, command)
+        row_number = self._memo.get(key)
+        if row_number is not None:
+            return row_number
+
+        node = self._partition(platform)
+        candidates = list(node[1])
+        for char in command:
+            node = node[0].get(char)
+            if node is None:
+                break
+            candidates.extend(node[1])
+        row_number = 0
+        for number, command_regex in sorted(candidates, key=lambda candidate: candidate[0]):
+            if not command_regex or re.match(command_regex, command):
+                row_number = number
+                break
+        if len(self._memo) >= self.MAX_MEMO:
+            self._memo.clear()
+        self._memo[key] = row_number
+        return row_number
+
+
+def _list_values(fsm):
+    """Positions of the List values of `fsm`, whose items a TextTable turns into strings."""
+    return [index for index, value in enumerate(fsm.values) if "List" in value.OptionNames()]
+
+
+class _TemplateRegistry:
+    """The index and compiled templates of one template directory.
+
+    The index is read once, into an `_IndexLookup`. Each template is compiled
+    once, into a `FusedTextFSM` (see `ntc_templates.matcher`), and its TextFSM
+    objects are reused: a parse takes one from the template's free list (or
+    compiles another when every copy is busy in other threads), parses without
+    holding any lock, resets it and puts it back. Rows are merged as
+    `CliTable.ParseCmd` merges them.
+
+    The index and templates come from the directory's bundle where it was
+    built from the same files and may be trusted (see `ntc_templates.bundle`),
+    and from the files otherwise.
+    """
+
+    def __init__(self, template_dir):
+        self.template_dir = template_dir
+        # A bundle outside the package's own directory is only unpickled when the user opts in
+        self.bundle = load_bundle(template_dir, trusted=os.environ.get("NTC_TEMPLATES_TRUST_BUNDLE") == "1")
+        with open(os.path.join(template_dir, "index"), "rb") as index:
+            index_bytes = index.read()
+        rows = self.bundle.index_rows(index_bytes) if self.bundle is not None else None
+        if rows is None:
+            rows = read_index(template_dir, index_bytes.decode("utf-8"))
+        self.lookup = _IndexLookup(rows)
+        self._templates = {row_number: templates for row_number, _platform, _command, templates in rows}
+        self._lock = threading.Lock()
+        self._free = {}  # template name -> idle TextFSM objects
+
+    def template_names(self, attrs):
+        """Return the names of the templates the index maps `attrs` to."""
+        row_idx = self.lookup.row_number(attrs["Platform"], attrs["Command"])
+        if not row_idx:
+            raise clitable.CliTableError(f'No template found for attributes: "{attrs}"')
+        return self._templates[row_idx].split(":")
+
+    def _checkout(self, name):
+        with self._lock:
+            free = self._free.setdefault(name, [])
+            if free:
+                return free.pop()
+        with open(os.path.join(self.template_dir, name), "rb") as template:
+            template_bytes = template.read()
+        fsm = self.bundle.template(name, template_bytes) if self.bundle is not None else None
+        if fsm is None:
+            fsm = FusedTextFSM(io.StringIO(template_bytes.decode("utf-8"), newline=None))
+        return fsm
+
+    def _checkin(self, name, fsm):
+        fsm.Reset()
+        with self._lock:
+            self._free[name].append(fsm)
+
+    def iter_parse(self, lines, attrs):
+        """Yield the records of `lines` parsed with the template for `attrs` as dictionaries."""
+        names = self.template_names(attrs)
+        if len(names) > 1:
+            # Tables from several templates are joined on their keys, which needs them complete
+            yield from _records(*self.parse("".join(f"{line}\n" for line in lines), attrs))
+            return
 
-    return objs
+        fsm = self._checkout(names[0])
+        try:
+            header = [name.lower() for name in fsm.header]
+            lists = _list_values(fsm)
+            for record in _iter_records(fsm, lines):
+                for index in lists:
+                    record[index] = [str(item) for item in record[index]]
+                yield dict(zip(header, record))
+        finally:
+            self._checkin(names[0], fsm)
 
+    def parse(self, data, attrs):
+        """Parse `data` with the templates for `attrs`, returning the lowercased header and the rows."""
+        names = self.template_names(attrs)
+        if len(names) == 1:
+            fsm = self._checkout(names[0])
+            try:
+                header = [name.lower() for name in fsm.header]
+                lists = _list_values(fsm)
+                rows = fsm.ParseText(data)
+            finally:
+                self._checkin(names[0], fsm)
+            for row in rows:
+                for index in lists:
+                    row[index] = [str(item) for item in row[index]]
+            return header, rows
 
-def parse_output(
+        cli_table = None
+        keys = set()
+        for name in names:
+            fsm = self._checkout(name)
+            try:
+                if not keys:
+                    keys = set(fsm.GetValuesByAttrib("Key"))
+                table = texttable.TextTable()
+                table.header = fsm.header
+                for record in fsm.ParseText(data):
+                    table.Append(record)
+            finally:
+                self._checkin(name, fsm)
+            if cli_table is None:
+                cli_table = table
+            else:
+                cli_table.extend(table, set(keys))
+        return [name.lower() for name in cli_table.header], [row.values for row in cli_table]
+
+
+_REGISTRIES = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def _get_registry(template_dir):
+    """Return the registry of `template_dir`, reading its index on first use."""
+    key = os.path.abspath(template_dir)
+    registry = _REGISTRIES.get(key)
+    if registry is None:
+        with _REGISTRIES_LOCK:
+            registry = _REGISTRIES.get(key)
+            if registry is None:
+                registry = _REGISTRIES[key] = _TemplateRegistry(template_dir)
+    return registry
+
+
+def clear_cache(template_dir=None):
+    """Forget the index and compiled templates read from `template_dir`, or from every directory.
+
+    Call this after editing a template or index file in a running process; the
+    next `parse_output` reads them again.
+
+    Args:
+        template_dir: The template directory to forget. Defaults to all of them.
+    """
+    with _REGISTRIES_LOCK:
+        if template_dir is None:
+            _REGISTRIES.clear()
+        else:
+            _REGISTRIES.pop(os.path.abspath(template_dir), None)
+
+
+def parse_output(  # pylint: disable=too-many-arguments
     platform=None,
     command=None,
     data=None,
     template_dir=None,
     try_fallback=False,
+    *,
+    result_format="records",
 ):
     """Return the structured data based on the output from a network device.
 
+    The index and templates of each template directory are read once and
+    cached; see `clear_cache`. It is safe to call from many threads at once.
+
+    The entries are returned as a list of dictionaries by default. The other
+    result formats build the table a column at a time instead, without a
+    dictionary per entry, and key each column by its lowercased name:
+
+    - `columns`: a dictionary of lists.
+    - `numpy`: a dictionary of NumPy arrays; a fixed-width str array per
+      column, or an object array of lists for List values. Needs numpy.
+    - `dataframe`: a pandas DataFrame. Needs pandas.
+
     Args:
         platform: The platform the command was run on (e.g., `cisco_ios`).
         command: The command run on the platform (e.g., `show int status`).
@@ -57,9 +412,10 @@ def parse_output(
             Defaults to setting of environment variable or default ntc-templates dir.
             The specified directory must have a properly configured index file.
         try_fallback: Whether to fallback to using the default template directory upon failure with `template_dir`.
+        result_format: One of `records`, `columns`, `numpy` or `dataframe`; keyword only.
 
     Returns:
-        list: The TextFSM table entries as dictionaries.
+        list: The TextFSM table entries as dictionaries, or the table in `result_format`.
     """
     if not HAS_CLITABLE:
         msg = (
@@ -69,16 +425,140 @@ def parse_output(
             "https://github.com/google/textfsm/pull/82\n\n"
         )
         raise ImportError(msg)
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"result_format must be one of {', '.join(RESULT_FORMATS)}, not {result_format!r}")
 
-    template_dir = template_dir or _get_template_dir()
-    cli_table = clitable.CliTable("index", template_dir)
+    default_dir = _get_template_dir()
+    template_dirs = [template_dir or default_dir]
+    if try_fallback and template_dirs[0] != default_dir:
+        template_dirs.append(default_dir)
     attrs = {"Command": command, "Platform": platform}
-    try:
-        cli_table.ParseCmd(data, attrs)
-        structured_data = _clitable_to_dict(cli_table)
-    except clitable.CliTableError as err:
-        if try_fallback and template_dir != _get_template_dir():
-            return parse_output(platform, command, data)
-        raise ParsingException(f'Unable to parse command "{command}" on platform {platform} - {str(err)}') from err
-
-    return structured_data
+    error = None
+    for directory in template_dirs:
+        registry = _get_registry(directory)
+        try:
+            return _format_result(result_format, *registry.parse(data, attrs))
+        except clitable.CliTableError as err:
+            error = err
+
+    raise ParsingException(f'Unable to parse command "{command}" on platform {platform} - {str(error)}') from error
+
+
+def parse_output_iter(
+    platform=None,
+    command=None,
+    data=None,
+    template_dir=None,
+    try_fallback=False,
+):
+    """Yield the structured data of the output from a network device, one entry at a time.
+
+    Unlike `parse_output`, the output need not be in memory at once: `data`
+    can be a file object, a socket's `makefile()` or any iterable of str or
+    bytes chunks. Each entry is yielded as soon as the template records it,
+    so Filldown, Required and EOF behave as with `parse_output`, and the
+    entries are the same. Outputs whose index entry lists several templates
+    are read in full first, because their tables are joined once complete.
+
+    Args:
+        platform: The platform the command was run on (e.g., `cisco_ios`).
+        command: The command run on the platform (e.g., `show int status`).
+        data: The output from running the command, as a string or an iterable of chunks.
+        template_dir: As for `parse_output`.
+        try_fallback: As for `parse_output`.
+
+    Yields:
+        dict: The TextFSM table entries.
+    """
+    default_dir = _get_template_dir()
+    template_dirs = [template_dir or default_dir]
+    if try_fallback and template_dirs[0] != default_dir:
+        template_dirs.append(default_dir)
+    attrs = {"Command": command, "Platform": platform}
+    error = None
+    for directory in template_dirs:
+        registry = _get_registry(directory)
+        try:
+            registry.template_names(attrs)
+        except clitable.CliTableError as err:
+            error = err
+            continue
+        yield from registry.iter_parse(_iter_lines(data), attrs)
+        return
+
+    raise ParsingException(f'Unable to parse command "{command}" on platform {platform} - {str(error)}') from error
+
+
+def _parse_chunk(jobs, template_dir, try_fallback, result_format):
+    """Parse (position, platform, command, data) jobs; errors are returned in place of rows."""
+    results = []
+    for position, platform, command, data in jobs:
+        try:
+            rows = parse_output(platform, command, data, template_dir, try_fallback, result_format=result_format)
+        except Exception as err:  # pylint: disable=broad-except
+            rows = err
+        results.append((position, rows))
+    return results
+
+
+def _chunk_jobs(jobs, template_dir, max_workers, chunksize):
+    """Split (position, platform, command, data) jobs into chunks of jobs that resolve to the same template."""
+    registry = _get_registry(template_dir or _get_template_dir())
+    groups = {}
+    for job in jobs:
+        try:
+            row_number = registry.lookup.row_number(job[1], job[2])
+        except TypeError:
+            row_number = 0  # left for parse_output to reject
+        groups.setdefault(row_number, []).append(job)
+
+    chunksize = chunksize or max(1, math.ceil(len(jobs) / (4 * max_workers)))
+    chunks = []
+    for group in groups.values():
+        for start in range(0, len(group), chunksize):
+            end = start + chunksize
+            chunks.append(group[start:end])
+    return chunks
+
+
+def parse_output_many(  # pylint: disable=too-many-arguments
+    jobs, template_dir=None, try_fallback=False, *, max_workers=None, chunksize=None, result_format="records"
+):
+    """Parse many outputs at once, in parallel across processes.
+
+    Jobs are grouped by the template they resolve to and sent to the worker
+    processes in chunks, so that each worker compiles a template once and
+    parses many outputs with it. Each job is parsed as `parse_output` would
+    parse it. An error parsing one job does not stop the batch: its exception
+    takes the place of its rows in the results.
+
+    `max_workers`, `chunksize` and `result_format` are keyword only.
+
+    Args:
+        jobs: An iterable of (platform, command, data) tuples.
+        template_dir: As for `parse_output`.
+        try_fallback: As for `parse_output`.
+        max_workers: Worker processes; defaults to the number of CPUs. With
+            one worker, or one job, the jobs are parsed in this process.
+        chunksize: Jobs sent to a worker at a time; defaults to spreading the
+            jobs over about four chunks per worker.
+        result_format: As for `parse_output`.
+
+    Returns:
+        list: For each job in order, its table in `result_format` or the exception raised parsing it.
+    """
+    jobs = [(position, platform, command, data) for position, (platform, command, data) in enumerate(jobs)]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(jobs) <= 1:
+        return [rows for _position, rows in _parse_chunk(jobs, template_dir, try_fallback, result_format)]
+
+    results = [None] * len(jobs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = [
+            executor.submit(_parse_chunk, chunk, template_dir, try_fallback, result_format)
+            for chunk in _chunk_jobs(jobs, template_dir, max_workers, chunksize)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            for position, rows in future.result():
+                results[position] = rows
+    return results
@@ -209,6 +209,13 @@ def docs(context, local=INVOKE_LOCAL):
     run_cmd(context, exec_cmd, local, port="8001:8001")
 
 
+@task
+def build_bundle(context, local=INVOKE_LOCAL):
+    """Compile the index and templates into ntc_templates/templates/index.bundle."""
+    exec_cmd = "python -m ntc_templates.bundle"
+    run_cmd(context, exec_cmd, local)
+
+
 @task
 def clean_yaml_file(context, file, local=INVOKE_LOCAL):
     """Transform a yaml file to expected output."""
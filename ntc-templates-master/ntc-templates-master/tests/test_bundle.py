@@ -0,0 +1,115 @@
+"""Tests for the ahead-of-time compiled template bundle."""
+
+# The registry and the helpers under test are private to ntc_templates
+# pylint: disable=protected-access
+
+import io
+import os
+import pickle
+import shutil
+
+import pytest
+import textfsm
+
+from ntc_templates import bundle, parse
+from ntc_templates.bundle import build_bundle, load_bundle
+from ntc_templates.matcher import FusedTextFSM
+from ntc_templates.parse import _get_template_dir, clear_cache, parse_output
+
+SHOW_CLOCK = "*18:57:38.347 UTC Mon Oct 19 2015\n"
+SHOW_VERSION = "Cisco IOS Software, C2960 Software (C2960-LANBASEK9-M), Version 12.2(55)SE7, RELEASE SOFTWARE (fc1)\n"
+
+
+@pytest.fixture
+def template_dir(tmp_path, monkeypatch):
+    """A directory with two templates, their index and a bundle built from them, trusted by parse_output."""
+    monkeypatch.setenv("NTC_TEMPLATES_TRUST_BUNDLE", "1")
+    for name in ("cisco_ios_show_clock.textfsm", "cisco_ios_show_version.textfsm"):
+        shutil.copy(os.path.join(_get_template_dir(), name), tmp_path)
+    (tmp_path / "index").write_text(
+        "Template, Hostname, Platform, Command\n\n"
+        "cisco_ios_show_version.textfsm, .*, cisco_ios, sh[[ow]] ver[[sion]]\n"
+        "cisco_ios_show_clock.textfsm, .*, cisco_ios, sh[[ow]] clo[[ck]]\n"
+    )
+    build_bundle(str(tmp_path))
+    yield tmp_path
+    clear_cache(str(tmp_path))
+
+
+def rules(fsm):
+    """Every rule of a TextFSM as its pattern and compiled regex; equal regexes have the same compiled code."""
+    return [(rule.regex, rule.regex_obj.regex) for state in fsm.states.values() for rule in state]
+
+
+def test_bundled_templates_compile_to_the_same_regexes(tmp_path):
+    template_dir = _get_template_dir()
+    loaded = load_bundle(template_dir, build_bundle(template_dir, str(tmp_path / "index.bundle")), trusted=True)
+
+    assert len(loaded._templates) > 500
+    for name in loaded._templates:
+        with open(os.path.join(template_dir, name), "rb") as template:
+            template_bytes = template.read()
+        fsm = textfsm.TextFSM(io.StringIO(template_bytes.decode("utf-8"), newline=None))
+        bundled = loaded.template(name, template_bytes)
+        assert isinstance(bundled, FusedTextFSM), name
+        assert bundled.header == fsm.header, name
+        assert rules(bundled) == rules(fsm), name
+
+
+def test_parse_output_uses_the_bundle(template_dir, monkeypatch):
+    def compile_template(template):
+        raise AssertionError("compiled a template from source")
+
+    monkeypatch.setattr(parse, "FusedTextFSM", compile_template)
+    assert parse_output("cisco_ios", "sh ver", SHOW_VERSION, str(template_dir))[0]["version"] == "12.2(55)SE7"
+    assert parse._get_registry(str(template_dir)).bundle is not None
+    monkeypatch.setattr(parse, "FusedTextFSM", FusedTextFSM)
+
+    assert parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir)) == parse_output(
+        "cisco_ios", "show clock", SHOW_CLOCK
+    )
+
+
+def test_edited_files_are_read_from_source(template_dir):
+    template = template_dir / "cisco_ios_show_clock.textfsm"
+    template.write_text(template.read_text().replace("YEAR", "YR"))
+    with open(template_dir / "index", "a", encoding="utf-8") as index:
+        index.write("cisco_ios_show_clock.textfsm, .*, cisco_ios, time\n")
+
+    assert parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir))[0]["yr"] == "2015"
+    assert parse_output("cisco_ios", "time", SHOW_CLOCK, str(template_dir))[0]["yr"] == "2015"
+    assert parse_output("cisco_ios", "sh ver", SHOW_VERSION, str(template_dir))[0]["version"] == "12.2(55)SE7"
+
+
+def test_bundles_for_other_versions_are_ignored(template_dir, monkeypatch):
+    path = str(template_dir / "index.bundle")
+    assert load_bundle(str(template_dir), trusted=True) is not None
+
+    runtime_tag = bundle._runtime_tag
+    monkeypatch.setattr(bundle, "_runtime_tag", lambda: (bundle.BUNDLE_FORMAT, "cpython-27", 0, "0.0"))
+    assert load_bundle(str(template_dir), trusted=True) is None
+
+    monkeypatch.setattr(bundle, "_runtime_tag", runtime_tag)
+    with open(path, "r+b") as bundle_file:
+        bundle_file.truncate(100)
+    assert load_bundle(str(template_dir), trusted=True) is None
+    assert parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir))[0]["year"] == "2015"
+
+
+class _RunsCode:  # pylint: disable=too-few-public-methods
+    """Unpickles by calling os.system, as a planted bundle might."""
+
+    def __reduce__(self):
+        return (os.system, ("exit 0",))
+
+
+def test_only_trusted_bundles_are_loaded(template_dir, monkeypatch):
+    monkeypatch.delenv("NTC_TEMPLATES_TRUST_BUNDLE")
+    assert load_bundle(str(template_dir)) is None
+    assert parse._get_registry(str(template_dir)).bundle is None
+    assert parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir))[0]["year"] == "2015"
+
+    header = pickle.dumps({"tag": bundle._runtime_tag(), "index": ("", []), "templates": {}, "run": _RunsCode()})
+    with open(template_dir / "index.bundle", "wb") as bundle_file:
+        bundle_file.write(bundle._HEADER_SIZE.pack(len(header)) + header)
+    assert load_bundle(str(template_dir), trusted=True) is None
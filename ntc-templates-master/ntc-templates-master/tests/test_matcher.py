@@ -0,0 +1,151 @@
+"""Tests for FusedTextFSM, which matches each state's rules with one regex."""
+
+# The registry and the helpers under test are private to ntc_templates
+# pylint: disable=protected-access
+
+import glob
+import io
+import os
+import pickle
+
+import pytest
+import textfsm
+
+from ntc_templates import parse
+from ntc_templates.matcher import FusedTextFSM, _global_flags, _required_literal, _unnamed_groups
+from ntc_templates.parse import _get_template_dir
+
+TEMPLATE = r"""Value Required NAME (\S+)
+Value List TAGS (\w+)
+Value List PAIRS ((?P<key>\w+)=(?P<val>\w+))
+Value Filldown SITE (\S+)
+Value TWICE (\S+)
+
+Start
+  ^site ${SITE}
+  ^name ${NAME} -> Continue
+  ^name \S+ tag ${TAGS} -> Continue
+  ^name \S+ tag \w+ tag ${TAGS}
+  ^\s*pair ${PAIRS}
+  ^(\w)\1 ${TWICE}
+  ^end -> Record Other
+  ^fail -> Error "bad line"
+
+Other
+  ^again -> Start
+  ^SITE ${SITE}
+"""
+
+OUTPUT = """site north
+name a tag x tag y
+pair k=v
+pair j=w
+nothing here
+aa double
+end
+SITE south
+name b
+again
+name c tag z
+end
+again
+name d
+fail
+"""
+
+
+def parse_text(cls, template, text):
+    """The records, or the error, of `template` on `text`."""
+    fsm = cls(io.StringIO(template))
+    try:
+        return fsm.ParseText(text)
+    except textfsm.TextFSMError as err:
+        return str(err)
+
+
+def test_continue_lists_backreferences_and_errors_behave_as_in_textfsm():
+    records = parse_text(FusedTextFSM, TEMPLATE, OUTPUT)
+    assert records == parse_text(textfsm.TextFSM, TEMPLATE, OUTPUT)
+    assert "bad line" in records
+
+    ends = OUTPUT.replace("fail\n", "end\n")
+    records = parse_text(FusedTextFSM, TEMPLATE, ends)
+    assert records == parse_text(textfsm.TextFSM, TEMPLATE, ends)
+    assert records[0] == ["a", ["x", "y"], [{"key": "k", "val": "v"}, {"key": "j", "val": "w"}], "north", "double"]
+    assert [record[3] for record in records] == ["north", "south", "south"]
+
+
+def test_reused_fsm_parses_as_a_new_one():
+    fsm = FusedTextFSM(io.StringIO(TEMPLATE))
+    expected = parse_text(textfsm.TextFSM, TEMPLATE, OUTPUT.replace("fail\n", ""))
+    for _ in range(3):
+        assert fsm.ParseText(OUTPUT.replace("fail\n", "")) == expected
+        fsm.Reset()
+
+    copy = pickle.loads(pickle.dumps(fsm))
+    assert copy.ParseText(OUTPUT.replace("fail\n", "")) == expected
+
+
+def test_rules_with_global_flags_are_matched_one_by_one():
+    template = "Value NAME (\\S+)\n\nStart\n  ^foo ${NAME} -> Record\n  ^bar ${NAME} -> Record\n"
+    records = []
+    for cls in (textfsm.TextFSM, FusedTextFSM):
+        fsm = cls(io.StringIO(template))
+        # Templates cannot start a rule with (?i), and Python 3.11 rejects it later in a regex; 3.8-3.10 accept it
+        rule = fsm.states["Start"][1]
+        rule.regex = r"(?i)^bar (?P<NAME>\S+)"
+        rule.regex_obj = textfsm.parser.CopyableRegexObject(rule.regex)
+        records.append(fsm.ParseText("FOO x\nfoo y\nBAR z\n"))
+    assert records[1] == records[0] == [["y"], ["z"]]
+    assert _global_flags("(?i)^bar") and _global_flags("(?x)^bar  ")
+    assert not _global_flags("^(?i:bar)") and not _global_flags("^bar")
+
+
+@pytest.mark.parametrize(
+    "pattern, unnamed",
+    [
+        (r"^(?P<NAME>\S+)\s+(up|down)", r"^(\S+)\s+(up|down)"),
+        (r"^(?P<A>(?P<B>\d+)\.(?P<C>\d+))", r"^((\d+)\.(\d+))"),
+        (r"^\(?P<X>[(?P<Y>]", r"^\(?P<X>[(?P<Y>]"),
+    ],
+)
+def test_unnamed_groups(pattern, unnamed):
+    assert _unnamed_groups(pattern) == unnamed
+
+
+@pytest.mark.parametrize(
+    "pattern, literal",
+    [
+        (r"^\s*Command Execution Time: .*", "Command Execution Time: "),
+        (r"^\s+vlan (?P<ID>\d+)", "vlan "),
+        (r"^(?P<IP>\d+\.\d+)\s+", "."),
+        (r"^(a|b)xyz", "xyz"),
+        (r"^(?:Port )+\d+", "Port "),
+        (r"^(?:Port )*\d+", ""),
+        (r"(?i)^interface", ""),
+        (r"^(?i:vlan) \d+ name", " name"),
+        (r"^\s+", ""),
+    ],
+)
+def test_required_literal(pattern, literal):
+    assert _required_literal(pattern) == literal
+
+
+def test_records_match_textfsm_for_every_sample():
+    registry = parse._get_registry(_get_template_dir())
+    compared = 0
+    for path in sorted(glob.glob("tests/*/*/*.raw")):
+        parts = os.path.normpath(path).split(os.sep)
+        attrs = {"Platform": parts[1], "Command": " ".join(parts[2].split("_"))}
+        try:
+            names = registry.template_names(attrs)
+        except textfsm.clitable.CliTableError:
+            continue
+        with open(path, "r", encoding="utf-8") as data:
+            text = data.read()
+        for name in names:
+            with open(os.path.join(_get_template_dir(), name), "r", encoding="utf-8") as template:
+                source = template.read()
+            assert parse_text(FusedTextFSM, source, text) == parse_text(textfsm.TextFSM, source, text), path
+            compared += 1
+    assert compared > 1000
@@ -0,0 +1,282 @@
+"""Tests for the cached template registry behind parse_output."""
+
+# The registry and the helpers under test are private to ntc_templates
+# pylint: disable=protected-access
+
+import concurrent.futures
+import glob
+import os
+import random
+import re
+import shutil
+
+import pytest
+from textfsm import clitable, texttable
+
+from ntc_templates import parse
+from ntc_templates.parse import (
+    ParsingException,
+    _get_template_dir,
+    _iter_lines,
+    clear_cache,
+    parse_output,
+    parse_output_iter,
+    parse_output_many,
+)
+
+SHOW_CLOCK = "*18:57:38.347 UTC Mon Oct 19 2015\n"
+SHOW_CLOCK_PARSED = [
+    {"time": "18:57:38.347", "timezone": "UTC", "dayweek": "Mon", "month": "Oct", "day": "19", "year": "2015"}
+]
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    """A copy of the index and the show clock template."""
+    default_dir = _get_template_dir()
+    shutil.copy(f"{default_dir}/cisco_ios_show_clock.textfsm", tmp_path)
+    (tmp_path / "index").write_text(
+        "Template, Hostname, Platform, Command\n\ncisco_ios_show_clock.textfsm, .*, cisco_ios, sh[[ow]] clo[[ck]]\n"
+    )
+    yield tmp_path
+    clear_cache(str(tmp_path))
+
+
+def test_index_is_read_once_per_template_dir(template_dir):
+    assert parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir)) == SHOW_CLOCK_PARSED
+    registry = parse._get_registry(str(template_dir))
+    (template_dir / "index").write_text("Template, Hostname, Platform, Command\n")
+
+    assert parse_output("cisco_ios", "sh clo", SHOW_CLOCK, str(template_dir)) == SHOW_CLOCK_PARSED
+    assert parse._get_registry(str(template_dir)) is registry
+
+
+def test_clear_cache_rereads_edited_templates(template_dir):
+    assert parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir)) == SHOW_CLOCK_PARSED
+    template = template_dir / "cisco_ios_show_clock.textfsm"
+    template.write_text(template.read_text().replace("YEAR", "YR"))
+
+    assert "yr" not in parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir))[0]
+    clear_cache(str(template_dir))
+    assert parse_output("cisco_ios", "show clock", SHOW_CLOCK, str(template_dir))[0]["yr"] == "2015"
+
+
+def test_try_fallback_uses_the_default_templates(template_dir):
+    output = "Vlan1                  unassigned      YES unset  up                    up\n"
+    with pytest.raises(ParsingException, match="No template found"):
+        parse_output("cisco_ios", "show ip int brief", output, str(template_dir))
+
+    parsed = parse_output("cisco_ios", "show ip int brief", output, str(template_dir), try_fallback=True)
+    assert parsed == parse_output("cisco_ios", "show ip int brief", output)
+    assert parsed[0]["interface"] == "Vlan1"
+
+
+def test_parsing_from_many_threads_matches_parsing_alone():
+    outputs = [f"*{hour:02}:57:38.347 UTC Mon Oct 19 2015\n" * (hour % 3 + 1) for hour in range(24)]
+    expected = [parse_output("cisco_ios", "show clock", output) for output in outputs]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        parsed = list(executor.map(lambda output: parse_output("cisco_ios", "show clock", output), outputs * 20))
+    assert parsed == expected * 20
+
+
+def test_parse_output_many_returns_results_in_order_with_errors_in_place(template_dir):
+    interfaces = "Vlan1                  unassigned      YES unset  up                    up\n"
+    jobs = [
+        ("cisco_ios", "show clock", SHOW_CLOCK),
+        ("cisco_ios", "show ip int brief", interfaces),
+        ("cisco_ios", "show no such thing", "output"),
+        ("cisco_ios", "sh ip int br", interfaces * 3),
+        ("cisco_ios", "show clock", SHOW_CLOCK * 2),
+    ] * 3
+
+    for max_workers in (1, 2):
+        results = parse_output_many(jobs, max_workers=max_workers, chunksize=2)
+        assert len(results) == len(jobs)
+        for (platform, command, data), result in zip(jobs, results):
+            if command == "show no such thing":
+                assert isinstance(result, ParsingException)
+            else:
+                assert result == parse_output(platform, command, data)
+
+    results = parse_output_many(jobs[:2], template_dir=str(template_dir), try_fallback=True, max_workers=2)
+    assert results == [SHOW_CLOCK_PARSED, parse_output("cisco_ios", "show ip int brief", interfaces)]
+
+
+@pytest.mark.parametrize(
+    "command, path",
+    [
+        ("show ip int brief", "tests/cisco_ios/show_ip_interface_brief/cisco_ios_show_ip_interface_brief.raw"),
+        ("show archive", "tests/cisco_ios/show_archive/cisco_ios_show_archive.raw"),
+        ("show module", "tests/cisco_ios/show_module/cisco_ios_show_module1.raw"),
+        ("show clock", None),
+    ],
+)
+def test_result_formats_hold_the_entries_as_columns(command, path):
+    pytest.importorskip("pandas")
+    data = "no output\n"
+    if path is not None:
+        with open(path, encoding="utf-8") as raw_file:
+            data = raw_file.read()
+    entries = parse_output("cisco_ios", command, data)
+    header = list(parse_output("cisco_ios", command, data, result_format="columns"))
+    columns = {name: [entry[name] for entry in entries] for name in header}
+    assert all(list(entry) == header for entry in entries)
+
+    assert parse_output("cisco_ios", command, data, result_format="columns") == columns
+    arrays = parse_output("cisco_ios", command, data, result_format="numpy")
+    assert list(arrays) == header
+    assert {name: array.tolist() for name, array in arrays.items()} == columns
+    assert all(array.dtype.kind in "UO" and len(array) == len(entries) for array in arrays.values())
+    frame = parse_output("cisco_ios", command, data, result_format="dataframe")
+    assert list(frame.columns) == header
+    assert frame.to_dict("list") == columns
+
+
+def test_result_formats_of_list_values(tmp_path):
+    pytest.importorskip("numpy")
+    (tmp_path / "stream.textfsm").write_text(STREAM_TEMPLATE)
+    (tmp_path / "index").write_text(
+        "Template, Hostname, Platform, Command\n\nstream.textfsm, .*, test_os, show ports\n"
+    )
+    output = "Chassis A\nPort 1 is up\n  vlan 10\n  vlan 20\nPort 2 is down\n"
+
+    arrays = parse_output("test_os", "show ports", output, str(tmp_path), result_format="numpy")
+    assert arrays["port"].dtype.str == "<U1"
+    assert arrays["vlans"].dtype == object
+    assert arrays["vlans"].tolist() == [[], ["10", "20"]]
+    assert parse_output("test_os", "show ports", output, str(tmp_path), result_format="columns")["vlans"] == [
+        [],
+        ["10", "20"],
+    ]
+    with pytest.raises(ValueError, match="result_format"):
+        parse_output("test_os", "show ports", output, str(tmp_path), result_format="rows")
+    assert (
+        parse_output_many([("cisco_ios", "show clock", SHOW_CLOCK)] * 2, max_workers=2, result_format="columns")
+        == [{name: [value] for name, value in SHOW_CLOCK_PARSED[0].items()}] * 2
+    )
+    clear_cache(str(tmp_path))
+
+
+STREAM_TEMPLATE = r"""Value Filldown CHASSIS (\S+)
+Value Required PORT (\d+)
+Value STATE (up|down)
+Value Fillup SLOT (\d+)
+Value List VLANS (\d+)
+
+Start
+  ^Chassis ${CHASSIS}
+  ^Port ${PORT} is ${STATE} -> Record
+  ^  vlan ${VLANS}
+  ^Slot ${SLOT}
+  ^Orphan state ${STATE} -> Record
+
+EOF
+"""
+
+
+def chunked(text, rng):
+    """`text` in random pieces, as str or as UTF-8 bytes."""
+    data = text.encode("utf-8") if rng.random() < 0.5 else text
+    cuts = sorted(rng.sample(range(len(data) + 1), min(len(data) + 1, rng.randrange(12))))
+    return [data[start:end] for start, end in zip([0] + cuts, cuts + [len(data)])]
+
+
+def test_iter_lines_splits_chunks_as_splitlines_splits_the_text():
+    rng = random.Random(0)
+    for text in ["a\r\nb\rc\n\nd", "\r\n\r\n", "x\r", "\n", "", "a\x0bb\x1cc d\x85e é f\n"]:
+        for _ in range(50):
+            assert list(_iter_lines(chunked(text, rng))) == text.splitlines()
+
+
+def test_parse_output_iter_yields_records_as_they_complete(tmp_path):
+    (tmp_path / "stream.textfsm").write_text(STREAM_TEMPLATE)
+    (tmp_path / "index").write_text(
+        "Template, Hostname, Platform, Command\n\nstream.textfsm, .*, test_os, show ports\n"
+    )
+    output = (
+        "Chassis A\nPort 1 is up\n  vlan 10\n  vlan 20\nPort 2 is down\nOrphan state up\nSlot 3\n"
+        "Chassis B\nPort 3 is up\nSlot 4\nPort 4 is down\n  vlan 30\n"
+    )
+    expected = parse_output("test_os", "show ports", output, str(tmp_path))
+    # Filldown CHASSIS, Fillup SLOT, no record without the Required PORT, none at the empty EOF state
+    assert [(entry["chassis"], entry["port"], entry["slot"], entry["vlans"]) for entry in expected] == [
+        ("A", "1", "3", []),
+        ("A", "2", "3", ["10", "20"]),
+        ("B", "3", "3", []),
+        ("B", "4", "4", []),
+    ]
+
+    rng = random.Random(1)
+    for _ in range(20):
+        assert list(parse_output_iter("test_os", "show ports", chunked(output, rng), str(tmp_path))) == expected
+
+    read = []
+
+    def lines():
+        for line in output.splitlines(keepends=True):
+            read.append(line)
+            yield line
+
+    entries = parse_output_iter("test_os", "show ports", lines(), str(tmp_path))
+    assert next(entries)["port"] == "1"
+    # Port 1's record waits for a record with its Fillup SLOT set, the one Port 3 completes
+    assert read[-1] == "Port 3 is up\n"
+    assert [entry["port"] for entry in entries] == ["2", "3", "4"]
+    clear_cache(str(tmp_path))
+
+
+def test_parse_output_iter_matches_parse_output_on_every_sample():
+    for path in sorted(glob.glob("tests/*/*/*.raw")):
+        parts = os.path.normpath(path).split(os.sep)
+        platform, command = parts[1], " ".join(parts[2].split("_"))
+        with open(path, "r", encoding="utf-8") as data:
+            try:
+                expected = parse_output(platform, command, data.read())
+            except ParsingException:
+                continue
+            data.seek(0)
+            assert list(parse_output_iter(platform, command, data)) == expected, path
+
+
+def index_lookups():
+    """For every index row, ways of writing its command on its own platform, on another and on unknown ones."""
+    rows = texttable.TextTable()
+    with open(f"{_get_template_dir()}/index", encoding="utf-8") as index:
+        rows.CsvToTable(index)
+    platforms = sorted({row["Platform"] for row in rows if row["Platform"].replace("_", "").isalnum()})
+    platforms += ["cisco_ios_telnet", "cisco_asa", "cisco_ftd", "brocade_vyos", "vyos", "unknown"]
+    for position, row in enumerate(rows):
+        full = row["Command"].replace("[[", "").replace("]]", "")
+        short = re.sub(r"\[\[.*?\]\]", "", row["Command"])
+        for platform in (row["Platform"], platforms[position % len(platforms)]):
+            for command in (full, short, f"{full} | include up", full[:-1], f"{short}  ", ""):
+                yield platform, command
+
+
+def test_index_lookup_matches_clitable_for_every_index_row():
+    registry = parse._get_registry(_get_template_dir())
+    index = clitable.CliTable("index", _get_template_dir()).index
+    matched = 0
+    for platform, command in index_lookups():
+        expected = index.GetRowMatch({"Command": command, "Platform": platform})
+        assert registry.lookup.row_number(platform, command) == expected, (platform, command)
+        matched += bool(expected)
+    assert matched > 2000
+
+
+@pytest.mark.parametrize(
+    "pattern, prefix",
+    [
+        ("sh((o(w)?)?)? ip", "sh"),
+        ("show vlans?", "show vlan"),
+        ("show +ip", "show "),
+        ("show 802\\.11[ab]", "show 802"),
+        ("show (ip|ipv6) route", "show "),
+        ("show ip|display ip", ""),
+        ("show [|] x|y", ""),
+        ("", ""),
+    ],
+)
+def test_literal_prefix(pattern, prefix):
+    assert parse._literal_prefix(pattern) == prefix
@@ -0,0 +1,98 @@
+"""Tests for raw-output capture archives and offline replay."""
+
+from netscraper import pipeline
+from netscraper.capture import CaptureWriter, read_capture
+from netscraper.collectors import Device, collect_device
+
+SWITCH_OUTPUTS = {
+    'show mac-address-table': """   MAC Address    Vid   Type       Source
+----------------- ---- ------- --------------
+00-0E-C4-CE-AD-39   15 Dynamic Unit:1 Port:47
+00-C0-B7-4C-91-CF   15 Dynamic Unit:1 Port: 7
+""",
+    'show interface name': """Unit/Port Name
+---- ----------------------------------------------------------------
+1/7    <===PDU===>
+1/47   <===Uplink===>
+""",
+    'show interfaces': """                                  Status       Auto                   Flow
+Port Trunk Admin   Oper Link LinkTrap Negotiation  Speed    Duplex Control
+---- ----- ------- ---- ---- -------- ----------- -------- ------ -------
+1/7         Enable  Up   Up   Enabled  Enabled     100Mbps  Full   Disabled
+1/47        Enable  Up   Up   Enabled  Enabled     1000Mbps Full   Disabled
+""",
+}
+
+ROUTER_OUTPUTS = {
+    'show ip vrf': """================================================================================
+                                   VRF INFORMATION
+================================================================================
+VRF        VRF   VLAN  ARP    RIP  OSPF BGP  PIM  NBRv6 RIPng OSPFv3 PIM6 UNICAST ORIGIN
+NAME       ID    COUNT COUNT                       COUNT                   ACTIVE
+--------------------------------------------------------------------------------
+GlobalRouter 0   3     2      FALSE FALSE FALSE FALSE 0   FALSE FALSE FALSE TRUE  static
+corp_users 1     5     0      FALSE FALSE FALSE FALSE 0   FALSE FALSE FALSE TRUE  static
+""",
+    'show ip arp vrfid 0': """IP_ADDRESS     MAC_ADDRESS       VLAN  PORT  TYPE     TTL(10 Sec) TUNNEL
+10.6.1.20      00:c0:b7:4c:91:cf 20    1/7   LEARNED  2158        -
+""",
+}
+
+
+class FakeConnection:
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def send_command(self, command):
+        return self.outputs.get(command, '')
+
+    def enable(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+def capture_session(writer, device, outputs):
+    net_connect = writer.wrap(FakeConnection(outputs), device)
+    net_connect.enable()
+    tables = collect_device(net_connect, device)
+    net_connect.disconnect()
+    return tables
+
+
+def test_capture_records_every_command(tmp_path):
+    archive = str(tmp_path / 'run.jsonl.gz')
+    switch = Device('10.1.0.1', 'switch', 'avaya_ers', 'Newark')
+
+    with CaptureWriter(archive) as writer:
+        capture_session(writer, switch, SWITCH_OUTPUTS)
+
+    records = list(read_capture(archive))
+    assert [record['command'] for record in records] == list(SWITCH_OUTPUTS)
+    assert all(record['device'] == '10.1.0.1' and record['site'] == 'Newark' for record in records)
+    assert records[0]['output'] == SWITCH_OUTPUTS['show mac-address-table']
+    assert records[0]['timestamp'].endswith('+00:00')
+
+
+def test_replay_matches_live_parse(tmp_path):
+    archive = str(tmp_path / 'run.jsonl.gz')
+    router = Device('10.0.0.1', 'router', 'avaya_ers', '')
+    switch = Device('10.1.0.1', 'switch', 'avaya_ers', '')
+
+    with CaptureWriter(archive) as writer:
+        live = [capture_session(writer, router, ROUTER_OUTPUTS), capture_session(writer, switch, SWITCH_OUTPUTS)]
+
+    results = pipeline.replay([archive])
+
+    assert [result.device for result in results] == [router, switch]
+    for result, tables in zip(results, live):
+        assert result.error is None
+        for table, rows in tables.items():
+            assert list(getattr(result, table)) == rows
+
+    endpoints = pipeline.merge(results)['endpoints']
+    assert [(row['PORT'], row['IP_ADDRESS'], row['OPER']) for row in endpoints] == [
+        ('7', '10.6.1.20', 'Up'),
+        ('47', None, 'Up'),
+    ]
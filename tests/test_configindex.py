@@ -0,0 +1,126 @@
+"""Tests for the running-config section index."""
+
+import textfsm
+
+from netscraper.config import TEMPLATE_PATH_VLAN
+from netscraper.configindex import VLAN_SECTIONS, ConfigIndex, Section, has_other_contexts
+from netscraper.templates import iter_textfsm_output, parse_textfsm_output
+
+MODULE_VLAN = """vlan members remove 1 1/1-1/18 portmember
+vlan create 10 name "Signage/PA" type port-mstprstp 1
+vlan mlt 10 2
+vlan i-sid 10 1700010
+interface Vlan 10
+
+vrf corp_users
+ip address 10.6.10.3 255.255.254.0 1
+ip vrrp 10 enable
+exit
+vlan create 530 name "FirstNet530" type port-mstprstp 1
+vlan i-sid 530 12990530
+vlan create 4000 name "IST" type port-mstprstp 1
+vlan i-sid 4000 1704000
+interface Vlan 4000
+ip address 10.29.2.81 255.255.255.252 0
+exit
+vlan create 4051 name "BVLAN-2" type spbm-bvlan
+"""
+
+CONFIG = """#
+# box type             : VSP-8404C
+#
+config terminal
+interface GigabitEthernet 1/1
+encapsulation dot1q
+exit
+""" + MODULE_VLAN + """router isis
+spbm 1 b-vid 4051
+exit
+router vrf corp_users
+ip ospf
+exit
+end"""
+
+
+def test_sections_run_from_their_first_line_to_their_exit():
+    index = ConfigIndex(CONFIG)
+    assert index.kinds() == {
+        'config terminal': 1, 'interface GigabitEthernet': 1, 'vlan members': 1, 'vlan create': 4, 'vlan mlt': 1,
+        'vlan i-sid': 3, 'interface Vlan': 2, 'router isis': 1, 'router vrf': 1, 'end': 1,
+    }
+    assert len(index) == sum(index.kinds().values())
+
+    vlan_10, = index.find('interface Vlan', name='10')
+    assert vlan_10.kind == 'interface Vlan' and vlan_10.name == '10'
+    lines = bytes(index.view(vlan_10)).decode().splitlines()
+    assert lines[0] == 'interface Vlan 10' and lines[-1] == 'exit'
+    assert [section.name for section in index.find('router isis', 'router vrf')] == ['', 'corp_users']
+    assert index.find('no such kind') == []
+    assert list(index)[-1] == Section('end', '', len(CONFIG) - 3, len(CONFIG))
+
+
+def test_views_share_the_config_buffer_and_join_sections_that_follow_on():
+    config = CONFIG.encode()
+    index = ConfigIndex(config)
+    views = index.views(*VLAN_SECTIONS)
+    assert all(view.obj is config for view in views)
+    # vlan mlt 10 cuts vlan create 10 off from the run of sections that follows it
+    assert len(views) == 2
+    assert b''.join(views).decode() == index.text(*VLAN_SECTIONS)
+    assert index.text('vlan create', name='4051') == 'vlan create 4051 name "BVLAN-2" type spbm-bvlan\n'
+
+    unicode_index = ConfigIndex(CONFIG.replace('Signage/PA', 'Signalétique'))
+    assert 'Signalétique' in unicode_index.text('vlan create', name='10')
+    assert unicode_index.text('router vrf') == 'router vrf corp_users\nip ospf\nexit\n'
+
+
+def test_context_without_an_exit_runs_to_the_end():
+    index = ConfigIndex('router isis\nspbm 1\ninterface Vlan 2\n')
+    assert [(section.kind, section.start, section.end) for section in index] == [('router isis', 0, 36)]
+
+
+def test_standalone_statements_do_not_open_a_context():
+    config = """vlan create 10 name "Users" type port-mstprstp 1
+router isis
+spbm 1 b-vid 4051
+exit
+router isis enable
+interface Vlan 10
+ip address 10.6.10.3 255.255.254.0 1
+exit
+vlan create 20 name "Voice" type port-mstprstp 1
+interface Vlan 20
+ip address 10.6.20.3 255.255.254.0 2
+exit
+"""
+    index = ConfigIndex(config)
+    assert [section.kind for section in index] == [
+        'vlan create', 'router isis', 'router isis', 'interface Vlan', 'vlan create', 'interface Vlan',
+    ]
+    rows = parse_textfsm_output(config, TEMPLATE_PATH_VLAN)
+    assert [(row['VLAN_ID'], row['VLAN_NAME'], row['IP']) for row in rows] == [
+        ('10', '"Users"', '10.6.10.3'), ('20', '"Voice"', '10.6.20.3'),
+    ]
+
+
+def test_only_configs_with_other_contexts_are_indexed():
+    assert not has_other_contexts(MODULE_VLAN, VLAN_SECTIONS)
+    assert has_other_contexts(CONFIG, VLAN_SECTIONS)
+    assert has_other_contexts(b'router vrf corp_users\nexit\n', VLAN_SECTIONS)
+    assert not has_other_contexts('router isis enable\ninterface Vlan 10\nexit\n', VLAN_SECTIONS)
+    assert has_other_contexts('interface Vlan 10\nexit\n', ())
+
+
+def test_vlan_template_parses_only_its_sections():
+    with open(TEMPLATE_PATH_VLAN) as template_file:
+        fsm = textfsm.TextFSM(template_file)
+    module_rows = [dict(zip(fsm.header, record)) for record in fsm.ParseText(MODULE_VLAN)]
+    assert [row['VLAN_ID'] for row in module_rows] == ['10', '4000']
+
+    # The exit of `router isis` would otherwise record VLAN 4051 as a row
+    rows = parse_textfsm_output(CONFIG, TEMPLATE_PATH_VLAN)
+    assert rows == module_rows
+    assert parse_textfsm_output(MODULE_VLAN, TEMPLATE_PATH_VLAN) == module_rows
+    assert list(iter_textfsm_output(CONFIG.encode(), TEMPLATE_PATH_VLAN)) == module_rows
+    assert list(iter_textfsm_output(CONFIG, TEMPLATE_PATH_VLAN)) == module_rows
+    assert list(iter_textfsm_output(MODULE_VLAN.encode(), TEMPLATE_PATH_VLAN)) == module_rows
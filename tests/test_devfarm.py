@@ -0,0 +1,78 @@
+"""Tests for the simulated SSH device farm."""
+
+import os
+
+import pytest
+
+from netscraper import devfarm, pipeline
+from netscraper.collectors import Credentials, Device, collect_device, device_result
+from netscraper.config import BASE_PATH
+from netscraper.inventory import load_inventory
+
+SAMPLES_DIR = os.path.join(BASE_PATH, 'ntc-templates-master/ntc-templates-master/tests/avaya_ers')
+
+
+class OutputsConnection:
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def send_command(self, command):
+        return self.outputs.get(command, '')
+
+
+def offline_results(fleet, devices=None):
+    devices = devices or [Device(entry.name, entry.role, entry.platform, '') for entry in fleet]
+    results = []
+    for farm_device, device in zip(fleet, devices):
+        results.append(device_result(device, **collect_device(OutputsConnection(farm_device.outputs), device)))
+    return results
+
+
+def test_synthetic_fleet_parses_and_joins():
+    fleet = devfarm.synthetic_fleet(routers=2, switches=4, hosts_per_switch=10, vlans=4, vrfs=2)
+    results = offline_results(fleet)
+
+    routers = [result for result in results if result.device.role == 'router']
+    switches = [result for result in results if result.device.role == 'switch']
+    assert all(len(result.vlan_configurations) == 4 and len(result.vlan_advance_data) == 4 for result in routers)
+    assert all(len(result.port_list) == 10 == len(result.port_status_list) for result in switches)
+    assert {arp['VRF_ID'] for result in routers for arp in result.arp_data} == {'0', '1'}
+
+    endpoints = pipeline.merge(results)['endpoints']
+    assert len(endpoints) == 40
+    # Every ARP entry on a router belongs to an up port on one of its switches
+    arp_ips = {arp['IP_ADDRESS'] for result in routers for arp in result.arp_data}
+    assert arp_ips == {row['IP_ADDRESS'] for row in endpoints if row['IP_ADDRESS']}
+    assert all(row['OPER'] == 'Up' for row in endpoints if row['IP_ADDRESS'])
+
+
+def test_synthetic_fleet_is_deterministic():
+    assert devfarm.synthetic_fleet(seed=3) == devfarm.synthetic_fleet(seed=3)
+    assert devfarm.synthetic_fleet(seed=3) != devfarm.synthetic_fleet(seed=4)
+
+
+def test_sample_outputs_name_commands_like_the_index():
+    outputs = devfarm.sample_outputs(SAMPLES_DIR)
+
+    assert 'show mac-address-table' in outputs
+    assert 'show interface name' in outputs
+
+
+def test_collect_from_farm(tmp_path, monkeypatch):
+    pytest.importorskip('paramiko')
+    pytest.importorskip('netmiko')
+    monkeypatch.chdir(tmp_path)  # netmiko session logs
+    fleet = devfarm.synthetic_fleet(routers=1, switches=2, hosts_per_switch=6)
+
+    with devfarm.DeviceFarm(fleet, username='netops', password='secret', banner=True) as farm:
+        router_path, switch_path = farm.write_inventory(str(tmp_path))
+        router_list = load_inventory(router_path, 'router')
+        switch_list = load_inventory(switch_path, 'switch')
+        assert (router_list, switch_list) == farm.inventory()
+
+        results = pipeline.collect(router_list, switch_list, Credentials('netops', 'secret', ''))
+        refused = pipeline.collect(router_list, [], Credentials('netops', 'wrong', ''))
+
+    assert [result.error for result in results] == [None, None, None]
+    assert results == offline_results(fleet, router_list + switch_list)
+    assert refused[0].error
@@ -0,0 +1,138 @@
+"""Tests for the Excel writer and the dataset export formats."""
+
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from netscraper.export import ExportError, export_report, export_to_excel
+
+
+def endpoint(port, oper, ping_status, ip_address=None):
+    return {
+        'UNIT': '1', 'PORT': port, 'NAME': f'port {port}', 'VLAN': '20', 'MAC': None, 'IP_ADDRESS': ip_address,
+        'OPER': oper, 'SPEED': '1000Mbps', 'PING_STATUS': ping_status, 'VRF_ID': None,
+    }
+
+
+def reference_tables(vlan_count):
+    return {
+        'vlans': [{'VLAN_ID': str(vlan), 'VLAN_NAME': f'"VLAN {vlan}"', 'PREFIX': '/24'} for vlan in range(vlan_count)],
+        'vrfs': [{'VRF_NAME': 'GlobalRouter', 'VRF_ID': '0'}],
+        'vlan_advance': [],
+    }
+
+
+def test_workbook_layout_and_styles(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    endpoints = [endpoint('1', 'Up', 'Good', '10.0.0.1'), endpoint('2', 'Down', 'Bad')]
+
+    path = export_to_excel(endpoints, reference_tables(4), str(tmp_path / 'report.xlsx'))
+
+    ws = openpyxl.load_workbook(path).active
+    # The VLAN table is longer than the endpoint table; the sheet runs to its end
+    assert ws.max_row == 5
+    assert [ws.cell(1, column).value for column in range(1, 11)] == list(endpoints[0])
+    assert (ws['F2'].value, ws['F3'].value, ws['L5'].value, ws['T2'].value) == ('10.0.0.1', None, '3', 'GlobalRouter')
+    assert {ws['A1'].style, ws['K1'].style} == {'netscraper_header'}
+    assert (ws['A2'].style, ws['A5'].style, ws['K5'].style, ws['V3'].style) == (
+        'netscraper_cell', 'netscraper_cell', 'netscraper_separator', 'netscraper_separator'
+    )
+    assert ws['K4'].fill.fgColor.rgb.endswith('000000')
+    assert ws.column_dimensions['C'].width == len('port 1') + 2
+    assert ws.column_dimensions['M'].width == len('VLAN_NAME') + 2
+
+
+def test_status_colours_are_conditional_formats(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    endpoints = [endpoint(str(port), 'Up', 'Good') for port in range(1, 101)]
+
+    path = export_to_excel(endpoints, reference_tables(0), str(tmp_path / 'report.xlsx'))
+
+    ws = openpyxl.load_workbook(path).active
+    rules = {
+        (str(cf.sqref), rule.formula[0], rule.dxf.fill.fgColor.rgb[-6:])
+        for cf in ws.conditional_formatting for rule in cf.rules
+    }
+    assert rules == {
+        ('G2:G101', '"Up"', '00FF00'), ('G2:G101', '"Down"', 'FF0000'),
+        ('I2:I101', '"Good"', '00FF00'), ('I2:I101', '"Bad"', 'FF0000'),
+    }
+    # No per-cell fill is stored for the coloured columns
+    assert ws['G50'].fill.fill_type is None
+
+
+def dataset_report():
+    report = reference_tables(2)
+    report['endpoints'] = [endpoint('1', 'Up', 'Good', '10.0.0.1'), endpoint('2', 'Down', 'Bad')]
+    report['endpoints'][0]['UNIT'] = ''
+    report['ping_results'] = [
+        {'IP_ADDRESS': '10.0.0.1', 'STATUS': 'Good', 'SENT': 1, 'RECEIVED': 1, 'LOSS': 0.0, 'RTT_MS': 0.25},
+    ]
+    return report
+
+
+def test_csv_and_jsonl_write_one_typed_file_per_dataset(tmp_path):
+    csv_dir, jsonl_dir = export_report(dataset_report(), str(tmp_path / 'run.xlsx'), ['csv', 'jsonl'])
+
+    assert csv_dir == jsonl_dir == str(tmp_path / 'run')
+    names = sorted(path.name for path in (tmp_path / 'run').iterdir())
+    assert names == sorted(f'{name}.{ext}' for name in ('endpoints', 'vlans', 'vrfs', 'vlan_advance', 'ping_results')
+                           for ext in ('csv', 'jsonl'))
+    with open(tmp_path / 'run' / 'endpoints.csv', newline='') as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert (rows[0]['IP_ADDRESS'], rows[1]['IP_ADDRESS'], rows[1]['PORT']) == ('10.0.0.1', '', '2')
+    lines = (tmp_path / 'run' / 'endpoints.jsonl').read_text().splitlines()
+    assert json.loads(lines[0])['UNIT'] is None
+    assert (json.loads(lines[1])['PORT'], json.loads(lines[1])['VLAN']) == (2, 20)
+    assert (tmp_path / 'run' / 'vlan_advance.jsonl').read_text() == ''
+
+
+def test_numbers_that_cannot_be_read_are_logged(tmp_path, caplog):
+    report = dataset_report()
+    report['endpoints'][0]['VLAN'] = 'trunk'
+    report['endpoints'][1]['VLAN'] = 'none'
+
+    export_report(report, str(tmp_path / 'run'), ['jsonl'])
+
+    lines = (tmp_path / 'run' / 'endpoints.jsonl').read_text().splitlines()
+    assert [json.loads(line)['VLAN'] for line in lines] == [None, None]
+    [record] = [record for record in caplog.records if record.levelname == 'WARNING']
+    assert record.getMessage() == (
+        "endpoints: 2 VLAN value(s) could not be read as int and were written as empty, such as 'trunk'"
+    )
+
+
+def test_sqlite_tables_are_typed_and_indexed(tmp_path):
+    [path] = export_report(dataset_report(), str(tmp_path / 'run'), ['sqlite'])
+
+    assert path == str(tmp_path / 'run.sqlite')
+    connection = sqlite3.connect(path)
+    try:
+        assert connection.execute(
+            'SELECT PORT, typeof(PORT), NAME FROM endpoints WHERE IP_ADDRESS = ?', ('10.0.0.1',)
+        ).fetchall() == [(1, 'integer', 'port 1')]
+        assert connection.execute('SELECT RTT_MS FROM ping_results').fetchall() == [(0.25,)]
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        connection.close()
+    assert {'endpoints_MAC', 'endpoints_IP_ADDRESS', 'vlans_VLAN_ID', 'ping_results_IP_ADDRESS'} <= indexes
+    # The VLAN-advance table was empty, so it has no columns to create
+    assert tables == {'endpoints', 'vlans', 'vrfs', 'ping_results'}
+
+
+def test_parquet_keeps_column_types(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+
+    [directory] = export_report(dataset_report(), str(tmp_path / 'run'), ['parquet'])
+
+    table = parquet.read_table(f'{directory}/endpoints.parquet')
+    assert str(table.schema.field('PORT').type) == 'int64'
+    assert table.column('PORT').to_pylist() == [1, 2]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ExportError):
+        export_report(dataset_report(), str(tmp_path / 'run'), ['xml'])
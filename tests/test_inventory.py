@@ -0,0 +1,100 @@
+"""Tests for inventory files and keyring credentials."""
+
+import sys
+import types
+
+import pytest
+
+from netscraper.collectors import Credentials
+from netscraper.inventory import Device, InventoryError, load_inventory, load_keyring_credentials
+
+
+def test_plain_text_inventory(tmp_path):
+    path = tmp_path / "Router.txt"
+    path.write_text("# core routers\n10.0.0.1\n\n10.0.0.2  # second\n10.0.0.1\n")
+
+    assert load_inventory(str(path), 'router') == [
+        Device('10.0.0.1', 'router', 'avaya_ers', ''),
+        Device('10.0.0.2', 'router', 'avaya_ers', ''),
+    ]
+
+
+def test_csv_inventory(tmp_path):
+    path = tmp_path / "Switch.csv"
+    path.write_text("Host,Platform,Site\n10.1.0.1,extreme_vsp,Newark\n10.1.0.2,,Secaucus\n")
+
+    assert load_inventory(str(path), 'switch') == [
+        Device('10.1.0.1', 'switch', 'extreme_vsp', 'Newark'),
+        Device('10.1.0.2', 'switch', 'avaya_ers', 'Secaucus'),
+    ]
+
+
+def test_csv_comments_are_whole_rows(tmp_path):
+    path = tmp_path / "Switch.csv"
+    path.write_text("# closets\nhost,site\n10.1.0.1,Closet #4\n  # 10.1.0.9,spare\n\n10.1.0.2,Newark\n")
+
+    assert load_inventory(str(path), 'switch') == [
+        Device('10.1.0.1', 'switch', 'avaya_ers', 'Closet #4'),
+        Device('10.1.0.2', 'switch', 'avaya_ers', 'Newark'),
+    ]
+
+
+def test_yaml_inventory(tmp_path):
+    pytest.importorskip('yaml')
+    path = tmp_path / "Switch.yml"
+    path.write_text("devices:\n  - 10.1.0.1\n  - host: 10.1.0.2\n    platform: extreme_vsp\n    site: Hoboken\n")
+
+    assert load_inventory(str(path), 'switch') == [
+        Device('10.1.0.1', 'switch', 'avaya_ers', ''),
+        Device('10.1.0.2', 'switch', 'extreme_vsp', 'Hoboken'),
+    ]
+
+
+def test_yaml_entries_with_empty_keys(tmp_path):
+    pytest.importorskip('yaml')
+    path = tmp_path / "Router.yaml"
+    path.write_text("- host: 10.0.0.1\n  platform:\n  site:\n  port:\n")
+
+    assert load_inventory(str(path), 'router') == [Device('10.0.0.1', 'router', 'avaya_ers', '', 22)]
+
+
+def test_inventory_ports(tmp_path):
+    path = tmp_path / "Switch.csv"
+    path.write_text("host,port\n127.1.0.1,2222\n127.1.0.1,2223\n127.1.0.1,2222\n10.1.0.2,\n")
+
+    assert load_inventory(str(path), 'switch') == [
+        Device('127.1.0.1', 'switch', 'avaya_ers', '', 2222),
+        Device('127.1.0.1', 'switch', 'avaya_ers', '', 2223),
+        Device('10.1.0.2', 'switch', 'avaya_ers', '', 22),
+    ]
+
+
+def test_entry_without_host_is_rejected(tmp_path):
+    path = tmp_path / "Router.csv"
+    path.write_text("host,site\n,Newark\n")
+
+    with pytest.raises(InventoryError):
+        load_inventory(str(path), 'router')
+
+
+def fake_keyring(monkeypatch, stored):
+    module = types.ModuleType('keyring')
+    module.get_password = lambda service, name: stored.get((service, name))
+    monkeypatch.setitem(sys.modules, 'keyring', module)
+
+
+def test_keyring_credentials(monkeypatch):
+    fake_keyring(monkeypatch, {
+        ('network', 'username'): 'netops',
+        ('network', 'password'): 'secret',
+        ('network', 'enable_pass'): 'enable',
+    })
+
+    assert load_keyring_credentials() == Credentials('netops', 'secret', 'enable')
+
+
+def test_missing_keyring_entry(monkeypatch):
+    fake_keyring(monkeypatch, {('network', 'username'): 'netops'})
+
+    with pytest.raises(InventoryError, match='password, enable_pass'):
+        load_keyring_credentials()
@@ -0,0 +1,72 @@
+"""Tests for the queued run log and the per-device progress lines."""
+
+import concurrent.futures
+import logging
+
+import pytest
+
+from netscraper import collectors
+from netscraper.collectors import Device, collect_arp_info, collect_fleet, device_result
+from netscraper.logs import QUIET_LOGGERS, configure_logging
+
+from tests.test_capture import ROUTER_OUTPUTS, FakeConnection
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    quiet_levels = {name: logging.getLogger(name).level for name in QUIET_LOGGERS}
+    yield root
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    for name, quiet_level in quiet_levels.items():
+        logging.getLogger(name).setLevel(quiet_level)
+
+
+def test_records_from_many_threads_reach_the_log_file(tmp_path, root_logger, capsys):
+    log_path = tmp_path / 'run.log'
+    listener = configure_logging(str(log_path), logging.INFO)
+    logger = logging.getLogger('netscraper.test')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda n: logger.info(f'device {n} done'), range(200)))
+    logger.debug('not at this level')
+    logging.getLogger('paramiko.transport').info('Connected (version 2.0)')
+    listener.stop()
+
+    lines = log_path.read_text().splitlines()
+    assert len(lines) == 200
+    assert sorted(int(line.split('device ')[1].split()[0]) for line in lines) == list(range(200))
+    assert ' INFO    [' in lines[0] and 'netscraper.test: device' in lines[0]
+    assert capsys.readouterr().out.count('done\n') == 200
+
+
+def test_collect_arp_info_writes_nothing_to_stdout(capsys):
+    arp_data = collect_arp_info(FakeConnection(ROUTER_OUTPUTS), '10.0.0.1', ['0'])
+
+    assert [entry['IP_ADDRESS'] for entry in arp_data] == ['10.6.1.20']
+    assert capsys.readouterr().out == ''
+
+
+def test_collect_fleet_logs_one_progress_line_per_device(monkeypatch, caplog):
+    def backup_device(device, credentials, capture=None, parser=None):
+        if device.host == 'sw2':
+            return device_result(device, error='timed out')
+        return device_result(device, mac_table=[{}, {}], port_list=[{}])
+
+    monkeypatch.setattr(collectors, 'backup_device', backup_device)
+    switches = [Device('sw1', 'switch', 'avaya_ers', ''), Device('sw2', 'switch', 'avaya_ers', '')]
+
+    with caplog.at_level(logging.INFO, logger='netscraper.collectors'):
+        results = collect_fleet([], switches, None, max_workers=2)
+
+    assert [result.device.host for result in results] == ['sw1', 'sw2']
+    assert sorted(record.getMessage()[6:] for record in caplog.records) == [
+        'sw1 (switch): mac_table 2, port_list 1',
+        'sw2 (switch): failed',
+    ]
+    assert {record.getMessage()[:6] for record in caplog.records} == {'[1/2] ', '[2/2] '}
@@ -0,0 +1,133 @@
+"""Tests for the memo of parsed rows."""
+
+import gzip
+import os
+
+import pytest
+
+from netscraper import parsepool
+from netscraper.collectors import tag_device
+from netscraper.config import TEMPLATE_PATH_MAC
+from netscraper.memo import PARSE_MEMO, ParseMemo, freeze, thaw
+from netscraper.parsepool import INLINE_PARSER, ParsePool
+from netscraper.templates import parse_textfsm_output
+
+from tests.test_capture import SWITCH_OUTPUTS
+from tests.test_streaming import OUTPUT as PORTS_OUTPUT, TEMPLATE as PORTS_TEMPLATE
+
+MAC_OUTPUT = SWITCH_OUTPUTS['show mac-address-table']
+
+
+@pytest.fixture
+def memo():
+    PARSE_MEMO.clear()
+    yield PARSE_MEMO
+    PARSE_MEMO.clear()
+
+
+@pytest.fixture
+def ports_template(tmp_path):
+    path = tmp_path / 'ports.textfsm'
+    path.write_text(PORTS_TEMPLATE)
+    return str(path)
+
+
+def memoize(memo, output, template_path):
+    rows = parse_textfsm_output(output, template_path)
+    memo.put(memo.key(output, template_path), freeze(rows))
+    return rows
+
+
+def test_lookups_return_new_copies_of_the_parsed_rows(ports_template):
+    memo = ParseMemo()
+    expected = memoize(memo, PORTS_OUTPUT, ports_template)
+    assert any(row['VLANS'] for row in expected)
+
+    rows = memo.get(memo.key(PORTS_OUTPUT, ports_template))
+    assert rows == expected
+    rows[1]['VLANS'].append('99')
+    rows[0]['Device'] = 'sw1'
+    assert memo.get(memo.key(PORTS_OUTPUT, ports_template)) == expected
+
+    assert memo.get(memo.key(PORTS_OUTPUT + '\n', ports_template)) is None
+    assert memo.stats() == {'hits': 2, 'misses': 1, 'hit_rate': 0.667, 'entries': 1, 'rows': 4, 'evictions': 0}
+
+
+def test_editing_the_template_stops_its_entries_matching(ports_template):
+    memo = ParseMemo()
+    memoize(memo, PORTS_OUTPUT, ports_template)
+    with open(ports_template, 'a') as template_file:
+        template_file.write('\n')
+
+    assert memo.get(memo.key(PORTS_OUTPUT, ports_template)) is None
+    assert memo.key(PORTS_OUTPUT, '/no/such/template.textfsm') is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    memo = ParseMemo(max_entries=2, max_rows=2)
+    memoize(memo, MAC_OUTPUT, TEMPLATE_PATH_MAC)
+    memoize(memo, '', TEMPLATE_PATH_MAC)
+    assert memo.get(memo.key(MAC_OUTPUT, TEMPLATE_PATH_MAC)) is not None
+    memoize(memo, 'unrelated\n', TEMPLATE_PATH_MAC)
+
+    assert memo.get(memo.key('', TEMPLATE_PATH_MAC)) is None
+    assert memo.get(memo.key(MAC_OUTPUT, TEMPLATE_PATH_MAC)) is not None
+    assert memo.stats()['evictions'] == 1
+
+    # Over max_rows on its own: not remembered, and nothing else is evicted for it
+    memoize(memo, MAC_OUTPUT.replace('00-0E', '00-0F') + MAC_OUTPUT.splitlines(True)[-1], TEMPLATE_PATH_MAC)
+    assert memo.stats()['entries'] == 2
+
+
+def test_rows_with_different_keys_are_not_frozen():
+    assert freeze([{'A': '1'}, {'B': '2'}]) is None
+    assert thaw(freeze([])) == []
+
+
+def test_saved_memo_loads_into_a_new_process(tmp_path, ports_template):
+    path = str(tmp_path / 'memo.jsonl.gz')
+    memo = ParseMemo()
+    expected = memoize(memo, PORTS_OUTPUT, ports_template)
+    mac_rows = memoize(memo, MAC_OUTPUT, TEMPLATE_PATH_MAC)
+    assert memo.save(path) == 2
+
+    loaded = ParseMemo()
+    assert loaded.load(path) == 2
+    assert loaded.get(loaded.key(PORTS_OUTPUT, ports_template)) == expected
+    assert loaded.get(loaded.key(MAC_OUTPUT, TEMPLATE_PATH_MAC)) == mac_rows
+
+    os.utime(ports_template, ns=(0, 0))
+    assert ParseMemo().load(path) == 1
+    with gzip.open(path, 'rt') as memo_file:
+        lines = memo_file.read().splitlines()
+    with gzip.open(path, 'wt') as memo_file:
+        memo_file.write('\n'.join(lines[:2]) + '\n{"template": ')
+    assert ParseMemo().load(path) == 0  # the ports entry is stale, and the MAC entry is cut short
+    assert ParseMemo().load(str(tmp_path / 'missing.jsonl.gz')) == 0
+
+
+def test_inline_parser_answers_repeated_outputs_from_the_memo(memo, monkeypatch):
+    first = INLINE_PARSER.submit(MAC_OUTPUT, TEMPLATE_PATH_MAC, tag_device, 'sw1')
+
+    def no_parse(*args):
+        raise AssertionError('parsed an output seen before')
+
+    monkeypatch.setattr(parsepool, 'parse_textfsm_output', no_parse)
+    second = INLINE_PARSER.submit(MAC_OUTPUT, TEMPLATE_PATH_MAC, tag_device, 'sw2')
+    assert [dict(row, Device='sw1') for row in second] == first
+    assert {row['Device'] for row in second} == {'sw2'}
+
+    monkeypatch.setattr(memo, 'enabled', False)
+    with pytest.raises(AssertionError):
+        INLINE_PARSER.submit(MAC_OUTPUT, TEMPLATE_PATH_MAC, tag_device, 'sw3')
+    assert memo.stats()['hits'] == 1
+
+
+def test_pool_answers_repeated_outputs_without_a_job(memo):
+    with ParsePool(max_workers=1) as pool:
+        first = pool.result(pool.submit(MAC_OUTPUT, TEMPLATE_PATH_MAC, tag_device, 'sw1'))
+        second = pool.submit(MAC_OUTPUT, TEMPLATE_PATH_MAC, tag_device, 'sw2')
+        assert second.done()
+        assert [dict(row, Device='sw1') for row in pool.result(second)] == first
+        assert pool.stats()['jobs'] == 1
+    assert memo.stats()['hits'] == 1
@@ -0,0 +1,184 @@
+"""Compare the hash-indexed merge against the original nested-loop merge."""
+
+import copy
+import random
+
+import pytest
+
+from netscraper.merge import (
+    merge_endpoints,
+    merge_mac_and_port_tables,
+    merge_with_arp_table,
+    merge_with_port_status,
+    normalize_mac,
+)
+
+
+# The nested-loop merge that shipped in Network_Scraper.py, kept as the reference.
+def reference_merge_mac_and_port_tables(mac_table, port_list):
+    merged_list = []
+    for port_entry in port_list:
+        port_merged = False
+        for mac_entry in mac_table:
+            if port_entry['PORT'] == mac_entry['PORT'] and port_entry.get('UNIT') == mac_entry.get('UNIT'):
+                merged_list.append({
+                    'UNIT': port_entry.get('UNIT', ''),
+                    'PORT': port_entry['PORT'],
+                    'NAME': port_entry['NAME'],
+                    'VLAN': mac_entry['VID'],
+                    'MAC': normalize_mac(mac_entry['MAC_ADDRESS']),
+                    'IP_ADDRESS': None,
+                    'OPER': None,
+                    'SPEED': None,
+                    'PING_STATUS': '',
+                    'VRF_ID': None,
+                })
+                port_merged = True
+        if not port_merged:
+            merged_list.append({
+                'UNIT': port_entry.get('UNIT', ''),
+                'PORT': port_entry['PORT'],
+                'NAME': port_entry['NAME'],
+                'VLAN': None,
+                'MAC': None,
+                'IP_ADDRESS': None,
+                'OPER': None,
+                'SPEED': None,
+                'PING_STATUS': '',
+                'VRF_ID': None,
+            })
+    return merged_list
+
+
+def reference_merge_with_arp_table(merged_list, arp_data):
+    for entry in merged_list:
+        if entry['MAC']:
+            for arp_entry in arp_data:
+                if normalize_mac(entry['MAC']) == normalize_mac(arp_entry['MAC_ADDRESS']):
+                    entry['IP_ADDRESS'] = arp_entry['IP_ADDRESS']
+                    entry['VRF_ID'] = arp_entry['VRF_ID']
+                    break
+    return merged_list
+
+
+def reference_merge_with_port_status(merged_list, port_status_list):
+    for entry in merged_list:
+        for port_status in port_status_list:
+            if entry['UNIT'] == port_status['UNIT'] and entry['PORT'] == port_status['PORT']:
+                entry['OPER'] = port_status.get('OPER_STATUS', None)
+                entry['SPEED'] = port_status.get('SPEED', None)
+                break
+    return merged_list
+
+
+def random_mac(rng, macs):
+    if macs and rng.random() < 0.2:
+        return rng.choice(macs)
+    octets = [f"{rng.randrange(256):02x}" for _ in range(6)]
+    mac = ":".join(octets) if rng.random() < 0.5 else "-".join(octets)
+    return mac.upper() if rng.random() < 0.3 else mac
+
+
+def synthetic_tables(seed, units=3, ports=24, macs=400, arps=300):
+    """Build MAC, port, ARP and port-status tables with duplicates and misses."""
+    rng = random.Random(seed)
+    unit_ids = [str(unit) for unit in range(1, units + 1)] + ['']
+
+    port_list = []
+    for unit in unit_ids:
+        for port in range(1, ports + 1):
+            entry = {'PORT': str(port), 'NAME': f"port-{unit}-{port}"}
+            if unit or rng.random() < 0.5:
+                entry['UNIT'] = unit
+            port_list.append(entry)
+    rng.shuffle(port_list)
+
+    mac_table = []
+    mac_addresses = []
+    for _ in range(macs):
+        mac = random_mac(rng, mac_addresses)
+        mac_addresses.append(mac)
+        mac_table.append({
+            'MAC_ADDRESS': mac,
+            'VID': str(rng.choice([1, 10, 20, 300])),
+            'TYPE': 'Learned',
+            'UNIT': rng.choice(unit_ids),
+            'PORT': str(rng.randrange(1, ports + 8)),
+            'TRUNK': '',
+        })
+
+    arp_data = []
+    for _ in range(arps):
+        mac = rng.choice(mac_addresses) if rng.random() < 0.8 else random_mac(rng, [])
+        arp_data.append({
+            'MAC_ADDRESS': mac.replace('-', ':'),
+            'IP_ADDRESS': f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            'TUNNEL': '',
+            'VRF_ID': str(rng.randrange(4)),
+        })
+
+    port_status_list = []
+    for unit in unit_ids:
+        for port in range(1, ports + 1):
+            if rng.random() < 0.1:
+                continue
+            for _ in range(rng.choice([1, 1, 2])):
+                port_status_list.append({
+                    'UNIT': unit,
+                    'PORT': str(port),
+                    'OPER_STATUS': rng.choice(['Up', 'Down']),
+                    'SPEED': rng.choice(['100Mbps', '1000Mbps', '']),
+                })
+    rng.shuffle(port_status_list)
+
+    return mac_table, port_list, arp_data, port_status_list
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_indexed_merge_matches_nested_loops(seed):
+    mac_table, port_list, arp_data, port_status_list = synthetic_tables(seed)
+
+    expected = reference_merge_mac_and_port_tables(mac_table, port_list)
+    expected = reference_merge_with_arp_table(expected, arp_data)
+    expected = reference_merge_with_port_status(expected, port_status_list)
+
+    merged = merge_mac_and_port_tables(copy.deepcopy(mac_table), copy.deepcopy(port_list))
+    merged = merge_with_arp_table(merged, copy.deepcopy(arp_data))
+    merged = merge_with_port_status(merged, copy.deepcopy(port_status_list))
+
+    assert len(merged) == len(expected)
+    for row, expected_row in zip(merged, expected):
+        assert list(row.items()) == list(expected_row.items())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_endpoint_table_matches_list_merge(seed):
+    # Two switches with the same unit/port numbers; ARP comes from the routers, so only one copy is kept
+    tables = {'macs': [], 'ports': [], 'arps': [], 'statuses': []}
+    for offset, device in enumerate(('sw1', 'sw2')):
+        for name, rows in zip(tables, synthetic_tables(seed * 2 + offset)):
+            for row in rows:
+                row['Device'] = device
+            tables[name].extend(rows)
+    del tables['arps'][300:]
+
+    expected = []
+    for device in ('sw1', 'sw2'):
+        rows = merge_mac_and_port_tables(
+            [row for row in tables['macs'] if row['Device'] == device],
+            [row for row in tables['ports'] if row['Device'] == device],
+        )
+        expected.extend(merge_with_port_status(rows, [row for row in tables['statuses'] if row['Device'] == device]))
+    expected = merge_with_arp_table(expected, tables['arps'])
+
+    endpoints = merge_endpoints(tables['macs'], tables['ports'], tables['arps'], tables['statuses'])
+
+    assert len(endpoints) == len(expected)
+    for row, expected_row in zip(endpoints, expected):
+        assert list(row.items()) == list(expected_row.items())
+
+
+def test_empty_inputs():
+    assert merge_mac_and_port_tables([], []) == []
+    assert merge_with_arp_table([], [{'MAC_ADDRESS': 'aa:bb', 'IP_ADDRESS': '1.1.1.1', 'VRF_ID': '0'}]) == []
+    assert merge_with_port_status([], []) == []
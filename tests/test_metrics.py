@@ -0,0 +1,111 @@
+"""Tests for the timing spans and their JSON/Prometheus export."""
+
+import json
+
+import pytest
+
+from netscraper.collectors import Device, collect_device
+from netscraper.memo import PARSE_MEMO
+from netscraper.metrics import METRICS, NULL_SPAN, Metrics
+from netscraper.parsepool import ParsePool
+
+from tests.test_capture import SWITCH_OUTPUTS, FakeConnection
+
+
+@pytest.fixture
+def metrics():
+    PARSE_MEMO.clear()  # outputs parsed by earlier tests would be answered without a parse span
+    METRICS.reset()
+    METRICS.enable()
+    yield METRICS
+    METRICS.enable(False)
+    METRICS.reset()
+
+
+def test_disabled_spans_record_nothing():
+    metrics = Metrics()
+
+    with metrics.span('collect') as span:
+        pass
+
+    assert span is NULL_SPAN
+    assert metrics.spans() == []
+    connection = FakeConnection({})
+    assert metrics.wrap(connection) is connection
+
+
+def test_nested_spans_inherit_the_device_and_count_errors():
+    metrics = Metrics()
+    metrics.enable()
+
+    with metrics.span('device', device='sw1'):
+        with metrics.span('parse', command='mac.textfsm'):
+            pass
+        with pytest.raises(ValueError):
+            with metrics.span('command', command='show vlan'):
+                raise ValueError('dropped')
+    with metrics.span('merge'):
+        pass
+
+    assert [(span.stage, span.device, span.error) for span in metrics.spans()] == [
+        ('parse', 'sw1', False), ('command', 'sw1', True), ('device', 'sw1', False), ('merge', None, False),
+    ]
+    summary = metrics.summary()
+    assert summary['commands']['show vlan']['errors'] == 1
+    assert summary['devices']['sw1']['count'] == 1
+
+
+def test_summary_percentiles():
+    metrics = Metrics()
+    for seconds in range(1, 101):
+        metrics.record('command', seconds / 100, device='sw1', command='show interfaces')
+    metrics.record('device', 60.0, device='sw1')
+
+    stats = metrics.summary()['commands']['show interfaces']
+    assert (stats['count'], stats['p50'], stats['p95'], stats['max'], stats['total']) == (100, 0.5, 0.95, 1.0, 50.5)
+    assert metrics.summary()['devices']['sw1']['device_seconds'] == 60.0
+
+
+def test_export_writes_json_and_prometheus(tmp_path):
+    metrics = Metrics()
+    metrics.record('command', 0.25, device='sw1', command='show "mac"')
+    metrics.record('parse', 0.01, device='sw1', command='extreme_ers_show_interfaces.textfsm')
+
+    json_path, prom_path = metrics.export(tmp_path / 'timings')
+
+    assert json.loads(open(json_path).read())['stages']['command']['p95'] == 0.25
+    prom = open(prom_path).read()
+    assert '# TYPE netscraper_command_seconds summary' in prom
+    assert 'netscraper_command_seconds{command="show \\"mac\\"",quantile="0.95"} 0.25' in prom
+    assert 'netscraper_parse_seconds_count{template="extreme_ers_show_interfaces.textfsm"} 1' in prom
+    assert 'netscraper_device_command_seconds_max{device="sw1"} 0.25' in prom
+    assert 'netscraper_span_errors_total{stage="parse"} 0' in prom
+
+
+def test_collect_times_commands_and_parses_per_device(metrics):
+    device = Device('10.0.1.1', 'switch', 'avaya_ers', '')
+
+    with metrics.span('device', device=device.host):
+        collect_device(metrics.wrap(FakeConnection(SWITCH_OUTPUTS)), device)
+
+    summary = metrics.summary()
+    assert set(summary['commands']) == set(SWITCH_OUTPUTS)
+    assert set(summary['templates']) == {
+        'extreme_ers_show_mac-address-table.textfsm',
+        'extreme_ers_show_interface_name.textfsm',
+        'extreme_ers_show_interfaces.textfsm',
+    }
+    assert summary['devices'][device.host]['count'] == 3
+    assert {span.device for span in metrics.spans()} == {device.host}
+
+
+def test_parses_in_the_pool_are_timed_per_template_and_device(metrics):
+    device = Device('10.0.1.1', 'switch', 'avaya_ers', '')
+
+    with ParsePool(max_workers=1) as pool:
+        with metrics.span('device', device=device.host):
+            collect_device(metrics.wrap(FakeConnection(SWITCH_OUTPUTS)), device, pool)
+
+    templates = metrics.summary()['templates']
+    assert len(templates) == 3 and all(stats['count'] == 1 for stats in templates.values())
+    assert {span.device for span in metrics.spans() if span.stage == 'parse'} == {device.host}
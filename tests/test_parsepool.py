@@ -0,0 +1,63 @@
+"""Tests for parsing command outputs in a bounded process pool."""
+
+import time
+
+import pytest
+
+from netscraper.collectors import Device, collect_device
+from netscraper.config import TEMPLATE_PATH_ARP
+from netscraper.memo import PARSE_MEMO
+from netscraper.parsepool import INLINE_PARSER, ParsePool
+
+from tests.test_capture import ROUTER_OUTPUTS, SWITCH_OUTPUTS, FakeConnection
+
+
+def slow_finish(rows, seconds):
+    time.sleep(seconds)
+    return rows
+
+
+@pytest.fixture(autouse=True)
+def no_memo(monkeypatch):
+    # Every output here has to reach the pool
+    monkeypatch.setattr(PARSE_MEMO, 'enabled', False)
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with ParsePool(max_workers=2) as pool:
+        yield pool
+
+
+def test_pool_tables_match_inline_parsing(pool):
+    router = Device('10.0.0.1', 'router', 'avaya_ers', '')
+    switch = Device('10.0.1.1', 'switch', 'avaya_ers', '')
+
+    for device, outputs in ((router, ROUTER_OUTPUTS), (switch, SWITCH_OUTPUTS)):
+        expected = collect_device(FakeConnection(outputs), device, INLINE_PARSER)
+        assert collect_device(FakeConnection(outputs), device, pool) == expected
+        assert any(expected.values())
+    assert pool.stats()['jobs'] >= 6
+
+
+def test_parse_errors_reach_the_caller(pool):
+    pending = pool.submit('output', '/no/such/template.textfsm')
+    with pytest.raises(FileNotFoundError):
+        pool.result(pending)
+    with pytest.raises(FileNotFoundError):
+        pool.result(pool.gather([pool.submit('', TEMPLATE_PATH_ARP), pool.submit('', '/no/such/template.textfsm')]))
+    assert pool.result(pool.gather([])) == []
+
+
+def test_submit_blocks_while_the_pool_is_full():
+    with ParsePool(max_workers=1, max_pending=1) as pool:
+        pool.result(pool.submit('', TEMPLATE_PATH_ARP))  # start the worker process
+        first = pool.submit('', TEMPLATE_PATH_ARP, slow_finish, 0.5)
+        start = time.perf_counter()
+        second = pool.submit('', TEMPLATE_PATH_ARP)
+        blocked = time.perf_counter() - start
+
+        assert first.done()
+        assert pool.result(second) == []
+    assert blocked >= 0.3
+    assert pool.stats()['wait_seconds'] >= 0.3
@@ -0,0 +1,145 @@
+"""Tests for the importable pipeline stages."""
+
+import subprocess
+import sys
+
+import pytest
+
+from netscraper import collectors, pipeline
+from netscraper.collectors import Device, device_result
+
+
+def collected_tables():
+    return {
+        'vrf_data': [
+            {'VRF_NAME': 'corp_users', 'VRF_ID': '1', 'Device': '10.0.0.1'},
+            {'VRF_NAME': 'GlobalRouter', 'VRF_ID': '0', 'Device': '10.0.0.1'},
+        ],
+        'arp_data': [{'MAC_ADDRESS': '00:11:22:33:44:55', 'IP_ADDRESS': '10.6.1.20', 'TUNNEL': '', 'VRF_ID': '1'}],
+        'vlan_configurations': [
+            {'VLAN_ID': '20', 'VLAN_NAME': '"Corp"', 'ISID': '', 'IP': '10.6.1.3', 'SUBNET_MASK': '255.255.255.0', 'VRF': 'corp_users', 'PREFIX': None},
+        ],
+        'vlan_advance_data': [{'VLAN_ID': '20', 'NAME': 'Corp', 'MAC_ADDRESS': '00:aa:bb:cc:dd:ee'}],
+        'mac_table': [{'MAC_ADDRESS': '00-11-22-33-44-55', 'VID': '20', 'TYPE': 'Learned', 'UNIT': '1', 'PORT': '3', 'TRUNK': ''}],
+        'port_list': [{'UNIT': '1', 'PORT': '3', 'NAME': 'printer'}, {'UNIT': '1', 'PORT': '4', 'NAME': 'spare'}],
+        'port_status_list': [{'UNIT_PORT': '1/3', 'UNIT': '1', 'PORT': '3', 'OPER_STATUS': 'Up', 'SPEED': '1000Mbps'}],
+    }
+
+
+def device_results():
+    tables = collected_tables()
+    router = Device('10.0.0.1', 'router', 'avaya_ers', '')
+    switch = Device('10.0.1.1', 'switch', 'avaya_ers', '')
+    router_tables = {name: tables[name] for name in ('vrf_data', 'arp_data', 'vlan_configurations', 'vlan_advance_data')}
+    switch_tables = {
+        name: [dict(row, Device=switch.host) for row in tables[name]]
+        for name in ('mac_table', 'port_list', 'port_status_list')
+    }
+    return [device_result(router, **router_tables), device_result(switch, **switch_tables)]
+
+
+def test_import_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, netscraper.pipeline, netscraper.cli; "
+        "print(','.join(m for m in ('pandas', 'openpyxl', 'netmiko') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_merge_stage_returns_report():
+    report = pipeline.merge(device_results())
+
+    assert [row['NAME'] for row in report['endpoints']] == ['printer', 'spare']
+    assert report['endpoints'][0]['IP_ADDRESS'] == '10.6.1.20'
+    assert report['endpoints'][0]['OPER'] == 'Up'
+    assert [vrf['VRF_ID'] for vrf in report['vrfs']] == ['0', '1']
+    assert report['vlans'][0]['PREFIX'] == '/24'
+
+
+def test_export_stage_writes_workbook(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    pytest.importorskip('pandas')
+    report = pipeline.merge(device_results())
+
+    [excel_path] = pipeline.export(report, str(tmp_path / 'report.xlsx'))
+
+    ws = openpyxl.load_workbook(excel_path).active
+    assert ws['A1'].value == 'UNIT'
+    assert ws['C2'].value == 'printer'
+    assert ws['L1'].value == 'VLAN_ID'
+    assert ws['T1'].value == 'VRF_NAME'
+    assert ws['W1'].value == 'VLAN_ID'
+
+
+def test_merge_joins_ports_per_switch():
+    port = {'UNIT': '1', 'PORT': '3', 'NAME': 'uplink'}
+    results = [
+        device_result(Device('sw1', 'switch', 'avaya_ers', ''),
+                      mac_table=[{'MAC_ADDRESS': 'aa:aa:aa:aa:aa:aa', 'VID': '10', 'UNIT': '1', 'PORT': '3', 'Device': 'sw1'}],
+                      port_list=[dict(port, Device='sw1')],
+                      port_status_list=[{'UNIT': '1', 'PORT': '3', 'OPER_STATUS': 'Up', 'SPEED': '', 'Device': 'sw1'}]),
+        device_result(Device('sw2', 'switch', 'avaya_ers', ''),
+                      port_list=[dict(port, Device='sw2')],
+                      port_status_list=[{'UNIT': '1', 'PORT': '3', 'OPER_STATUS': 'Down', 'SPEED': '', 'Device': 'sw2'}]),
+    ]
+
+    endpoints = pipeline.merge(results)['endpoints']
+
+    assert [(row['MAC'], row['OPER']) for row in endpoints] == [('aa-aa-aa-aa-aa-aa', 'Up'), (None, 'Down')]
+
+
+def test_collect_returns_results_in_inventory_order(monkeypatch):
+    def fake_backup_device(device, credentials, capture, parser):
+        if device.host == 'bad':
+            return device_result(device, error='timed out')
+        if device.role == 'router':
+            return device_result(device)
+        return device_result(device, port_list=[{'UNIT': '', 'PORT': '1', 'NAME': device.host, 'Device': device.host}])
+
+    monkeypatch.setattr(collectors, 'backup_device', fake_backup_device)
+
+    results = collectors.collect_fleet(['r1'], ['s1', 'bad', 's2'], None, max_workers=4)
+
+    assert [(result.device.host, result.device.role) for result in results] == [
+        ('r1', 'router'), ('s1', 'switch'), ('bad', 'switch'), ('s2', 'switch')
+    ]
+    assert results[2].error == 'timed out'
+    assert isinstance(results[1].port_list, tuple)
+    assert [row['NAME'] for row in collectors.combine_results(results)['port_list']] == ['s1', 's2']
+
+
+class FakeConnection:
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.commands = []
+
+    def send_command(self, command):
+        self.commands.append(command)
+        return self.outputs.get(command, '')
+
+
+def test_arp_is_collected_only_for_the_routers_own_vrfs():
+    vrf_data = [
+        {'VRF_ID': '0', 'VRF_ARP_COUNT': '12'},
+        {'VRF_ID': '3', 'VRF_ARP_COUNT': '0'},
+        {'VRF_ID': '1', 'VRF_ARP_COUNT': '4'},
+        {'VRF_ID': '1', 'VRF_ARP_COUNT': '4'},
+    ]
+    net_connect = FakeConnection({})
+
+    collectors.collect_arp_info(net_connect, 'r1', collectors.arp_vrf_ids(vrf_data))
+
+    assert net_connect.commands == ['show ip arp vrfid 0', 'show ip arp vrfid 1']
+
+
+def test_vrf_list_is_an_optional_export(tmp_path):
+    pytest.importorskip('openpyxl')
+    pytest.importorskip('pandas')
+    report = pipeline.merge(device_results())
+
+    pipeline.export(report, str(tmp_path / 'report.xlsx'))
+    assert not (tmp_path / 'Vrf_List.txt').exists()
+
+    pipeline.export(report, str(tmp_path / 'report.xlsx'), str(tmp_path / 'Vrf_List.txt'))
+    assert (tmp_path / 'Vrf_List.txt').read_text() == '0\n1\n'
@@ -0,0 +1,158 @@
+"""Tests for the ICMP ping sweep."""
+
+import collections
+import errno
+import socket
+import subprocess
+import threading
+import time
+
+import pytest
+
+from netscraper import probe
+from netscraper.cli import build_parser
+from netscraper.merge import merge_with_ping_results
+from netscraper.probe import IcmpSocket, ProbeError, echo_request, parse_echo_reply, ping_command, ping_ips, sweep
+
+
+class FakeIcmpSocket:
+    """Local stand-in that answers echo requests the way `hosts` says.
+
+    `hosts` maps an address to (reply delay in seconds, number of requests to ignore first).
+    Addresses not listed never answer.
+    """
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.requests = collections.Counter()
+        self.send_times = []
+        self._replies = collections.deque()
+        self._reader, self._writer = socket.socketpair()
+        self._reader.setblocking(False)
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def send(self, ip_address, seq):
+        self.send_times.append(time.monotonic())
+        self.requests[ip_address] += 1
+        if ip_address not in self.hosts:
+            return
+        delay, ignored = self.hosts[ip_address]
+        if self.requests[ip_address] > ignored:
+            threading.Timer(delay, self._reply, (ip_address, seq)).start()
+
+    def _reply(self, ip_address, seq):
+        self._replies.append((ip_address, seq))
+        self._writer.send(b'.')
+
+    def receive(self):
+        try:
+            self._reader.recv(4096)
+        except BlockingIOError:
+            pass
+        while self._replies:
+            yield self._replies.popleft()
+
+
+def test_echo_request_round_trip():
+    packet = bytearray(echo_request(0x1234, 7))
+    packet[0] = 0  # what the target sends back
+
+    assert parse_echo_reply(bytes(packet)) == (0x1234, 7)
+    assert parse_echo_reply(echo_request(0x1234, 7)) is None
+
+
+def test_sweep_reports_loss_and_rtt_per_unique_host():
+    fake = FakeIcmpSocket({'10.0.0.1': (0.01, 0), '10.0.0.2': (0.0, 1)})
+
+    results = sweep(['10.0.0.1', '10.0.0.2', '10.0.0.1', '10.0.0.3', 'not-an-ip'],
+                    retries=2, timeout=0.1, sockets=[fake])
+
+    by_ip = {result['IP_ADDRESS']: result for result in results}
+    assert [result['IP_ADDRESS'] for result in results] == ['10.0.0.1', '10.0.0.2', '10.0.0.3', 'not-an-ip']
+    # Answered first time: no retries, one request despite the duplicate row
+    assert (by_ip['10.0.0.1']['SENT'], by_ip['10.0.0.1']['LOSS'], by_ip['10.0.0.1']['STATUS']) == (1, 0.0, 'Good')
+    assert by_ip['10.0.0.1']['RTT_MS'] >= 10
+    # Answered the retry: probing stops at the first reply
+    assert (by_ip['10.0.0.2']['SENT'], by_ip['10.0.0.2']['LOSS']) == (2, 0.5)
+    assert (by_ip['10.0.0.3']['SENT'], by_ip['10.0.0.3']['LOSS'], by_ip['10.0.0.3']['RTT_MS']) == (3, 1.0, None)
+    assert (by_ip['not-an-ip']['SENT'], by_ip['not-an-ip']['STATUS']) == (0, 'Bad')
+    assert fake.requests == {'10.0.0.1': 1, '10.0.0.2': 2, '10.0.0.3': 3}
+
+
+def test_sweep_spreads_requests_over_sockets_at_the_rate():
+    hosts = {f'10.0.1.{host}': (0.0, 0) for host in range(1, 41)}
+    fakes = [FakeIcmpSocket(hosts), FakeIcmpSocket(hosts)]
+
+    results = sweep(list(hosts), rate=200, timeout=0.5, sockets=fakes)
+
+    assert all(result['STATUS'] == 'Good' for result in results)
+    assert sum(fakes[0].requests.values()) == sum(fakes[1].requests.values()) == 20
+    send_times = sorted(fakes[0].send_times + fakes[1].send_times)
+    assert send_times[-1] - send_times[0] >= 39 / 200 * 0.9
+
+
+def test_ping_results_fill_ping_status():
+    endpoints = [{'IP_ADDRESS': '10.0.0.1'}, {'IP_ADDRESS': None}, {'IP_ADDRESS': '10.0.0.9'}, {'IP_ADDRESS': '10.0.0.1'}]
+    fake = FakeIcmpSocket({'10.0.0.1': (0.0, 0)})
+
+    ping_results = ping_ips(endpoints, retries=0, timeout=0.05, sockets=[fake])
+
+    assert [entry.get('PING_STATUS') for entry in merge_with_ping_results(endpoints, ping_results)] == [
+        'Good', None, 'Bad', 'Good'
+    ]
+
+
+def test_any_socket_error_is_a_probe_error(monkeypatch):
+    def no_icmp(*args):
+        raise OSError(errno.EPROTONOSUPPORT, 'Protocol not supported')
+
+    monkeypatch.setattr(socket, 'socket', no_icmp)
+    with pytest.raises(ProbeError, match='Protocol not supported'):
+        IcmpSocket()
+
+
+def test_ping_command_flags_per_platform():
+    assert ping_command('10.0.0.1', 1.5, 'win32') == ['ping', '-n', '1', '-w', '1500', '10.0.0.1']
+    assert ping_command('10.0.0.1', 1.5, 'linux') == ['ping', '-c', '1', '-W', '2', '10.0.0.1']
+    assert ping_command('10.0.0.1', 0.2, 'darwin') == ['ping', '-c', '1', '-t', '1', '10.0.0.1']
+
+
+def test_without_icmp_sockets_hosts_are_pinged_with_the_ping_command(monkeypatch):
+    replies = {
+        '10.0.0.1': 'Reply from 10.0.0.1: bytes=32 time=3ms TTL=64',
+        '10.0.0.2': 'Reply from 10.0.0.254: Destination host unreachable.',
+    }
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return subprocess.CompletedProcess(command, 0 if command[-1] in replies else 1, replies.get(command[-1], ''), '')
+
+    def no_sockets(count):
+        raise ProbeError('no ICMP sockets')
+
+    monkeypatch.setattr(probe, 'open_icmp_sockets', no_sockets)
+    monkeypatch.setattr(subprocess, 'run', run)
+    endpoints = [{'IP_ADDRESS': address} for address in ('10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.1', 'not-an-ip')]
+    results = {result['IP_ADDRESS']: result for result in ping_ips(endpoints, retries=1, timeout=0.5)}
+
+    assert (results['10.0.0.1']['STATUS'], results['10.0.0.1']['SENT'], results['10.0.0.1']['RTT_MS']) == ('Good', 1, 3.0)
+    assert (results['10.0.0.2']['STATUS'], results['10.0.0.2']['SENT']) == ('Bad', 2)
+    assert (results['10.0.0.3']['STATUS'], results['not-an-ip']['SENT']) == ('Bad', 0)
+    assert len(commands) == 5
+
+    def missing(command, **kwargs):
+        raise FileNotFoundError(errno.ENOENT, 'No such file or directory', 'ping')
+
+    monkeypatch.setattr(subprocess, 'run', missing)
+    with pytest.raises(ProbeError):
+        ping_ips(endpoints)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        sweep(['10.0.0.1'], rate=0, sockets=[])
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(['--ping-rate', '0'])
@@ -0,0 +1,137 @@
+"""Tests for parsing outputs a line at a time with iter_textfsm_output."""
+
+import random
+import time
+
+import pytest
+
+from netscraper import config
+from netscraper.fastparse import FAST_PARSERS
+from netscraper.metrics import Metrics
+from netscraper.templates import iter_lines, iter_textfsm_output, parse_textfsm_output
+
+from tests.test_capture import ROUTER_OUTPUTS, SWITCH_OUTPUTS
+from tests.test_fastparse import farm_outputs, large_switch_outputs, sample_outputs
+
+TEMPLATE = """Value Filldown CHASSIS (\\S+)
+Value Required PORT (\\d+)
+Value STATE (up|down)
+Value Fillup SLOT (\\d+)
+Value List VLANS (\\d+)
+
+Start
+  ^Chassis ${CHASSIS}
+  ^Port ${PORT} is ${STATE} -> Record
+  ^  vlan ${VLANS}
+  ^Slot ${SLOT}
+  ^Orphan state ${STATE} -> Record
+
+EOF
+"""
+
+OUTPUT = """Chassis A
+Port 1 is up
+  vlan 10
+  vlan 20
+Port 2 is down
+Orphan state up
+Slot 3
+Chassis B
+Port 3 is up
+Slot 4
+Port 4 is down
+  vlan 30
+"""
+
+TEMPLATE_PATHS = [
+    config.TEMPLATE_PATH_ROUTE, config.TEMPLATE_PATH_VLAN_ADVANCE, config.TEMPLATE_PATH_VRF, config.TEMPLATE_PATH_ARP,
+    config.TEMPLATE_PATH_INTERFACE, config.TEMPLATE_PATH_MAC, config.TEMPLATE_PATH_PORT_STATUS,
+    config.TEMPLATE_PATH_PING, config.TEMPLATE_PATH_VLAN,
+]
+
+
+def chunked(text, rng):
+    """`text` in random pieces, as str or as UTF-8 bytes."""
+    data = text.encode('utf-8') if rng.random() < 0.5 else text
+    cuts = sorted(rng.sample(range(len(data) + 1), min(len(data) + 1, rng.randrange(12))))
+    return [data[start:end] for start, end in zip([0] + cuts, cuts + [len(data)])]
+
+
+def test_iter_lines_splits_chunks_as_splitlines_splits_the_text():
+    rng = random.Random(0)
+    for text in ['a\r\nb\rc\n\nd', '\r\n\r\n', 'x\r', '\n', '', 'a\x0bb\x1cc d\x85e é f\n', OUTPUT]:
+        for _ in range(50):
+            assert list(iter_lines(chunked(text, rng))) == text.splitlines()
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_streamed_rows_match_parse_textfsm_output(fast, monkeypatch):
+    monkeypatch.setattr(FAST_PARSERS, 'enabled', fast)
+    outputs = [output for _path, output in sample_outputs() if 'avaya_ers' in _path or 'extreme_ers' in _path]
+    outputs += farm_outputs() + list(SWITCH_OUTPUTS.values()) + list(ROUTER_OUTPUTS.values()) + large_switch_outputs(2000)
+    rng = random.Random(2)
+    rows = 0
+    for template_path in TEMPLATE_PATHS:
+        for output in outputs:
+            expected = parse_textfsm_output(output, template_path)
+            assert list(iter_textfsm_output(chunked(output, rng), template_path)) == expected
+            rows += len(expected)
+    assert rows > 1000
+
+
+def test_whole_bytes_outputs_are_read_as_text():
+    assert list(iter_lines(b'a\r\nb\xff\nc')) == ['a', 'b\ufffd', 'c']
+    assert list(iter_lines(bytearray(b'a\nb\n'))) == ['a', 'b']
+    # The MAC template has no TEMPLATE_SECTIONS, so the bytes go straight to the line reader
+    output = SWITCH_OUTPUTS['show mac-address-table']
+    expected = parse_textfsm_output(output, config.TEMPLATE_PATH_MAC)
+    assert expected
+    assert list(iter_textfsm_output(output.encode(), config.TEMPLATE_PATH_MAC)) == expected
+
+
+def test_rows_are_yielded_as_they_complete(tmp_path):
+    template_path = tmp_path / 'ports.textfsm'
+    template_path.write_text(TEMPLATE)
+    expected = parse_textfsm_output(OUTPUT, str(template_path))
+    # Filldown CHASSIS, Fillup SLOT, no record without the Required PORT, none at the empty EOF state
+    assert [(row['CHASSIS'], row['PORT'], row['SLOT'], row['VLANS']) for row in expected] == [
+        ('A', '1', '3', []), ('A', '2', '3', ['10', '20']), ('B', '3', '3', []), ('B', '4', '4', []),
+    ]
+    rng = random.Random(3)
+    for _ in range(20):
+        assert list(iter_textfsm_output(chunked(OUTPUT, rng), str(template_path))) == expected
+
+    read = []
+
+    def lines():
+        for line in OUTPUT.splitlines(keepends=True):
+            read.append(line)
+            yield line
+
+    rows = iter_textfsm_output(lines(), str(template_path))
+    assert next(rows)['PORT'] == '1'
+    # Port 1's row waits for a row with its Fillup SLOT set, the one Port 3 completes
+    assert read[-1] == 'Port 3 is up\n'
+    assert [row['PORT'] for row in rows] == ['2', '3', '4']
+
+    mac_rows = iter_textfsm_output(iter(SWITCH_OUTPUTS['show mac-address-table'].splitlines(True)), config.TEMPLATE_PATH_MAC)
+    assert next(mac_rows) == parse_textfsm_output(SWITCH_OUTPUTS['show mac-address-table'], config.TEMPLATE_PATH_MAC)[0]
+
+
+def test_iterate_times_only_the_producer():
+    metrics = Metrics()
+    metrics.enable()
+
+    def rows():
+        for row in range(3):
+            time.sleep(0.01)
+            yield row
+
+    with metrics.span('device', device='sw1'):
+        for _row in metrics.iterate('parse', rows(), command='mac.textfsm'):
+            time.sleep(0.05)
+
+    parse, device = metrics.spans()
+    assert (parse.stage, parse.device, parse.command, parse.error) == ('parse', 'sw1', 'mac.textfsm', False)
+    assert 0.03 <= parse.seconds < 0.1
+    assert device.seconds >= 0.15
@@ -0,0 +1,73 @@
+"""Tests for the compact columnar tables."""
+
+import pytest
+
+from netscraper.table import (
+    ENDPOINT_SCHEMA,
+    IPV4,
+    MAC,
+    TEXT,
+    Interner,
+    Table,
+    int_to_ipv4,
+    int_to_mac,
+    ipv4_to_int,
+    mac_to_int,
+)
+
+
+def test_mac_and_ipv4_round_trip():
+    assert mac_to_int('00:C0:B7:4C:91:CF') == mac_to_int('00-c0-b7-4c-91-cf') == 0x00C0B74C91CF
+    assert int_to_mac(0x00C0B74C91CF) == '00-c0-b7-4c-91-cf'
+    assert mac_to_int('aa:bb') is None and mac_to_int('0G:00:00:00:00:00') is None
+    assert ipv4_to_int('10.6.1.20') == 0x0A060114
+    assert int_to_ipv4(0x0A060114) == '10.6.1.20'
+    assert ipv4_to_int('10.6.1.020') is None and ipv4_to_int('10.6.1') is None and ipv4_to_int('0.0.0.0') is None
+
+
+def test_rows_read_back_as_strings():
+    table = Table({'MAC': MAC, 'IP_ADDRESS': IPV4, 'OPER': TEXT})
+    table.append({'MAC': '00:C0:B7:4C:91:CF', 'IP_ADDRESS': '10.6.1.20', 'OPER': 'Up'})
+    table.append({'MAC': 'AA:BB', 'IP_ADDRESS': 'fe80::1', 'OPER': ''})
+    table.append({})
+
+    assert list(table) == [
+        {'MAC': '00-c0-b7-4c-91-cf', 'IP_ADDRESS': '10.6.1.20', 'OPER': 'Up'},
+        {'MAC': 'aa-bb', 'IP_ADDRESS': 'fe80::1', 'OPER': ''},
+        {'MAC': None, 'IP_ADDRESS': None, 'OPER': None},
+    ]
+    assert table[-1] == table[2]
+    with pytest.raises(IndexError):
+        table[3]
+
+    table.set(2, 'IP_ADDRESS', '0.0.0.0')
+    table.set(1, 'IP_ADDRESS', '10.0.0.1')
+    assert list(table.values('IP_ADDRESS')) == ['10.6.1.20', '10.0.0.1', '0.0.0.0']
+    assert set(table.column('OPER').distinct()) == {'Up', '', None}
+
+
+def test_tables_sharing_an_interner_share_codes():
+    interner = Interner()
+    first = Table({'OPER': TEXT}, interner)
+    second = Table({'OPER_STATUS': TEXT}, interner)
+    first.append({'OPER': 'Up'})
+    second.append({'OPER_STATUS': 'Up'})
+
+    assert first.column('OPER').data[0] == second.column('OPER_STATUS').data[0]
+    assert len(interner) == 2
+
+
+def test_endpoint_table_is_compact():
+    table = Table(ENDPOINT_SCHEMA)
+    for index in range(10000):
+        table.append({
+            'UNIT': '1', 'PORT': str(index % 48), 'NAME': f'port {index % 48}', 'VLAN': '20',
+            'MAC': f'00:11:22:33:{index >> 8 & 255:02x}:{index & 255:02x}', 'IP_ADDRESS': f'10.0.{index >> 8}.{index & 255}',
+            'OPER': 'Up', 'SPEED': '1000Mbps', 'PING_STATUS': '', 'VRF_ID': '0',
+        })
+
+    data_bytes = sum(table.column(name).data.itemsize for name in table.columns) * len(table)
+    # 8 bytes of MAC, 4 of IPv4 and 4 for each of the 8 interned columns
+    assert data_bytes == 44 * 10000
+    # None, 48 port numbers, 48 port names and Up, 1000Mbps and the empty string
+    assert len(table.interner) == 100
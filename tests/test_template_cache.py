@@ -0,0 +1,93 @@
+"""Tests for the compiled TextFSM template cache."""
+
+import os
+import concurrent.futures
+
+import textfsm
+
+from netscraper.templates import TemplateCache
+
+TEMPLATE = """Value Filldown UNIT (\\d+)
+Value PORT (\\d+)
+Value NAME (\\S+)
+
+Start
+  ^Unit ${UNIT}
+  ^${PORT}\\s+${NAME} -> Record
+"""
+
+OUTPUT = """Unit 1
+1 uplink
+2 printer
+Unit 2
+1 camera
+"""
+
+
+def write_template(tmp_path, text=TEMPLATE):
+    path = tmp_path / "sample.textfsm"
+    path.write_text(text)
+    return str(path)
+
+
+def parse_uncached(template_path, output):
+    with open(template_path) as template_file:
+        fsm = textfsm.TextFSM(template_file)
+        return fsm.ParseText(output)
+
+
+def test_cache_counts_hits_and_misses(tmp_path):
+    cache = TemplateCache()
+    template_path = write_template(tmp_path)
+
+    cache.get(template_path)
+    cache.get(template_path)
+    cache.get(template_path)
+
+    assert cache.stats() == {"hits": 2, "misses": 1, "templates": 1}
+
+
+def test_cached_fsm_matches_uncached_parse(tmp_path):
+    cache = TemplateCache()
+    template_path = write_template(tmp_path)
+    expected = parse_uncached(template_path, OUTPUT)
+
+    for _ in range(3):
+        assert cache.get(template_path).ParseText(OUTPUT) == expected
+
+
+def test_clones_do_not_share_record_state(tmp_path):
+    cache = TemplateCache()
+    template_path = write_template(tmp_path)
+
+    first = cache.get(template_path)
+    first.ParseText("Unit 7\n", eof=False)
+    second = cache.get(template_path)
+
+    assert second.ParseText("3 phone\n", eof=False) == [["", "3", "phone"]]
+    assert first.ParseText("4 badge\n", eof=False) == [["7", "4", "badge"]]
+
+
+def test_modified_template_is_recompiled(tmp_path):
+    cache = TemplateCache()
+    template_path = write_template(tmp_path)
+    cache.get(template_path)
+
+    write_template(tmp_path, TEMPLATE.replace("NAME", "DESCRIPTION"))
+    stat = os.stat(template_path)
+    os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert cache.get(template_path).header == ["UNIT", "PORT", "DESCRIPTION"]
+    assert cache.stats()["misses"] == 2
+
+
+def test_concurrent_parses_are_independent(tmp_path):
+    cache = TemplateCache()
+    template_path = write_template(tmp_path)
+    expected = parse_uncached(template_path, OUTPUT)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda _: cache.get(template_path).ParseText(OUTPUT), range(200)))
+
+    assert all(result == expected for result in results)
+    assert cache.stats()["hits"] + cache.stats()["misses"] == 200